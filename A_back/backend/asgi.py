@@ -3,14 +3,27 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Server-Sent Events endpoint /api/events/ (mini.realtime) needs this entry
+point: under WSGI a long-lived stream would pin a worker thread.
+
+With TELEGRAM_WEBHOOK_SECRET set, the login bot (bot/main) receives updates
+on TELEGRAM_WEBHOOK_PATH of this app instead of long polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import sys
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+if os.getenv('TELEGRAM_WEBHOOK_SECRET'):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'bot', 'main'))
+    from bot_webhook import mount
+
+    application = mount(application)
@@ -1,6 +1,8 @@
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from importlib.util import find_spec
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 load_dotenv()
@@ -23,13 +25,24 @@ ALLOWED_HOSTS = ["*"]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "mini.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
 }
 
+# JSON через orjson (mini/renderers.py): тот же ответ, быстрее на больших списках
+FAST_JSON_RENDERER = os.getenv('FAST_JSON_RENDERER', '0') == '1'
+if FAST_JSON_RENDERER:
+    if find_spec('orjson') is None:
+        # Без orjson рендерер молча откатился бы на обычный JSONRenderer
+        raise ImproperlyConfigured('FAST_JSON_RENDERER=1 требует пакет orjson (r.txt)')
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = [
+        "mini.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -49,6 +62,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первыми: замеры охватывают все остальные middleware (mini/metrics.py, mini/perf.py)
+    'mini.metrics.MetricsMiddleware',
+    'mini.perf.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -83,13 +99,146 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Профиль выбирается переменной DB_ENGINE: sqlite (по умолчанию) или postgres.
+# Для PostgreSQL соединения переиспользуются: либо пул psycopg 3
+# (POSTGRES_POOL=1, нужен пакет psycopg[pool]), либо постоянные соединения
+# с ограниченным временем жизни (CONN_MAX_AGE). Django не позволяет
+# включать оба режима сразу. Тесты идут на том же профиле:
+# DB_ENGINE=postgres python manage.py test
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    _postgres_pool = os.getenv('POSTGRES_POOL', '0').lower() in ('1', 'true', 'yes')
+    _postgres_options = {}
+    if _postgres_pool:
+        from psycopg_pool import ConnectionPool
+
+        _postgres_options['pool'] = {
+            'min_size': int(os.getenv('POSTGRES_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('POSTGRES_POOL_MAX_SIZE', '10')),
+            # Соединение старше max_lifetime закрывается и открывается заново
+            'max_lifetime': float(os.getenv('POSTGRES_POOL_MAX_LIFETIME', '1800')),
+            # Сколько ждать свободного соединения, прежде чем отдать ошибку
+            'timeout': float(os.getenv('POSTGRES_POOL_TIMEOUT', '10')),
+            # Проверка соединения перед выдачей из пула
+            'check': ConnectionPool.check_connection,
+        }
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'datehack'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if _postgres_pool else int(os.getenv('POSTGRES_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': not _postgres_pool,
+            'OPTIONS': _postgres_options,
+            'TEST': {
+                'NAME': os.getenv('POSTGRES_TEST_DB', 'test_datehack'),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
     }
+    # SQLITE_TUNING=1 — режим для одновременной записи веб-воркеров и бота:
+    # WAL (читатели не блокируют писателя), ожидание блокировки вместо
+    # мгновенного «database is locked», synchronous=NORMAL (безопасно с WAL),
+    # mmap и увеличенный кэш страниц. Транзакции открываются как
+    # BEGIN IMMEDIATE: блокировка на запись берётся сразу, и busy timeout
+    # работает, а не падает при повышении блокировки посреди транзакции.
+    if os.getenv('SQLITE_TUNING', '0').lower() in ('1', 'true', 'yes'):
+        DATABASES['default']['OPTIONS'] = {
+            'timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', '20')),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))};"
+                f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '20000'))};"
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        }
+
+
+# Cache
+# Кэш ответов каталога (mini/cache.py): locmem по умолчанию, file — общий для
+# нескольких процессов на одной машине. Размер ограничен MAX_ENTRIES,
+# старые записи вытесняются по TTL (TIMEOUT) и LRU (locmem).
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
+if os.getenv('RESPONSE_CACHE_BACKEND', 'locmem') == 'file':
+    _response_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', str(BASE_DIR / 'cache' / 'responses')),
+    }
+else:
+    _response_cache = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    RESPONSE_CACHE_ALIAS: {
+        **_response_cache,
+        'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2000')),
+        },
+    },
 }
 
+# Маршруты, которые обслуживают async-views (mini/async_views.py) вместо DRF:
+# имена из backend/urls.py через запятую или all. Имеет смысл только под ASGI
+ASYNC_READ_ROUTES = {name.strip() for name in os.getenv('ASYNC_READ_ROUTES', '').split(',') if name.strip()}
+
+# Кэш аутентифицированных пользователей (mini/authentication.py) — в памяти процесса
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '30'))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
+
+# Уведомления в Telegram (mini/notifications.py). Без токена сообщения не
+# ставятся в очередь. Лимиты Telegram: ~30 сообщений в секунду на бота и
+# 1 в секунду в один чат
+TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+TELEGRAM_NOTIFICATIONS = bool(TELEGRAM_BOT_TOKEN)
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+# Окно, в котором события одному получателю собираются в одно сообщение
+TELEGRAM_NOTIFY_DELAY = float(os.getenv('TELEGRAM_NOTIFY_DELAY', '3'))
+FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5174')
+
+# Замеры запросов (mini/perf.py): доля замеряемых запросов, заголовок
+# Server-Timing и пороги записи в лог mini.perf
+PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION', '1') == '1'
+PERF_SAMPLE_RATE = float(os.getenv('PERF_SAMPLE_RATE', '1' if DEBUG else '0.05'))
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', '1') == '1'
+PERF_SLOW_REQUEST_MS = float(os.getenv('PERF_SLOW_REQUEST_MS', '500'))
+# Один и тот же SQL столько раз за запрос — вероятный N+1
+PERF_REPEATED_SQL = int(os.getenv('PERF_REPEATED_SQL', '10'))
+
+# Метрики Prometheus (mini/metrics.py): общий каталог процессов одной машины
+# (веб-воркеры, бот, run_jobs, send_notifications). /metrics требует
+# METRICS_TOKEN; METRICS_ALLOW_LOCALHOST=1 открывает его без токена запросам
+# с localhost — только если перед приложением нет прокси на той же машине
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOW_LOCALHOST = os.getenv('METRICS_ALLOW_LOCALHOST', '0') == '1'
+
+# Условные GET (mini/conditional.py): max-age открытых ответов; 0 — проверять ETag на каждом запросе
+CONDITIONAL_MAX_AGE = int(os.getenv('CONDITIONAL_MAX_AGE', '0'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,169 @@
+"""
+Async-версии read-эндпоинтов для запуска под backend/asgi.py.
+
+DRF APIView синхронный: под ASGI каждый запрос к нему занимает поток, пока
+ждёт БД. Здесь те же ответы собираются обычными async-views Django на async
+ORM (aget, async for), а сериализаторы работают с уже загруженными объектами
+без запросов. Аутентификация та же (CachedJWTAuthentication.aauthenticate),
+ключи кэша ответов общие с sync-версиями.
+
+Какой вариант обслуживает маршрут, задаёт settings.ASYNC_READ_ROUTES (имена
+маршрутов из backend/urls.py или all). Не-GET запросы к async-маршруту
+(PUT/PATCH профиля) передаются sync-view через sync_to_async. Сравнение
+пропускной способности — `python manage.py async_read_bench`.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import cache, conditional
+from .authentication import CachedJWTAuthentication
+from .models import Hackathon, Team, UserProfile
+from .pagination import DeltaSyncPagination, KeysetPagination
+from .serializers import HackathonDetailSerializer, TeamSerializer, UserProfileSerializer, hackathon_rows, message_rows
+from .views import (
+    UserProfileView, catalog_validators, hackathon_catalog, hackathon_dates_validators, hackathon_validators,
+    profile_validators, team_listing, user_messages, user_teams,
+)
+
+# Первый из DEFAULT_RENDERER_CLASSES, как у DRF-views без Accept (mini/renderers.py)
+renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+authenticator = CachedJWTAuthentication()
+
+
+def render(data, status=200, headers=None):
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json', headers=headers)
+
+
+def error_response(exc):
+    # Та же форма, что у rest_framework.views.exception_handler
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    headers = None
+    if exc.status_code == 401:
+        headers = {'WWW-Authenticate': authenticator.authenticate_header(None)}
+    return render(data, status=exc.status_code, headers=headers)
+
+
+def async_api_view(login_required=False, fallback=None):
+    """
+    Оборачивает async-функцию (request, user, **kwargs) -> data | HttpResponse.
+    request — DRF Request (query_params, build_absolute_uri); user — None для анонима.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                if fallback is not None:
+                    return await sync_to_async(fallback)(request, **kwargs)
+                return render({'detail': f'Метод "{request.method}" не разрешен.'}, status=405)
+            try:
+                # Как в DRF: неверный токен — 401 даже на открытых эндпоинтах
+                auth = await authenticator.aauthenticate(request)
+                user = auth[0] if auth else None
+                if login_required and user is None:
+                    raise NotAuthenticated()
+                data = await view(Request(request), user, **kwargs)
+            except APIException as exc:
+                return error_response(exc)
+            if isinstance(data, HttpResponse):
+                return data
+            return render(data)
+        return wrapper
+    return decorator
+
+
+def conditional_async(validators, namespaces=None, private=False):
+    """conditional_get (mini/conditional.py) для async-views: ставить под async_api_view"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, user, **kwargs):
+            current = await sync_to_async(conditional.evaluate)(validators, namespaces, request, user, kwargs)
+            if current is None:
+                return await view(request, user, **kwargs)
+            etag = current.etag(renderer.format)
+            response = current.precondition(request, etag)
+            if response is None:
+                response = await view(request, user, **kwargs)
+                if not isinstance(response, HttpResponse):
+                    response = render(response)
+            return current.apply(response, etag, private)
+        return wrapper
+    return decorator
+
+
+@async_api_view()
+@conditional_async(catalog_validators, lambda: [cache.CATALOG])
+@cache.cached_async('hackathons_list', lambda: [cache.CATALOG])
+async def hackathon_list(request, user):
+    rows = [row async for row in hackathon_rows.values(hackathon_catalog(request.query_params))]
+    return hackathon_rows.serialize(rows)
+
+
+@async_api_view()
+@conditional_async(hackathon_dates_validators, lambda: [cache.CATALOG])
+@cache.cached_async('hackathon_dates', lambda: [cache.CATALOG])
+async def hackathon_dates(request, user):
+    dates = {str(date) async for date in Hackathon.objects.values_list('start_date', flat=True)}
+    return {'hackathon_dates': list(dates)}
+
+
+@async_api_view()
+@conditional_async(hackathon_validators, lambda pk: [cache.hackathon_namespace(pk)])
+@cache.cached_async('hackathon_detail', lambda pk: [cache.hackathon_namespace(pk)])
+async def hackathon_detail(request, user, pk):
+    try:
+        hackathon = await Hackathon.objects.aget(pk=pk)
+    except Hackathon.DoesNotExist:
+        return render({'error': 'Хакатон не найден'}, status=404)
+    paginator = KeysetPagination(ordering_field='created_at', descending=False)
+    teams = await paginator.apaginate_queryset(team_listing(Team.objects.filter(hackathon=hackathon)), request)
+    return {
+        'hackathon': HackathonDetailSerializer(hackathon).data,
+        'teams': TeamSerializer(teams, many=True).data,
+        'teams_next': paginator.get_next_link(),
+    }
+
+
+@async_api_view(login_required=True)
+async def messages(request, user):
+    queryset = message_rows.values(user_messages(user), extra=['updated_at'])
+    if DeltaSyncPagination.cursor_query_param in request.query_params:
+        paginator = DeltaSyncPagination()
+        page = await paginator.apaginate_queryset(queryset, request)
+        return paginator.get_paginated_data(message_rows.serialize(page))
+    sync_token = DeltaSyncPagination().initial_token()
+    paginator = KeysetPagination(ordering_field='sent_at', descending=True)
+    page = await paginator.apaginate_queryset(queryset, request)
+    data = paginator.get_paginated_data(message_rows.serialize(page))
+    data['sync_token'] = sync_token
+    return data
+
+
+@async_api_view(login_required=True)
+async def my_teams(request, user):
+    teams = [team async for team in user_teams(user)]
+    return TeamSerializer(teams, many=True).data
+
+
+@async_api_view(login_required=True, fallback=UserProfileView.as_view())
+@conditional_async(profile_validators, private=True)
+async def user_profile(request, user):
+    # Профиль загружен вместе с пользователем при аутентификации
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        raise NotFound()
+    return UserProfileSerializer(profile, context={'request': request}).data
+
+
+def route(name, sync_view, async_view):
+    """Выбирает реализацию маршрута по settings.ASYNC_READ_ROUTES"""
+    routes = settings.ASYNC_READ_ROUTES
+    return async_view if 'all' in routes or name in routes else sync_view
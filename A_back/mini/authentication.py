@@ -0,0 +1,140 @@
+"""
+JWT-аутентификация с кэшем пользователей в памяти процесса.
+
+Стандартный JWTAuthentication читает User на каждый запрос, а views ещё и
+лениво догружают request.user.profile. Здесь пользователь загружается вместе
+с профилем одним запросом и хранится AUTH_USER_CACHE_TTL секунд (не больше
+AUTH_USER_CACHE_SIZE записей, LRU). Ключ — id пользователя и его версия из
+кэша версий mini/cache.py; сохранение User или UserProfile меняет версию
+(сигналы), и старая запись перестаёт находиться во всех процессах, которые
+делят бэкенд кэша ответов. Запрос получает копию, поэтому изменения
+request.user во view не попадают в кэш.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import cache, perf
+
+
+class UserCache:
+    """Потокобезопасный LRU с TTL"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+user_cache = UserCache(settings.AUTH_USER_CACHE_TTL, settings.AUTH_USER_CACHE_SIZE)
+
+
+def _detached_copy(user):
+    # copy.copy модели копирует _state и fields_cache, но не связанный профиль
+    clone = copy.copy(user)
+    profile = user._state.fields_cache.get('profile')
+    if profile is not None:
+        profile = copy.copy(profile)
+        profile._state.fields_cache['user'] = clone
+        clone._state.fields_cache['profile'] = profile
+    return clone
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        with perf.span('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        key = self.cache_key(validated_token)
+        user = user_cache.get(key)
+        if user is None:
+            user = self.load_user(key[0])
+            user_cache.set(key, user)
+        return self.checked_copy(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        """То же для async-views (mini/async_views.py): промах кэша читается async ORM"""
+        key = self.cache_key(validated_token)
+        user = user_cache.get(key)
+        if user is None:
+            try:
+                user = await self.user_queryset().aget(**{api_settings.USER_ID_FIELD: key[0]})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            user_cache.set(key, user)
+        return self.checked_copy(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """Аналог authenticate() для обычного HttpRequest: (user, token) или None без заголовка"""
+        with perf.span('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+
+    def cache_key(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+        return str(user_id), cache.get_version(cache.user_namespace(user_id))
+
+    def checked_copy(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return _detached_copy(user)
+
+    def user_queryset(self):
+        # Обратный OneToOne: у пользователя без профиля запомнится «профиля нет»
+        return self.user_model.objects.select_related('profile')
+
+    def load_user(self, user_id):
+        try:
+            return self.user_queryset().get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
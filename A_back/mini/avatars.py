@@ -0,0 +1,117 @@
+"""
+Аватары: дедупликация по содержимому и уменьшенные копии.
+
+Загруженный файл сохраняется как avatars/<hash>.<ext>, где hash — первые 16
+символов SHA-256 содержимого, поэтому повторная загрузка той же картинки не
+создаёт новых файлов. Копии SIZES × (WebP, JPEG) строит фоновая задача
+process_avatar (mini/jobs.py) и кладёт в avatars/v/<hash>-<size>.<ext>: имя
+меняется вместе с содержимым, так что их можно отдавать с Cache-Control immutable
+(views.avatar_variant или правило веб-сервера для /media/avatars/v/).
+Пока копий нет, avatar_hash пустой и сериализатор отдаёт только оригинал.
+Пересборка для уже загруженных аватаров — `python manage.py process_avatars`.
+"""
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import cache, jobs
+
+SIZES = (64, 128, 256)
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}),
+           'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+VARIANTS_DIR = 'avatars/v'
+HASH_LENGTH = 16
+CACHE_SECONDS = 365 * 24 * 3600
+VARIANT_NAME_RE = re.compile(r'[0-9a-f]{16}-\d+\.(webp|jpg)')
+
+
+def content_hash(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def variant_name(avatar_hash, size, ext):
+    return f'{VARIANTS_DIR}/{avatar_hash}-{size}.{ext}'
+
+
+def variants_exist(avatar_hash):
+    return all(default_storage.exists(variant_name(avatar_hash, size, ext)) for size in SIZES for ext in FORMATS)
+
+
+def attach(profile, upload):
+    """
+    Ставит загруженный файл аватаром профиля без повторного сохранения
+    одинаковых файлов. Возвращает True, если копии ещё нужно построить.
+    """
+    avatar_hash = content_hash(upload)
+    ext = os.path.splitext(upload.name)[1].lower() or '.jpg'
+    name = f'avatars/{avatar_hash}{ext}'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    profile.avatar.name = name
+    if variants_exist(avatar_hash):
+        profile.avatar_hash = avatar_hash
+        return False
+    profile.avatar_hash = ''
+    return True
+
+
+def render_variants(source, avatar_hash):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size in SIZES:
+            square = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for ext, (pil_format, options) in FORMATS.items():
+                name = variant_name(avatar_hash, size, ext)
+                if default_storage.exists(name):
+                    continue
+                buffer = BytesIO()
+                square.save(buffer, pil_format, **options)
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process(profile_id):
+    """Строит копии текущего аватара профиля и проставляет avatar_hash"""
+    from .models import UserProfile
+
+    profile = UserProfile.objects.filter(pk=profile_id).only('id', 'user_id', 'avatar').first()
+    if profile is None or not profile.avatar:
+        return False
+    with profile.avatar.open('rb') as source:
+        avatar_hash = content_hash(source)
+        render_variants(source, avatar_hash)
+    # Условие на avatar: если пока строили копии, загрузили другой файл, хэш не перетрём
+    updated = UserProfile.objects.filter(pk=profile_id, avatar=profile.avatar.name).update(
+        avatar_hash=avatar_hash, updated_at=timezone.now()
+    )
+    if updated:
+        cache.bump(cache.user_namespace(profile.user_id))
+    return bool(updated)
+
+
+def schedule(profile_id):
+    """Ставит обработку аватара в очередь фоновых задач"""
+    jobs.enqueue('process_avatar', profile_id=profile_id)
+
+
+def variant_urls(profile):
+    """{size: {'webp': url, 'jpg': url}} или None, пока копии не готовы"""
+    return hash_urls(profile.avatar_hash)
+
+
+def hash_urls(avatar_hash):
+    if not avatar_hash:
+        return None
+    return {
+        str(size): {ext: default_storage.url(variant_name(avatar_hash, size, ext)) for ext in FORMATS}
+        for size in SIZES
+    }
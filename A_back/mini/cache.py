@@ -0,0 +1,122 @@
+"""
+Версионированный кэш ответов для анонимных read-эндпоинтов каталога.
+
+Ключ ответа включает версии «пространств имён» (весь каталог, конкретный
+хакатон). Сигналы сохранения/удаления меняют версию, и все старые записи
+становятся недостижимыми; вытеснять их будет сам бэкенд кэша (LRU/TTL).
+Версия — случайный токен, а не счётчик: если ключ версии вытеснен, новая
+версия не совпадёт ни с одной из старых.
+"""
+import hashlib
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http.response import HttpResponseBase
+from rest_framework.response import Response
+
+CATALOG = 'catalog'
+STATS_KEYS = ('stats:hits', 'stats:misses', 'stats:invalidations')
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def hackathon_namespace(pk):
+    return f'hackathon:{pk}'
+
+
+def user_namespace(user_id):
+    # Версия пользователя для кэша аутентификации (mini/authentication.py)
+    return f'user:{user_id}'
+
+
+def get_version(namespace):
+    cache = get_cache()
+    key = f'version:{namespace}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump(*namespaces):
+    """Инвалидирует пространства имён после коммита текущей транзакции"""
+    def apply():
+        cache = get_cache()
+        cache.set_many({f'version:{ns}': uuid.uuid4().hex for ns in namespaces}, timeout=None)
+        _incr('stats:invalidations', len(namespaces))
+    transaction.on_commit(apply)
+
+
+def _incr(key, delta=1):
+    cache = get_cache()
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Ключа ещё нет (или он вытеснен) — начинаем счёт заново
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, delta)
+
+
+def stats():
+    values = get_cache().get_many(STATS_KEYS)
+    return {key.split(':', 1)[1]: values.get(key, 0) for key in STATS_KEYS}
+
+
+def build_key(request, name, namespaces):
+    params = sorted(request.query_params.lists())
+    versions = [get_version(ns) for ns in namespaces]
+    raw = f'{name}|{request.get_host()}|{params}|{versions}'
+    return 'response:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cached_get(name, namespaces):
+    """
+    Кэширует data успешного ответа GET-метода APIView.
+    namespaces — функция от kwargs маршрута, возвращающая список пространств имён.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            cache = get_cache()
+            key = build_key(request, name, namespaces(**kwargs))
+            data = cache.get(key)
+            if data is not None:
+                _incr('stats:hits')
+                return Response(data)
+            _incr('stats:misses')
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_async(name, namespaces):
+    """
+    То же для async-views (mini/async_views.py): функция возвращает data, а
+    готовый HttpResponse (ошибку) пропускается мимо кэша. Ключи общие с
+    cached_get, поэтому sync- и async-версии маршрута делят записи.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            cache = get_cache()
+            key = build_key(request, name, namespaces(**kwargs))
+            data = cache.get(key)
+            if data is not None:
+                _incr('stats:hits')
+                return data
+            _incr('stats:misses')
+            data = await view(request, *args, **kwargs)
+            if not isinstance(data, HttpResponseBase):
+                cache.set(key, data)
+            return data
+        return wrapper
+    return decorator
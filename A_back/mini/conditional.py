@@ -0,0 +1,102 @@
+"""
+Условные GET: ETag, Last-Modified и 304 Not Modified для read-эндпоинтов.
+
+Валидатор считается до ответа и без сериализации: для списков — max(updated_at)
+и count() по тому же queryset одним агрегатным запросом по индексу, для
+хакатона — его updated_at плюс max/count по командам, для профиля — поля
+загруженного при аутентификации пользователя. Если If-None-Match (или
+If-Modified-Since) совпал, ответ — 304 без тела, без кэша ответов и
+сериализаторов.
+
+count() нужен, чтобы заметить удаление: max(updated_at) оно не сдвигает.
+Поэтому спискам отдаётся только ETag, а Last-Modified (с точностью до
+секунды) — объектам, у которых удаление связанных строк сдвигает updated_at
+(mini/signals.py). UPDATE в обход save() проставляют updated_at явно
+(mini/counters.py, mini/avatars.py).
+
+С namespaces валидатор хранится в кэше ответов под теми же версиями
+пространств имён, что и сам ответ (mini/cache.py): пока данные не менялись,
+и 304, и ответ из кэша обходятся без запросов к БД.
+
+Открытые данные отдаются с Cache-Control: public — их можно хранить и в
+общих кэшах, по умолчанию (CONDITIONAL_MAX_AGE=0) с проверкой на каждом
+запросе; профиль — private, no-cache и Vary: Authorization.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import cache
+
+# Поднять при изменении формата ответов: старые ETag перестанут совпадать
+VERSION = 1
+
+
+class Validators:
+    """Всё, от чего зависит ответ (части ETag), и время последнего изменения"""
+
+    def __init__(self, *parts, last_modified=None):
+        self.parts = parts
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    def etag(self, representation):
+        # representation — формат рендерера: JSON и Browsable API — разные представления
+        raw = json.dumps([VERSION, representation, *self.parts], default=str)
+        return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+    def precondition(self, request, etag):
+        """304 (или 412 на If-Match), если у клиента актуальная версия, иначе None"""
+        return get_conditional_response(request, etag=etag, last_modified=self.last_modified)
+
+    def apply(self, response, etag, private):
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        if private:
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        elif settings.CONDITIONAL_MAX_AGE > 0:
+            patch_cache_control(response, public=True, max_age=settings.CONDITIONAL_MAX_AGE)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+def evaluate(validators, namespaces, request, user, kwargs):
+    if namespaces is None:
+        return validators(request, user, **kwargs)
+    responses = cache.get_cache()
+    key = cache.build_key(request, f'validators:{validators.__name__}', namespaces(**kwargs))
+    current = responses.get(key)
+    if current is None:
+        current = validators(request, user, **kwargs)
+        if current is not None:
+            responses.set(key, current)
+    return current
+
+
+def conditional_get(validators, namespaces=None, private=False):
+    """
+    Условный GET для метода APIView; ставить над cached_get.
+    validators(request, user, **kwargs) -> Validators или None (объекта нет — отвечает сам метод).
+    namespaces — как у cached_get; private — ответ зависит от пользователя.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            current = evaluate(validators, namespaces, request, request.user, kwargs)
+            if current is None:
+                return method(view, request, *args, **kwargs)
+            etag = current.etag(request.accepted_renderer.format)
+            response = current.precondition(request, etag)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            return current.apply(response, etag, private)
+        return wrapper
+    return decorator
@@ -0,0 +1,77 @@
+"""
+Денормализованные счётчики команд и хакатонов.
+
+Все изменения — атомарные UPDATE с F()-выражениями; вызывать их нужно в той
+же транзакции, что и само изменение состава (transaction.atomic во view).
+UPDATE не вызывает save(), поэтому updated_at (валидатор условных GET,
+mini/conditional.py) проставляется явно.
+Исключение — registered_teams: его пересчитывает фоновая задача
+recount_hackathon (mini/tasks.py), чтобы создание и удаление команд не
+упирались в блокировку одной строки хакатона.
+Расхождения (например, после правок в админке) чинит
+`python manage.py repair_counters`.
+"""
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache
+from .models import Hackathon, HackathonParticipant, Team
+from .signals import team_is_full_changed
+
+
+def _member_delta_update(delta):
+    # В SET все ссылки на колонки видят старые значения строки
+    return {
+        'member_count': F('member_count') + delta,
+        'is_full': Case(
+            When(member_count__gte=F('size_max') - delta, then=Value(True)),
+            default=Value(False),
+        ),
+        'updated_at': timezone.now(),
+    }
+
+
+def change_team_members(team, delta):
+    """Сдвигает member_count команды и пересчитывает is_full одним UPDATE"""
+    Team.objects.filter(pk=team.pk).update(**_member_delta_update(delta))
+    team.refresh_from_db(fields=['member_count', 'is_full'])
+    team_is_full_changed(team)
+
+
+def reserve_team_slots(team, count=1):
+    """
+    Занимает count мест в команде условным UPDATE: строка обновится, только
+    если места ещё есть, поэтому параллельные запросы не переполнят команду
+    без глобальной блокировки. Возвращает False, если мест не хватило.
+    Вызывать внутри transaction.atomic: откат вернёт места.
+    """
+    reserved = Team.objects.filter(
+        pk=team.pk, member_count__lte=F('size_max') - count
+    ).update(**_member_delta_update(count))
+    team.refresh_from_db(fields=['member_count', 'is_full'])
+    if reserved:
+        team_is_full_changed(team)
+    return bool(reserved)
+
+
+def change_hackathon_participants(hackathon_id, delta):
+    Hackathon.objects.filter(pk=hackathon_id).update(
+        participants_count=F('participants_count') + delta, updated_at=timezone.now()
+    )
+    cache.bump(cache.CATALOG, cache.hackathon_namespace(hackathon_id))
+
+
+def _count_of(queryset):
+    counted = queryset.order_by().values('hackathon').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counted), 0)
+
+
+def recount_hackathon(hackathon_id):
+    """Пересчитывает счётчики хакатона по факту одним UPDATE — идемпотентно"""
+    Hackathon.objects.filter(pk=hackathon_id).update(
+        registered_teams=_count_of(Team.objects.filter(hackathon=OuterRef('pk'))),
+        participants_count=_count_of(HackathonParticipant.objects.filter(hackathon=OuterRef('pk'), status='active')),
+        updated_at=timezone.now(),
+    )
+    cache.bump(cache.CATALOG, cache.hackathon_namespace(hackathon_id))
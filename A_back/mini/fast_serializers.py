@@ -0,0 +1,117 @@
+"""
+Быстрая сериализация больших списков только для чтения.
+
+ModelSerializer на каждой строке создаёт объект модели и обходит все поля:
+get_attribute по source, to_representation, для *_display — вызов метода
+модели. На списках в тысячи строк это основное время ответа. RowSerializer
+один раз разбирает поля обычного DRF-сериализатора в извлекатели по
+колонкам queryset.values():
+
+- поля, которые DRF отдаёт без изменений (строки, числа, bool, JSON, pk
+  связей), читаются из строки itemgetter'ом; source через точку
+  (user.username) — колонкой user__username;
+- get_FOO_display — по таблице choices поля, собранной заранее;
+- файлы — URL из storage поля, остальное (даты, время) — to_representation
+  того же поля DRF;
+- SerializerMethodField описываются в подклассе: колонки и функция от их
+  значений.
+
+Ответ совпадает с serializer.data по ключам, порядку и значениям, поэтому и
+после рендеринга байт в байт (FastSerializerTests). request из контекста
+(абсолютные URL) не поддерживается — такие ответы остаются на обычных
+сериализаторах. Сравнение скорости — `python manage.py bench_serializers`.
+
+    rows = hackathon_rows.values(Hackathon.objects.all())
+    data = hackathon_rows.serialize(rows)
+"""
+from operator import itemgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# to_representation этих полей возвращает значение из БД как есть
+PASS_THROUGH = {
+    serializers.IntegerField, serializers.CharField, serializers.EmailField, serializers.ChoiceField,
+    serializers.BooleanField, serializers.PrimaryKeyRelatedField,
+}
+
+
+def _converted(get, convert):
+    def extract(row):
+        value = get(row)
+        return None if value is None else convert(value)
+    return extract
+
+
+def _file(storage, use_url):
+    # Как FileField.to_representation: пустое имя — None
+    def convert(name):
+        if not name:
+            return None
+        return storage.url(name) if use_url else name
+    return convert
+
+
+def _method(get, function, many):
+    if many:
+        return lambda row: function(*get(row))
+    return lambda row: function(get(row))
+
+
+class RowSerializer:
+    serializer_class = None
+    # {имя SerializerMethodField: ([колонки values()], функция от их значений)}
+    methods = {}
+
+    def __init__(self):
+        self._compiled = {}
+
+    def compile(self, prefix=''):
+        """([колонки values()], [(ключ ответа, извлекатель)]); prefix — путь к модели от модели queryset"""
+        compiled = self._compiled.get(prefix)
+        if compiled is not None:
+            return compiled
+        model = self.serializer_class.Meta.model
+        columns, extractors = [], []
+
+        def column(name):
+            if name not in columns:
+                columns.append(name)
+            return prefix + name
+
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in self.methods:
+                    raise ImproperlyConfigured(f'{type(self).__name__}: нет функции для поля {name}')
+                sources, function = self.methods[name]
+                get = itemgetter(*(column(source) for source in sources))
+                extractors.append((name, _method(get, function, len(sources) > 1)))
+                continue
+            source = field.source.replace('.', '__')
+            if source.startswith('get_') and source.endswith('_display'):
+                model_field = model._meta.get_field(source[len('get_'):-len('_display')])
+                labels = {value: str(label) for value, label in model_field.flatchoices}
+                extractors.append((name, _converted(itemgetter(column(model_field.name)),
+                                                    lambda value, labels=labels: labels.get(value, value))))
+            elif type(field) in PASS_THROUGH or type(field) is serializers.JSONField and not field.binary:
+                extractors.append((name, itemgetter(column(source))))
+            elif isinstance(field, serializers.FileField):
+                storage = model._meta.get_field(source).storage
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                extractors.append((name, _converted(itemgetter(column(source)), _file(storage, use_url))))
+            else:
+                extractors.append((name, _converted(itemgetter(column(source)), field.to_representation)))
+        compiled = self._compiled[prefix] = ([prefix + name for name in columns], extractors)
+        return compiled
+
+    def values(self, queryset, prefix='', extra=()):
+        """queryset.values() с колонками для serialize; extra — дополнительные (например, для курсора)"""
+        columns, _ = self.compile(prefix)
+        return queryset.values(*columns, *extra)
+
+    def serialize(self, rows, prefix=''):
+        _, extractors = self.compile(prefix)
+        return [{name: extract(row) for name, extract in extractors} for row in rows]
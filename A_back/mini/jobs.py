@@ -0,0 +1,208 @@
+"""
+Очередь фоновых задач в БД, без внешних сервисов.
+
+    @register('recount_hackathon')
+    def recount_hackathon(hackathon_id): ...
+
+    enqueue('recount_hackathon', hackathon_id=hackathon.id)
+
+enqueue() пишет строку Job в текущей транзакции: задача появится ровно
+тогда, когда закоммитится изменение, которое её породило. Воркер
+(`python manage.py run_jobs`) забирает готовые задачи условным UPDATE с
+арендой на LEASE_SECONDS; упавший воркер не теряет задачу — по истечении
+аренды её возьмёт другой, а опоздавший прежний воркер не перезапишет её
+состояние (итоговый UPDATE сверяет attempts, как claim() — статус). Поэтому доставка «хотя бы один раз», и
+обработчики должны быть идемпотентными. Исключение в обработчике —
+повтор с экспоненциальной паузой, после max_attempts задача помечается failed;
+то же, если на последней попытке истекла аренда (обработчик уронил или повесил воркер).
+
+Обработчики регистрируются в mini/tasks.py (импортируется в MiniConfig.ready).
+"""
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 3600
+KEEP_DONE = timedelta(days=1)
+STATS_WINDOW = 200
+
+handlers = {}
+
+
+def register(name):
+    def decorator(func):
+        handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, delay=0, max_attempts=5, **payload):
+    if name not in handlers:
+        raise ValueError(f'Неизвестная задача: {name}')
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def _claimable(now):
+    return Q(status='queued', run_at__lte=now) | (_expired(now) & Q(attempts__lt=F('max_attempts')))
+
+
+def _expired(now):
+    return Q(status='running', locked_until__lt=now)
+
+
+def _fail_exhausted(now):
+    # Аренда истекла на последней попытке: обработчик роняет или вешает воркер — больше не повторяем
+    exhausted = Job.objects.filter(_expired(now), attempts__gte=F('max_attempts'))
+    for pk, name in exhausted.values_list('pk', 'name'):
+        failed = Job.objects.filter(_expired(now), pk=pk, attempts__gte=F('max_attempts')).update(
+            status='failed',
+            finished_at=now,
+            locked_until=None,
+            last_error='Аренда истекла на последней попытке: воркер не завершил задачу',
+        )
+        if failed:
+            logger.warning('Задача #%s (%s): аренда истекла после max_attempts попыток', pk, name)
+            metrics.inc('jobs_processed_total', job=name, result='failed')
+
+
+def claim(limit, lease_seconds=LEASE_SECONDS):
+    """Забирает до limit готовых задач; параллельные воркеры не получат одну и ту же"""
+    now = timezone.now()
+    _fail_exhausted(now)
+    candidates = list(
+        Job.objects.filter(_claimable(now)).order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in candidates:
+        # Повторяем условие в UPDATE: строку мог забрать другой воркер между SELECT и UPDATE
+        taken = Job.objects.filter(_claimable(now), pk=pk).update(
+            status='running',
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=lease_seconds),
+            started_at=now,
+        )
+        if taken:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+
+
+class LeaseLost(Exception):
+    """Аренда истекла, и задачу забрал другой воркер"""
+
+
+def _owned(job):
+    # attempts растёт при каждом claim(): совпадение значит, что аренда всё ещё наша
+    return Job.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+
+
+def run(job):
+    handler = handlers.get(job.name)
+    started = time.perf_counter()
+    try:
+        if handler is None:
+            raise LookupError(f'Неизвестная задача: {job.name}')
+        # Записи обработчика — всё или ничего: при повторе нечего «доделывать».
+        # done ставится в той же транзакции: если аренду перехватили, записи откатываются
+        with transaction.atomic():
+            handler(**job.payload)
+            if not _owned(job).update(status='done', finished_at=timezone.now(), locked_until=None):
+                raise LeaseLost
+    except LeaseLost:
+        logger.warning('Задача %s: аренда истекла, задачу выполняет другой воркер', job)
+        metrics.inc('jobs_processed_total', job=job.name, result='lease_lost')
+        return False
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Задача %s не выполнена (попытка %s из %s)', job, job.attempts, job.max_attempts)
+        if job.attempts >= job.max_attempts:
+            fields, result = {'status': 'failed', 'finished_at': timezone.now()}, 'failed'
+        else:
+            fields = {'status': 'queued', 'run_at': timezone.now() + timedelta(seconds=retry_delay(job.attempts))}
+            result = 'retry'
+        if not _owned(job).update(locked_until=None, last_error=error, **fields):
+            result = 'lease_lost'
+        metrics.inc('jobs_processed_total', job=job.name, result=result)
+        return False
+    metrics.inc('jobs_processed_total', job=job.name, result='done')
+    metrics.observe('job_duration_seconds', time.perf_counter() - started, job=job.name)
+    return True
+
+
+def work(limit=20, lease_seconds=LEASE_SECONDS):
+    """Один проход воркера: (выполнено, с ошибкой)"""
+    done = failed = 0
+    for job in claim(limit, lease_seconds):
+        if run(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def run_pending(limit=100):
+    """Выполняет все готовые задачи в текущем процессе (тесты, --once)"""
+    total = 0
+    while True:
+        done, failed = work(limit)
+        if not done and not failed:
+            return total
+        total += done + failed
+
+
+def purge_done(older_than=KEEP_DONE):
+    deleted, _ = Job.objects.filter(status='done', finished_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50': None, 'p95': None}
+    values = sorted(values)
+    return {name: round(values[min(len(values) - 1, int(len(values) * q))], 1)
+            for name, q in (('p50', 0.5), ('p95', 0.95))}
+
+
+def stats():
+    now = timezone.now()
+    counts = dict(Job.objects.order_by().values('status').annotate(n=Count('id')).values_list('status', 'n'))
+    due = Job.objects.filter(status='queued', run_at__lte=now)
+    oldest = due.order_by('run_at').values_list('run_at', flat=True).first()
+    recent = Job.objects.filter(status='done').order_by('-finished_at').values_list(
+        'run_at', 'started_at', 'finished_at'
+    )[:STATS_WINDOW]
+    wait_ms, run_ms = [], []
+    for run_at, started_at, finished_at in recent:
+        wait_ms.append(max((started_at - run_at).total_seconds(), 0) * 1000)
+        run_ms.append((finished_at - started_at).total_seconds() * 1000)
+    return {
+        # depth — готовые к выполнению; queued включает и отложенные (повторы, delay)
+        'depth': due.count(),
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'done': counts.get('done', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_wait_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'wait_ms': _percentiles(wait_ms),
+        'run_ms': _percentiles(run_ms),
+    }
@@ -0,0 +1,167 @@
+import asyncio
+import importlib
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import clear_url_caches
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mini import cache
+from mini.models import Hackathon, UserProfile
+
+USERNAME = 'bench-async-reader'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает версии read-эндпоинтов: DRF под WSGI (пул потоков), DRF под ASGI и '
+        'mini/async_views под ASGI — запросов в секунду и p50/p99 задержки при заданной '
+        'конкурентности. Запросы идут в обработчики Django внутри процесса, без сети'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32, help='Одновременных запросов (и потоков WSGI)')
+        parser.add_argument('--requests', type=int, default=400, help='Запросов на маршрут в каждом режиме')
+        parser.add_argument('--routes', default='hackathons_list,hackathon_detail,hackathon_dates,messages,my_teams,user_profile')
+        parser.add_argument('--no-cache', action='store_true', help='Чистить кэш ответов перед каждым запросом')
+
+    def handle(self, *args, **options):
+        hackathon = Hackathon.objects.order_by('pk').first()
+        if hackathon is None:
+            raise CommandError('Нет ни одного хакатона: сначала наполните базу')
+        user, _ = User.objects.get_or_create(username=USERNAME)
+        UserProfile.objects.get_or_create(user=user, defaults={'display_name': USERNAME})
+        paths = {
+            'hackathons_list': '/api/hackathons/',
+            'hackathon_detail': f'/api/hackathons/{hackathon.pk}/',
+            'hackathon_dates': '/api/hackathon-dates/',
+            'messages': '/api/messages/',
+            'my_teams': '/api/my_teams/',
+            'user_profile': '/api/profile/',
+        }
+        routes = [name.strip() for name in options['routes'].split(',') if name.strip()]
+        unknown = set(routes) - set(paths)
+        if unknown:
+            raise CommandError(f'Неизвестные маршруты: {", ".join(sorted(unknown))}')
+        self.token = str(AccessToken.for_user(user))
+        self.no_cache = options['no_cache']
+        concurrency, total = options['concurrency'], options['requests']
+        self.stdout.write(f'Конкурентность {concurrency}, запросов на маршрут {total}')
+        self.stdout.write(f'{"маршрут":<18}{"режим":<11}{"rps":>9}{"p50 мс":>9}{"p99 мс":>9}{"ошибок":>8}')
+
+        original_routes = settings.ASYNC_READ_ROUTES
+        try:
+            for name in routes:
+                for mode in ('wsgi', 'asgi-sync', 'asgi'):
+                    self.use_routes({'all'} if mode == 'asgi' else set())
+                    cache.get_cache().clear()
+                    run = self.run_wsgi if mode == 'wsgi' else self.run_asgi
+                    latencies, errors, elapsed = run(paths[name], concurrency, total)
+                    self.report(name, mode, latencies, errors, elapsed)
+        finally:
+            self.use_routes(original_routes)
+            user.delete()
+
+    def use_routes(self, routes):
+        # Маршруты выбираются при импорте urls.py — перечитываем его с новой настройкой
+        settings.ASYNC_READ_ROUTES = routes
+        urlconf = sys.modules.get(settings.ROOT_URLCONF)
+        if urlconf is not None:
+            importlib.reload(urlconf)
+        clear_url_caches()
+
+    def report(self, name, mode, latencies, errors, elapsed):
+        if not latencies:
+            self.stdout.write(f'{name:<18}{mode:<11}{"-":>9}{"-":>9}{"-":>9}{errors:>8}')
+            return
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        rps = len(latencies) / elapsed
+        self.stdout.write(f'{name:<18}{mode:<11}{rps:>9.0f}{p50:>9.1f}{p99:>9.1f}{errors:>8}')
+
+    def run_wsgi(self, path, concurrency, total):
+        handler = WSGIHandler()
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+
+        def one(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': 'bench', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'bench', 'HTTP_AUTHORIZATION': f'Bearer {self.token}',
+                'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False, 'wsgi.version': (1, 0),
+            }
+            status = []
+            if self.no_cache:
+                cache.get_cache().clear()
+            started = time.perf_counter()
+            response = handler(environ, lambda s, headers: status.append(s))
+            b''.join(response)
+            response.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status[0].startswith('200'):
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(total)))
+        return latencies, errors[0], time.perf_counter() - started
+
+    def run_asgi(self, path, concurrency, total):
+        handler = ASGIHandler()
+        latencies, errors = [], [0]
+
+        async def one(semaphore):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'bench'), (b'authorization', f'Bearer {self.token}'.encode())],
+                'server': ('bench', 80), 'client': ('127.0.0.1', 0),
+            }
+            status = []
+            body_sent = asyncio.Event()
+
+            async def receive():
+                if not body_sent.is_set():
+                    body_sent.set()
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # Клиент «не отключается»: Django отменит ожидание после ответа
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                if self.no_cache:
+                    cache.get_cache().clear()
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                elapsed = time.perf_counter() - started
+            if status and status[0] == 200:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            started = time.perf_counter()
+            await asyncio.gather(*(one(semaphore) for _ in range(total)))
+            return time.perf_counter() - started
+
+        elapsed = asyncio.run(main())
+        return latencies, errors[0], elapsed
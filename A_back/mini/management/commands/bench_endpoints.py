@@ -0,0 +1,317 @@
+import hashlib
+import json
+import platform
+import statistics
+import time
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver
+from django.utils import timezone
+from PIL import Image
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from mini import avatars, cache
+from mini.management.commands.seed_bench_data import hot_hackathon_name, username
+from mini.models import Hackathon, HackathonParticipant, LoginCode, Message, Team, TeamMember, UserProfile
+
+PASSWORD = 'bench-password'
+
+# Маршруты backend/urls.py без сценария. admin/ и api-auth/ — include без имени, их обходим целиком
+SKIPPED = {
+    'events': 'поток SSE без конца ответа — задержку запроса не измерить',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет каждый маршрут backend/urls.py на данных seed_bench_data: p50/p95 задержки, число '
+        'SQL-запросов и размер ответа. Запросы идут в Django внутри процесса; пишущие маршруты '
+        'выполняются в транзакции с откатом. --output сохраняет JSON, --baseline сравнивает с '
+        'прошлым запуском и завершается ошибкой при регрессии; --diff сравнивает два файла без замера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Префикс данных seed_bench_data')
+        parser.add_argument('--requests', type=int, default=30, help='Замеров на маршрут')
+        parser.add_argument('--warmup', type=int, default=3, help='Неучитываемых запросов перед замером')
+        parser.add_argument('--routes', default='', help='Только эти маршруты (имена через запятую)')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Не чистить кэш ответов перед запросом (по умолчанию меряем работу с БД)')
+        parser.add_argument('--output', help='Куда записать результаты (JSON)')
+        parser.add_argument('--baseline', help='Результаты прошлого запуска для сравнения')
+        parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help='Сравнить два файла результатов')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Допустимый относительный рост p50/p95 и размера ответа')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Рост задержки меньше этого не считается регрессией (шум)')
+
+    def handle(self, *args, **options):
+        if options['diff']:
+            old, new = (self.load(path) for path in options['diff'])
+            self.compare(old, new, options)
+            return
+        results = self.run(options)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['baseline']:
+            self.compare(self.load(options['baseline']), results, options)
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Не удалось прочитать {path}: {exc}')
+
+    # Замер
+
+    def run(self, options):
+        self.setup_context(options['prefix'])
+        cases = self.cases()
+        missing = [name for name in route_names() if name not in cases and name not in SKIPPED]
+        if missing:
+            raise CommandError(f'Маршруты без сценария: {", ".join(missing)}')
+        selected = [name.strip() for name in options['routes'].split(',') if name.strip()] or sorted(cases)
+        unknown = set(selected) - set(cases)
+        if unknown:
+            raise CommandError(f'Неизвестные маршруты: {", ".join(sorted(unknown))}')
+
+        self.stdout.write(f'{"маршрут":<22}{"код":>5}{"p50 мс":>9}{"p95 мс":>9}{"SQL":>6}{"байт":>9}')
+        routes = {}
+        for name in selected:
+            for _ in range(options['warmup']):
+                self.measure(cases[name], options['warm_cache'])
+            samples = [self.measure(cases[name], options['warm_cache']) for _ in range(options['requests'])]
+            routes[name] = summarize(samples)
+            row = routes[name]
+            self.stdout.write(f'{name:<22}{row["status"]:>5}{row["p50_ms"]:>9.2f}{row["p95_ms"]:>9.2f}'
+                              f'{row["queries"]:>6}{row["bytes"]:>9}')
+        return {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'requests': options['requests'],
+                'warm_cache': options['warm_cache'],
+                'data': {
+                    'hackathons': Hackathon.objects.count(),
+                    'users': User.objects.count(),
+                    'teams': Team.objects.count(),
+                    'team_members': TeamMember.objects.count(),
+                    'messages': Message.objects.count(),
+                },
+            },
+            'routes': routes,
+            'skipped': SKIPPED,
+        }
+
+    def measure(self, case, warm_cache):
+        client = Client()
+        with transaction.atomic():
+            request = case()
+            if not warm_cache:
+                cache.get_cache().clear()
+            headers = {}
+            if request.get('user') is not None:
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {AccessToken.for_user(request["user"])}'
+            method = getattr(client, request['method'])
+            kwargs = {'data': request['data'], 'content_type': 'application/json'} if 'data' in request else {}
+            # settings — переопределения на время запроса (например, доступ к /metrics без токена)
+            with override_settings(**request.get('settings', {})), CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = method(request['path'], **kwargs, **headers)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                elapsed = time.perf_counter() - started
+            # Всё, что создали сценарий и запрос, откатываем: замеры не влияют друг на друга
+            transaction.set_rollback(True)
+        return {'method': request['method'].upper(), 'path': request['path'], 'status': response.status_code,
+                'seconds': elapsed, 'queries': len(queries), 'bytes': len(body)}
+
+    def setup_context(self, prefix):
+        self.prefix = prefix
+        self.hackathon = Hackathon.objects.filter(name=hot_hackathon_name(prefix)).first()
+        self.user = User.objects.filter(username=username(prefix, 0)).first()
+        if self.hackathon is None or self.user is None:
+            raise CommandError(f'Нет данных с префиксом {prefix}: сначала запустите seed_bench_data')
+        self.team = Team.objects.filter(hackathon=self.hackathon, captain=self.user).order_by('pk').first()
+        self.other_team = Team.objects.filter(hackathon=self.hackathon).exclude(captain=self.user).order_by('pk').first()
+        self.admin, created = User.objects.get_or_create(
+            username=f'{prefix}-admin', defaults={'is_staff': True, 'is_superuser': True}
+        )
+        if created or not self.admin.check_password(PASSWORD):
+            self.admin.set_password(PASSWORD)
+            self.admin.save()
+        self.variant = self.ensure_avatar_variant()
+        self.counter = 0
+
+    def ensure_avatar_variant(self):
+        buffer = BytesIO()
+        Image.new('RGB', (256, 256), (40, 120, 200)).save(buffer, 'PNG')
+        avatar_hash = hashlib.sha256(buffer.getvalue()).hexdigest()[:avatars.HASH_LENGTH]
+        # Имена копий зависят только от содержимого: повторный запуск файлов не добавляет
+        avatars.render_variants(BytesIO(buffer.getvalue()), avatar_hash)
+        return avatars.variant_name(avatar_hash, 128, 'webp').rsplit('/', 1)[1]
+
+    def fresh_user(self, participant=False):
+        # Создаётся внутри транзакции замера и откатывается вместе с ней
+        self.counter += 1
+        user = User.objects.create(username=f'{self.prefix}-tmp-{self.counter}', password='!')
+        UserProfile.objects.create(user=user, display_name=user.username)
+        if participant:
+            HackathonParticipant.objects.create(user=user, hackathon=self.hackathon)
+        return user
+
+    def roomy(self, team):
+        Team.objects.filter(pk=team.pk).update(size_max=F('member_count') + 100, is_full=False)
+        return team
+
+    # Сценарии: функция готовит данные и возвращает запрос
+
+    def cases(self):
+        hackathon, user, team = self.hackathon, self.user, self.team
+
+        def login_with_code():
+            code = LoginCode.objects.create(code='BENCH001', telegram_id=f'{self.prefix}-login',
+                                            expires_at=timezone.now() + timedelta(minutes=5))
+            return {'method': 'post', 'path': '/api/login_with_code/', 'data': {'code': code.code}}
+
+        def create_team():
+            return {'method': 'post', 'path': f'/api/hackathons/{hackathon.pk}/create_team/',
+                    'user': self.fresh_user(participant=True), 'data': {'name': 'Bench team', 'size_max': 4}}
+
+        def invite_member():
+            self.roomy(team)
+            return {'method': 'post', 'path': f'/api/teams/{team.pk}/invite/', 'user': user,
+                    'data': {'user_id': self.fresh_user().pk}}
+
+        def bulk_invite():
+            self.roomy(team)
+            user_ids = [self.fresh_user().pk for _ in range(20)]
+            return {'method': 'post', 'path': f'/api/teams/{team.pk}/invite/bulk/', 'user': user,
+                    'data': {'user_ids': user_ids}}
+
+        def join_team_request():
+            self.roomy(self.other_team)
+            return {'method': 'post', 'path': f'/api/teams/{self.other_team.pk}/join/', 'user': self.fresh_user()}
+
+        def respond_message():
+            self.roomy(team)
+            message = Message.objects.create(sender=self.fresh_user(), receiver=user, team=team,
+                                             message_type='join_request', text='bench')
+            return {'method': 'post', 'path': f'/api/messages/{message.pk}/respond/', 'user': user,
+                    'data': {'action': 'accept'}}
+
+        def delete_team():
+            owner = self.fresh_user(participant=True)
+            created = Team.objects.create(name='Bench delete', hackathon=hackathon, captain=owner, member_count=1)
+            TeamMember.objects.create(team=created, user=owner)
+            return {'method': 'delete', 'path': f'/api/teams/{created.pk}/delete/', 'user': owner}
+
+        def get(path, as_user=None):
+            return lambda: {'method': 'get', 'path': path, 'user': as_user}
+
+        return {
+            'login_with_code': login_with_code,
+            'user_profile': get('/api/profile/', user),
+            'get_token': lambda: {'method': 'post', 'path': '/api/token/',
+                                  'data': {'username': self.admin.username, 'password': PASSWORD}},
+            'refresh': lambda: {'method': 'post', 'path': '/api/token/refresh/',
+                                'data': {'refresh': str(RefreshToken.for_user(user))}},
+            'hackathons_list': get('/api/hackathons/'),
+            'hackathon_detail': get(f'/api/hackathons/{hackathon.pk}/'),
+            'search': get('/api/search/?q=python'),
+            'hackathon_dates': get('/api/hackathon-dates/'),
+            'participate_hackathon': lambda: {'method': 'post', 'path': f'/api/hackathons/{hackathon.pk}/participate/',
+                                              'user': self.fresh_user()},
+            'create_team': create_team,
+            'potential_members': get(f'/api/hackathons/{hackathon.pk}/potential_members/', user),
+            'invite_member': invite_member,
+            'bulk_invite': bulk_invite,
+            'available_teams': get(f'/api/hackathons/{hackathon.pk}/available_teams/', user),
+            'join_team_request': join_team_request,
+            'messages': get('/api/messages/', user),
+            'respond_message': respond_message,
+            'my_teams': get('/api/my_teams/', user),
+            'delete_team': delete_team,
+            'cache_stats': get('/api/cache-stats/', self.admin),
+            'job_stats': get('/api/job-stats/', self.admin),
+            'metrics': lambda: {'method': 'get', 'path': '/metrics',
+                                'settings': {'METRICS_TOKEN': '', 'METRICS_ALLOW_LOCALHOST': True}},
+            'avatar_variant': get(f'/media/{avatars.VARIANTS_DIR}/{self.variant}'),
+        }
+
+    # Сравнение
+
+    def compare(self, old, new, options):
+        threshold, min_delta = options['threshold'], options['min_delta_ms']
+        regressions = []
+        self.stdout.write(f'{"маршрут":<22}{"p50 мс":>16}{"p95 мс":>16}{"SQL":>10}{"байт":>18}')
+        for name, row in sorted(new['routes'].items()):
+            base = old['routes'].get(name)
+            if base is None:
+                self.stdout.write(f'{name:<22}  новый маршрут')
+                continue
+            problems = [
+                f'{metric} {base[metric]:.2f} → {row[metric]:.2f}'
+                for metric in ('p50_ms', 'p95_ms')
+                if row[metric] > base[metric] * (1 + threshold) and row[metric] - base[metric] > min_delta
+            ]
+            if row['queries'] > base['queries']:
+                problems.append(f'SQL {base["queries"]} → {row["queries"]}')
+            if row['bytes'] > base['bytes'] * (1 + threshold):
+                problems.append(f'байт {base["bytes"]} → {row["bytes"]}')
+            if row['status'] != base['status']:
+                problems.append(f'код {base["status"]} → {row["status"]}')
+            self.stdout.write(
+                f'{name:<22}{change(base["p50_ms"], row["p50_ms"]):>16}{change(base["p95_ms"], row["p95_ms"]):>16}'
+                f'{change(base["queries"], row["queries"]):>10}{change(base["bytes"], row["bytes"]):>18}'
+                + ('  РЕГРЕССИЯ' if problems else '')
+            )
+            regressions += [f'{name}: {problem}' for problem in problems]
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+
+def route_names():
+    return [pattern.name for pattern in get_resolver().url_patterns if isinstance(pattern, URLPattern) and pattern.name]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(samples):
+    statuses = [sample['status'] for sample in samples]
+    latencies = [sample['seconds'] * 1000 for sample in samples]
+    return {
+        'method': samples[-1]['method'],
+        'path': samples[-1]['path'],
+        'status': statistics.mode(statuses),
+        'errors': sum(status >= 400 for status in statuses),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        # Число запросов и размер детерминированы — берём медиану на случай единичных выбросов
+        'queries': int(statistics.median(sample['queries'] for sample in samples)),
+        'bytes': int(statistics.median(sample['bytes'] for sample in samples)),
+    }
+
+
+def change(old, new):
+    if isinstance(old, float) or isinstance(new, float):
+        text = f'{old:.2f}→{new:.2f}'
+    else:
+        text = f'{old}→{new}'
+    if old:
+        text += f' {(new - old) / old:+.0%}'
+    return text
@@ -0,0 +1,99 @@
+import statistics
+import time
+from datetime import date, time as day_time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from mini.models import Hackathon, Message, Team, UserProfile
+from mini.renderers import ORJSONRenderer, orjson
+from mini.serializers import (
+    HackathonSerializer, MessageSerializer, UserProfileSerializer, hackathon_rows, message_rows, profile_rows,
+)
+
+PREFIX = 'serializer-bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает сериализацию списков из --rows строк: ModelSerializer + JSONRenderer, '
+        'RowSerializer (mini/fast_serializers.py) + JSONRenderer и RowSerializer + ORJSONRenderer. '
+        'Время включает запрос к БД. Данные создаются в транзакции и откатываются; ответы всех вариантов '
+        'сверяются байт в байт'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5, help='Замеров на вариант, берётся медиана')
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1:
+            raise CommandError('--rows должно быть положительным')
+        with transaction.atomic():
+            querysets = self.create(options['rows'])
+            self.stdout.write(f'{"список":<12}{"вариант":<28}{"мс":>10}{"ускорение":>11}')
+            for name, (queryset, serializer_class, rows) in querysets.items():
+                self.compare(name, queryset, serializer_class, rows, options['repeat'])
+            transaction.set_rollback(True)
+
+    def create(self, count):
+        start = date(2030, 1, 1)
+        Hackathon.objects.bulk_create([
+            Hackathon(
+                name=f'{PREFIX} {i}', start_date=start + timedelta(days=i % 365), start_time=day_time(i % 24, i % 60),
+                end_date=start + timedelta(days=i % 365 + 2), category=Hackathon.CATEGORY_CHOICES[i % 10][0],
+                difficulty=Hackathon.DIFFICULTY_CHOICES[i % 3][0], required_roles=['frontend', 'backend'],
+            )
+            for i in range(count)
+        ], batch_size=2000)
+        users = User.objects.bulk_create(
+            [User(username=f'{PREFIX}-{i}', email=f'user{i}@example.com', password='!') for i in range(count)],
+            batch_size=2000,
+        )
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, display_name=f'Пользователь {i}', skills='python, django', bio='bench',
+                        experience_months=i % 60, level=UserProfile.LEVEL_CHOICES[i % 3][0],
+                        avatar_hash=f'{i:016x}' if i % 2 else '')
+            for i, user in enumerate(users)
+        ], batch_size=2000)
+        hackathon = Hackathon.objects.filter(name=f'{PREFIX} 0').get()
+        team = Team.objects.create(name=PREFIX, hackathon=hackathon, captain=users[0])
+        Message.objects.bulk_create([
+            Message(sender=users[i], receiver=users[0], team=team, message_type='join_request',
+                    text=f"В вашу команду '{PREFIX}' хочет присоединиться {users[i].username}. Принять?")
+            for i in range(count)
+        ], batch_size=2000)
+        profiles = UserProfile.objects.filter(user__username__startswith=f'{PREFIX}-').order_by('id')
+        return {
+            'hackathons': (Hackathon.objects.filter(name__startswith=f'{PREFIX} ').order_by('id'),
+                           HackathonSerializer, hackathon_rows),
+            'profiles': (profiles.select_related('user'), UserProfileSerializer, profile_rows),
+            'messages': (Message.objects.filter(team=team).select_related('sender', 'receiver', 'team').order_by('id'),
+                         MessageSerializer, message_rows),
+        }
+
+    def compare(self, name, queryset, serializer_class, rows, repeat):
+        variants = {
+            'ModelSerializer + json': lambda: JSONRenderer().render(serializer_class(queryset.all(), many=True).data),
+            'RowSerializer + json': lambda: JSONRenderer().render(rows.serialize(rows.values(queryset.all()))),
+        }
+        if orjson is not None:
+            variants['RowSerializer + orjson'] = lambda: ORJSONRenderer().render(
+                rows.serialize(rows.values(queryset.all()))
+            )
+        baseline = expected = None
+        for variant, render in variants.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = render()
+                timings.append(time.perf_counter() - started)
+            if expected is None:
+                expected = body
+            elif body != expected:
+                raise CommandError(f'{name}: ответ «{variant}» отличается от ModelSerializer')
+            median = statistics.median(timings)
+            baseline = baseline or median
+            self.stdout.write(f'{name:<12}{variant:<28}{median * 1000:>10.1f}{baseline / median:>10.1f}x')
@@ -1,15 +1,64 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
 from django.utils import timezone
 from datetime import timedelta
 from mini.models import LoginCode
 
 
 class Command(BaseCommand):
-    help = 'Удаляет коды входа старше 2 месяцев'
+    help = (
+        'Удаляет истёкшие и использованные коды входа небольшими пачками. '
+        'С --continuous работает как лёгкий периодический воркер'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Кодов в одном DELETE')
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help='Пауза между пачками, секунд: даёт пройти записи бота и веба')
+        parser.add_argument('--grace-minutes', type=int, default=0,
+                            help='Сколько хранить код после истечения (использованный — после выдачи)')
+        parser.add_argument('--continuous', action='store_true', help='Повторять очистку бесконечно')
+        parser.add_argument('--interval', type=float, default=60, help='Пауза между проходами в режиме --continuous')
 
     def handle(self, *args, **options):
-        cutoff = timezone.now() - timedelta(days=60)
-        deleted, _ = LoginCode.objects.filter(created_at__lt=cutoff).delete()
-        self.stdout.write(
-            self.style.SUCCESS(f'Удалено {deleted} старых кодов входа (старше 2 месяцев)')
+        if not options['continuous']:
+            self.purge(options)
+            return
+        self.stdout.write(f'Непрерывная очистка каждые {options["interval"]:g} с (Ctrl+C для остановки)')
+        try:
+            while True:
+                self.purge(options)
+                # Воркер живёт долго: не держим соединение между проходами
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено')
+
+    def purge(self, options):
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        # Истёкшие — по индексу expires_at, использованные — по частичному индексу logincode_used_idx.
+        # Время использования не хранится: код живёт минуты, поэтому отсчитываем от выдачи
+        deleted = self.purge_batches(LoginCode.objects.filter(expires_at__lt=cutoff), 'истёкших', options)
+        deleted += self.purge_batches(
+            LoginCode.objects.filter(used=True, created_at__lt=cutoff), 'использованных', options
         )
+        self.stdout.write(self.style.SUCCESS(f'Удалено {deleted} кодов входа'))
+        return deleted
+
+    def purge_batches(self, queryset, label, options):
+        batch_size = options['batch_size']
+        total = 0
+        while True:
+            ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            # Каждая пачка — отдельная короткая транзакция (autocommit)
+            deleted, _ = LoginCode.objects.filter(pk__in=ids).delete()
+            total += deleted
+            if options['verbosity'] >= 1:
+                self.stdout.write(f'  {label}: удалено {total}')
+            if len(ids) < batch_size:
+                return total
+            time.sleep(options['sleep'])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from mini import avatars
+from mini.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии аватаров, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Проверить все аватары, а не только те, у которых нет копий')
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True)
+        if not options['all']:
+            profiles = profiles.filter(avatar_hash='')
+        processed = failed = 0
+        for profile_id in profiles.values_list('pk', flat=True).iterator():
+            try:
+                processed += avatars.process(profile_id)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'Профиль {profile_id}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Обработано аватаров: {processed}, с ошибками: {failed}'))
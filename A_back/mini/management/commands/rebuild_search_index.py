@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from mini import search
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересобирает полнотекстовый индекс хакатонов и профилей'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано документов: {count}'))
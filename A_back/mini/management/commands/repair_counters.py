@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from mini import cache
+from mini.models import Hackathon, Team
+
+
+class Command(BaseCommand):
+    help = 'Проверяет и исправляет денормализованные счётчики команд и хакатонов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Только сообщить о расхождениях, не исправляя')
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        fixed = 0
+        with transaction.atomic():
+            teams = Team.objects.annotate(actual=Count('teammember')).filter(
+                ~Q(member_count=F('actual')) | ~Q(is_full=Q(actual__gte=F('size_max')))
+            )
+            for team in teams:
+                self.stdout.write(f'Команда {team.pk}: member_count={team.member_count}, фактически {team.actual}')
+                if not check_only:
+                    Team.objects.filter(pk=team.pk).update(
+                        member_count=team.actual, is_full=team.actual >= team.size_max, updated_at=timezone.now()
+                    )
+                fixed += 1
+
+            hackathons = Hackathon.objects.annotate(
+                actual_teams=Count('team', distinct=True),
+                actual_participants=Count(
+                    'hackathonparticipant', filter=Q(hackathonparticipant__status='active'), distinct=True
+                ),
+            ).filter(~Q(registered_teams=F('actual_teams')) | ~Q(participants_count=F('actual_participants')))
+            for hackathon in hackathons:
+                self.stdout.write(
+                    f'Хакатон {hackathon.pk}: команд {hackathon.registered_teams} (фактически {hackathon.actual_teams}), '
+                    f'участников {hackathon.participants_count} (фактически {hackathon.actual_participants})'
+                )
+                if not check_only:
+                    Hackathon.objects.filter(pk=hackathon.pk).update(
+                        registered_teams=hackathon.actual_teams,
+                        participants_count=hackathon.actual_participants,
+                        updated_at=timezone.now(),
+                    )
+                    cache.bump(cache.CATALOG, cache.hackathon_namespace(hackathon.pk))
+                fixed += 1
+
+        if check_only:
+            self.stdout.write(f'Найдено расхождений: {fixed}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено счётчиков: {fixed}'))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mini import jobs
+
+PURGE_EVERY = 600
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди фоновых задач (mini/jobs.py). Несколько воркеров можно '
+        'запускать параллельно: задача достаётся одному из них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и выйти')
+        parser.add_argument('--batch', type=int, default=20, help='Задач за один проход')
+        parser.add_argument('--sleep', type=float, default=1, help='Пауза, когда очередь пуста, секунд')
+        parser.add_argument('--lease', type=int, default=jobs.LEASE_SECONDS,
+                            help='Аренда задачи, секунд: после неё задачу упавшего воркера возьмёт другой')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            total = jobs.run_pending(options['batch'])
+            self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {total}'))
+            return
+        self.stdout.write('Воркер задач запущен (Ctrl+C для остановки)')
+        purged_at = 0
+        try:
+            while True:
+                done, failed = jobs.work(options['batch'], options['lease'])
+                if done or failed:
+                    self.stdout.write(f'Выполнено {done}, с ошибкой {failed}')
+                if time.monotonic() - purged_at > PURGE_EVERY:
+                    jobs.purge_done()
+                    purged_at = time.monotonic()
+                # Воркер живёт долго: не держим соединение между проходами
+                close_old_connections()
+                if not done and not failed:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено')
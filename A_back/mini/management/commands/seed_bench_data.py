@@ -0,0 +1,191 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from mini import cache, search
+from mini.models import Hackathon, HackathonParticipant, Message, Team, TeamMember, UserProfile
+from mini.recommendations import ROLE_KEYWORDS, skill_index
+
+BASE_DATE = date(2030, 1, 1)
+CATEGORIES = [value for value, _ in Hackathon.CATEGORY_CHOICES]
+DIFFICULTIES = [value for value, _ in Hackathon.DIFFICULTY_CHOICES]
+LEVELS = [value for value, _ in UserProfile.LEVEL_CHOICES]
+SKILLS = sorted({skill for keywords in ROLE_KEYWORDS.values() for skill in keywords})
+ROLES = sorted(ROLE_KEYWORDS)
+
+
+def hot_hackathon_name(prefix):
+    return f'{prefix} hackathon 0'
+
+
+def username(prefix, index):
+    return f'{prefix}-{index:06d}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет БД синтетическими данными для bench_endpoints: хакатоны, пользователи с профилями, '
+        'участники, команды и сообщения через bulk_create. Хакатон «<prefix> hackathon 0» — крупное '
+        'событие на --hot-teams команд, пользователь <prefix>-000000 — капитан с --hot-messages входящими. '
+        'Одинаковые --seed и размеры дают одинаковые данные'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hackathons', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--participants', type=int, default=50, help='Участников обычного хакатона')
+        parser.add_argument('--hot-teams', type=int, default=500, help='Команд в крупном хакатоне')
+        parser.add_argument('--messages', type=int, default=200000)
+        parser.add_argument('--hot-messages', type=int, default=5000, help='Входящих у <prefix>-000000')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--clear', action='store_true', help='Удалить ранее созданные данные с этим префиксом')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['users'] < 10 or options['hackathons'] < 1:
+            raise CommandError('Нужно хотя бы 10 пользователей и 1 хакатон')
+        existing = Hackathon.objects.filter(name__startswith=f'{prefix} ').exists()
+        if existing and not options['clear']:
+            raise CommandError(f'Данные с префиксом {prefix} уже есть: добавьте --clear')
+        started = time.perf_counter()
+        if options['clear']:
+            self.clear(prefix)
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            hackathons = self.create_hackathons(prefix, options['hackathons'])
+            users = self.create_users(prefix, options['users'])
+            teams = self.create_teams(prefix, hackathons, users, options['participants'], options['hot_teams'])
+            self.create_messages(teams, users, options['messages'], options['hot_messages'])
+        # bulk_create не шлёт сигналов: индексы и кэш каталога обновляем сами
+        search.rebuild()
+        skill_index.rebuild()
+        cache.bump(cache.CATALOG)
+        self.stdout.write(self.style.SUCCESS(f'Готово за {time.perf_counter() - started:.1f} с'))
+
+    def clear(self, prefix):
+        deleted, _ = Hackathon.objects.filter(name__startswith=f'{prefix} ').delete()
+        deleted_users, _ = User.objects.filter(username__startswith=f'{prefix}-').delete()
+        self.stdout.write(f'Удалено записей: {deleted + deleted_users}')
+
+    def bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.stdout.write(f'  {model._meta.verbose_name_plural}: {len(created)}')
+        return created
+
+    def create_hackathons(self, prefix, count):
+        rng = self.rng
+        hackathons = []
+        for i in range(count):
+            start = BASE_DATE + timedelta(days=rng.randrange(730))
+            hackathons.append(Hackathon(
+                name=f'{prefix} hackathon {i}',
+                start_date=start,
+                end_date=start + timedelta(days=rng.randint(1, 3)),
+                category=rng.choice(CATEGORIES),
+                difficulty=rng.choice(DIFFICULTIES),
+                max_teams=rng.choice([10, 20, 30]),
+                team_size_min=2,
+                team_size_max=rng.choice([3, 4, 5]),
+                required_roles=rng.sample(ROLES, 3),
+                partners=' '.join(rng.sample(SKILLS, 2)),
+                registration_deadline=start - timedelta(days=7),
+            ))
+        return self.bulk(Hackathon, hackathons)
+
+    def create_users(self, prefix, count):
+        rng = self.rng
+        # '!' — непригодный пароль: make_password(None) дал бы случайную строку
+        users = self.bulk(User, [User(username=username(prefix, i), password='!') for i in range(count)])
+        self.bulk(UserProfile, [
+            UserProfile(
+                user=user,
+                display_name=f'User {i}',
+                skills=', '.join(rng.sample(SKILLS, rng.randint(1, 5))),
+                experience_months=rng.randrange(120),
+                level=rng.choice(LEVELS),
+                bio=f'Bench user {i}',
+                is_telegram_user=i % 2 == 0,
+                telegram_id=str(10 ** 9 + i) if i % 2 == 0 else None,
+            )
+            for i, user in enumerate(users)
+        ])
+        return users
+
+    def create_teams(self, prefix, hackathons, users, participants_per_hackathon, hot_teams):
+        rng = self.rng
+        participants, teams, members = [], [], []
+        for index, hackathon in enumerate(hackathons):
+            if index == 0:
+                # Крупное событие: капитан первой команды — пользователь 0
+                size = min(len(users), max(hot_teams * 3, participants_per_hackathon))
+                chosen = [0] + rng.sample(range(1, len(users)), size - 1)
+                team_limit = hot_teams
+            else:
+                chosen = rng.sample(range(len(users)), min(len(users), participants_per_hackathon))
+                team_limit = rng.randint(0, hackathon.max_teams)
+            participants += [HackathonParticipant(user=users[i], hackathon=hackathon) for i in chosen]
+            hackathon.participants_count = len(chosen)
+            position = 0
+            hackathon_teams = []
+            while len(hackathon_teams) < team_limit and position < len(chosen):
+                size = rng.randint(1, hackathon.team_size_max)
+                team_users = chosen[position:position + size]
+                position += size
+                team = Team(
+                    name=f'{prefix} team {index}-{len(hackathon_teams)}',
+                    hackathon=hackathon,
+                    captain=users[team_users[0]],
+                    size_min=hackathon.team_size_min,
+                    size_max=hackathon.team_size_max,
+                    member_count=len(team_users),
+                    is_full=len(team_users) >= hackathon.team_size_max,
+                )
+                team.user_indexes = team_users
+                hackathon_teams.append(team)
+            hackathon.registered_teams = len(hackathon_teams)
+            teams += hackathon_teams
+        self.bulk(HackathonParticipant, participants)
+        Hackathon.objects.bulk_update(hackathons, ['participants_count', 'registered_teams'], batch_size=self.batch_size)
+        created = self.bulk(Team, teams)
+        for team, source in zip(created, teams):
+            members += [TeamMember(team=team, user=users[i], status='joined') for i in source.user_indexes]
+        self.bulk(TeamMember, members)
+        return created
+
+    def create_messages(self, teams, users, count, hot_count):
+        rng = self.rng
+        if not teams:
+            return
+        statuses = ['pending'] * 6 + ['accepted', 'declined']
+        messages = []
+        hot_team = teams[0]
+        for i in range(hot_count):
+            sender = users[rng.randrange(1, len(users))]
+            messages.append(Message(
+                sender=sender, receiver=hot_team.captain, team=hot_team, message_type='join_request',
+                status=rng.choice(statuses),
+                text=f"В вашу команду '{hot_team.name}' хочет присоединиться {sender.username}. Принять?",
+            ))
+        for i in range(count):
+            team = rng.choice(teams)
+            other = users[rng.randrange(len(users))]
+            if rng.random() < 0.5:
+                messages.append(Message(
+                    sender=team.captain, receiver=other, team=team, message_type='team_invite',
+                    status=rng.choice(statuses),
+                    text=f"Вас приглашают в команду '{team.name}'. Желаете вступить?",
+                ))
+            else:
+                messages.append(Message(
+                    sender=other, receiver=team.captain, team=team, message_type='join_request',
+                    status=rng.choice(statuses),
+                    text=f"В вашу команду '{team.name}' хочет присоединиться {other.username}. Принять?",
+                ))
+        self.bulk(Message, messages)
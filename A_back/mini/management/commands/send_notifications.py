@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from mini import notifications
+
+PURGE_EVERY = 600
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет уведомления из очереди в Telegram с учётом лимитов Bot API '
+        '(mini/notifications.py). Запускайте один процесс: лимиты считаются в его памяти'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Один проход по готовым чатам и выход')
+        parser.add_argument('--batch', type=int, default=100, help='Чатов за один проход')
+        parser.add_argument('--sleep', type=float, default=0.5, help='Пауза, когда отправлять нечего, секунд')
+
+    def handle(self, *args, **options):
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError('Не задан TELEGRAM_BOT_TOKEN')
+        sender = notifications.Sender()
+        if options['once']:
+            sender.send_pending(options['batch'])
+            self.report(sender)
+            return
+        self.stdout.write('Отправка уведомлений запущена (Ctrl+C для остановки)')
+        purged_at = 0
+        try:
+            while True:
+                sent = sender.send_pending(options['batch'])
+                if time.monotonic() - purged_at > PURGE_EVERY:
+                    notifications.purge_sent()
+                    purged_at = time.monotonic()
+                # Процесс живёт долго: не держим соединение между проходами
+                close_old_connections()
+                if not sent:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.report(sender)
+            self.stdout.write('Остановлено')
+
+    def report(self, sender):
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in sender.counts.items()))
@@ -0,0 +1,105 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from mini import counters
+from mini.models import Hackathon, HackathonParticipant, LoginCode
+
+PREFIX = 'bench-sqlite'
+
+
+class Command(BaseCommand):
+    help = (
+        'Одновременная запись LoginCode (как бот) и HackathonParticipant (как веб-воркеры) '
+        'в настроенную БД; считает ошибки блокировки. Сравните запуск с SQLITE_TUNING=1 и без'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Потоков каждого типа')
+        parser.add_argument('--inserts', type=int, default=100, help='Вставок на поток')
+
+    def handle(self, *args, **options):
+        threads, inserts = options['threads'], options['inserts']
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        self.stdout.write(f'journal_mode={journal_mode}, потоков: {threads}+{threads}, вставок на поток: {inserts}')
+
+        self.cleanup()
+        hackathon = Hackathon.objects.create(
+            name=PREFIX, start_date=date.today() + timedelta(days=30), end_date=date.today() + timedelta(days=31)
+        )
+        users = User.objects.bulk_create(
+            User(username=f'{PREFIX}-{i}') for i in range(threads * inserts)
+        )
+
+        errors = []
+        done = [0]
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads * 2)
+
+        def run(work):
+            barrier.wait()
+            try:
+                for i in range(inserts):
+                    try:
+                        work(i)
+                        with lock:
+                            done[0] += 1
+                    except OperationalError as exc:
+                        with lock:
+                            errors.append(str(exc))
+            finally:
+                connection.close()
+
+        def issue_codes(worker):
+            def work(i):
+                LoginCode.objects.create(
+                    code=f'{worker:02d}{i:06d}',
+                    telegram_id=f'{PREFIX}-{worker}',
+                    expires_at=timezone.now() + timedelta(minutes=5),
+                )
+            return work
+
+        def register(worker):
+            # Как ParticipateHackathonView: чтение, затем запись в одной транзакции
+            def work(i):
+                with transaction.atomic():
+                    _, created = HackathonParticipant.objects.get_or_create(
+                        user=users[worker * inserts + i], hackathon=hackathon, defaults={'status': 'active'}
+                    )
+                    if created:
+                        counters.change_hackathon_participants(hackathon.id, 1)
+            return work
+
+        workers = [threading.Thread(target=run, args=(issue_codes(w),)) for w in range(threads)]
+        workers += [threading.Thread(target=run, args=(register(w),)) for w in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        total = threads * inserts * 2
+        self.stdout.write(
+            f'Успешно: {done[0]}/{total} за {elapsed:.2f} с ({done[0] / elapsed:.0f} вставок/с), '
+            f'ошибок блокировки: {len(errors)}'
+        )
+        for message in sorted(set(errors)):
+            self.stdout.write(f'  {message}: {errors.count(message)}')
+        self.cleanup()
+        if errors:
+            self.stdout.write(self.style.WARNING('Есть ошибки блокировки'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Ошибок блокировки нет'))
+
+    def cleanup(self):
+        LoginCode.objects.filter(telegram_id__startswith=PREFIX).delete()
+        Hackathon.objects.filter(name=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
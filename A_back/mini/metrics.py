@@ -0,0 +1,329 @@
+"""
+Метрики в текстовом формате Prometheus, общие для веб-воркеров, бота и фоновых процессов.
+
+Каждый процесс копит счётчики и гистограммы в памяти. Если задан
+METRICS_DIR, процесс не чаще раза в FLUSH_SECONDS (и при выходе) сохраняет
+их в METRICS_DIR/<pid>-<id>.json, а эндпоинт /metrics складывает файлы всех
+процессов: gunicorn с несколькими воркерами, бот (bot/main/bot.py), run_jobs
+и send_notifications видны одним набором рядов. Файлы завершившихся
+процессов при сборе сливаются в merged.json, так что счётчики не
+сбрасываются после рестарта. Каталог общий для процессов одной машины;
+значения отстают от текущих не больше чем на FLUSH_SECONDS. Без
+METRICS_DIR /metrics отдаёт значения только своего процесса.
+
+    metrics.inc('bot_login_codes_issued_total')
+    metrics.observe('bot_handler_duration_seconds', 0.12, handler='login')
+
+Ряды объявляются в METRICS; глубина очередей считается запросом к БД при сборе.
+"""
+import atexit
+import bisect
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+FLUSH_SECONDS = 1.0
+MERGED = 'merged.json'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Остальные методы — в один ряд method="other", чтобы не плодить ряды
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# name: (тип, описание, границы корзин гистограммы)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP-запросы по маршруту, методу и коду ответа', None),
+    'http_request_duration_seconds': ('histogram', 'Время ответа по маршруту', LATENCY_BUCKETS),
+    'http_request_db_queries': ('histogram', 'SQL-запросов на HTTP-запрос', QUERY_BUCKETS),
+    'http_request_db_seconds': ('histogram', 'Время в БД на HTTP-запрос', LATENCY_BUCKETS),
+    'login_codes_redeemed_total': ('counter', 'Попытки входа по коду из бота (LoginWithCodeView) по результату', None),
+    'bot_login_codes_issued_total': ('counter', 'Коды входа, выданные ботом', None),
+    'bot_handler_duration_seconds': ('histogram', 'Время обработки команды бота', LATENCY_BUCKETS),
+    'bot_handler_errors_total': ('counter', 'Команды бота, завершившиеся ошибкой', None),
+    'jobs_processed_total': ('counter', 'Выполненные фоновые задачи по имени и результату', None),
+    'job_duration_seconds': ('histogram', 'Время выполнения фоновой задачи', LATENCY_BUCKETS),
+    'telegram_notifications_total': ('counter', 'Сообщения отправителя уведомлений по результату', None),
+    'job_queue_depth': ('gauge', 'Готовые к выполнению фоновые задачи', None),
+    'job_queue_oldest_wait_seconds': ('gauge', 'Ожидание самой старой готовой задачи', None),
+    'telegram_notifications_pending': ('gauge', 'Неотправленные уведомления в Telegram', None),
+}
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+class Store:
+    """Значения одного процесса; после fork начинаются заново"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.name = f'{self.pid}-{uuid.uuid4().hex[:8]}.json'
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.dirty = False
+        self.flushed_at = time.monotonic()
+
+    def _check_fork(self):
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self._check_fork()
+            self.counters[_key(name, labels)] += value
+            self.dirty = True
+        self.maybe_flush()
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        with self.lock:
+            self._check_fork()
+            key = _key(name, labels)
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+            histogram['buckets'][bisect.bisect_left(buckets, value)] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+            self.dirty = True
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self.lock:
+            self._check_fork()
+            return json.loads(json.dumps({'counters': self.counters, 'histograms': self.histograms}))
+
+    def maybe_flush(self):
+        if self.dirty and time.monotonic() - self.flushed_at >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        with self.lock:
+            self._check_fork()
+            if not self.dirty:
+                return
+            payload = json.dumps({'counters': self.counters, 'histograms': self.histograms}, ensure_ascii=False)
+            self.dirty = False
+            self.flushed_at = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        temporary = os.path.join(directory, f'.{self.name}.{threading.get_ident()}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(payload)
+        os.replace(temporary, os.path.join(directory, self.name))
+
+
+store = Store()
+inc = store.inc
+observe = store.observe
+atexit.register(store.flush)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _add(total, data):
+    for key, value in data['counters'].items():
+        total['counters'][key] = total['counters'].get(key, 0) + value
+    for key, histogram in data['histograms'].items():
+        into = total['histograms'].get(key)
+        if into is None or len(into['buckets']) != len(histogram['buckets']):
+            total['histograms'][key] = {'buckets': list(histogram['buckets']), 'sum': histogram['sum'],
+                                        'count': histogram['count']}
+            continue
+        into['buckets'] = [a + b for a, b in zip(into['buckets'], histogram['buckets'])]
+        into['sum'] += histogram['sum']
+        into['count'] += histogram['count']
+
+
+def _compact(directory):
+    """Сливает файлы завершившихся процессов в merged.json"""
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        merged_path = os.path.join(directory, MERGED)
+        merged = _read(merged_path) or {'counters': {}, 'histograms': {}}
+        dead = []
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name == MERGED:
+                continue
+            pid = name.split('-', 1)[0]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                data = _read(os.path.join(directory, name))
+                if data is not None:
+                    _add(merged, data)
+                dead.append(name)
+        if not dead:
+            return
+        temporary = merged_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(merged, file, ensure_ascii=False)
+        os.replace(temporary, merged_path)
+        for name in dead:
+            os.remove(os.path.join(directory, name))
+
+
+def collect():
+    """Сумма значений всех процессов: {'counters': {key: value}, 'histograms': {key: {...}}}"""
+    total = {'counters': {}, 'histograms': {}}
+    directory = settings.METRICS_DIR
+    if not directory:
+        _add(total, store.snapshot())
+        return total
+    # Свой процесс — из памяти: свежее файла, который пишется не чаще FLUSH_SECONDS
+    _add(total, store.snapshot())
+    store.flush()
+    if not os.path.isdir(directory):
+        return total
+    _compact(directory)
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json') and name != store.name:
+            data = _read(os.path.join(directory, name))
+            if data is not None:
+                _add(total, data)
+    return total
+
+
+def _gauges():
+    from . import jobs
+    from .models import Notification
+
+    stats = jobs.stats()
+    return {
+        _key('job_queue_depth', {}): stats['depth'],
+        _key('job_queue_oldest_wait_seconds', {}): stats['oldest_wait_seconds'],
+        _key('telegram_notifications_pending', {}): Notification.objects.filter(status='pending').count(),
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _series(name, labels, value, suffix='', extra=()):
+    pairs = [*labels, *extra]
+    label_text = '{' + ','.join(f'{key}="{_escape(label)}"' for key, label in pairs) + '}' if pairs else ''
+    return f'{name}{suffix}{label_text} {_number(value)}'
+
+
+def render():
+    """Текстовый формат Prometheus 0.0.4"""
+    data = collect()
+    values = defaultdict(list)
+    for key, value in {**data['counters'], **_gauges()}.items():
+        name, labels = json.loads(key)
+        values[name].append((labels, value))
+    for key, histogram in data['histograms'].items():
+        name, labels = json.loads(key)
+        values[name].append((labels, histogram))
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(values.get(name, []), key=lambda item: item[0]):
+            if kind != 'histogram':
+                lines.append(_series(name, labels, value))
+                continue
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), value['buckets']):
+                cumulative += count
+                le = bound if bound == '+Inf' else f'{bound:g}'
+                lines.append(_series(name, labels, cumulative, '_bucket', [('le', le)]))
+            lines.append(_series(name, labels, value['sum'], '_sum'))
+            lines.append(_series(name, labels, value['count'], '_count'))
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """
+    Время ответа, код и SQL каждого запроса по имени маршрута из backend/urls.py.
+
+    Гибридный: под ASGI цепочка middleware остаётся асинхронной. SQL там
+    выполняется не в потоке event loop, а обёртки execute_wrapper действуют
+    только в своём потоке, поэтому в async-режиме гистограммы БД
+    (http_request_db_*) не пишутся — их дают WSGI-воркеры.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        route = self.record(request, response, time.perf_counter() - started)
+        observe('http_request_db_queries', counter.queries, route=route)
+        observe('http_request_db_seconds', counter.seconds, route=route)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, elapsed):
+        match = request.resolver_match
+        route = match.url_name if match is not None and match.url_name else 'unmatched'
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        inc('http_requests_total', route=route, method=method, status=str(response.status_code))
+        observe('http_request_duration_seconds', elapsed, route=route, method=method)
+        return route
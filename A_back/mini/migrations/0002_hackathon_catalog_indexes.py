@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hackathon',
+            index=models.Index(fields=['start_date', 'category', 'difficulty'], name='hackathon_start_cat_diff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hackathon',
+            index=models.Index(fields=['category', 'difficulty', 'start_date'], name='hackathon_cat_diff_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hackathon',
+            index=models.Index(fields=['registration_deadline', 'start_date'], name='hackathon_deadline_start_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:25
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Hackathon = apps.get_model('mini', 'Hackathon')
+    Team = apps.get_model('mini', 'Team')
+    TeamMember = apps.get_model('mini', 'TeamMember')
+    HackathonParticipant = apps.get_model('mini', 'HackathonParticipant')
+
+    def count_of(queryset, field):
+        counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(c=Count('pk')).values('c')
+        return Coalesce(Subquery(counted), Value(0))
+
+    Team.objects.update(member_count=count_of(TeamMember.objects.all(), 'team'))
+    Team.objects.update(is_full=Case(When(member_count__gte=F('size_max'), then=Value(True)), default=Value(False)))
+    Hackathon.objects.update(
+        registered_teams=count_of(Team.objects.all(), 'hackathon'),
+        participants_count=count_of(HackathonParticipant.objects.filter(status='active'), 'hackathon'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini', '0004_message_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hackathon',
+            name='participants_count',
+            field=models.IntegerField(default=0, verbose_name='Количество активных участников'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS mini_search USING fts5("
+    "kind UNINDEXED, object_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+POSTGRES_CREATE = [
+    "CREATE TABLE IF NOT EXISTS mini_search ("
+    "kind varchar(20) NOT NULL, object_id bigint NOT NULL, title text NOT NULL, body text NOT NULL, "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')"
+    ") STORED, PRIMARY KEY (kind, object_id))",
+    "CREATE INDEX IF NOT EXISTS mini_search_document_gin ON mini_search USING GIN (document)",
+]
+
+
+def create_search_table(apps, schema_editor):
+    connection = schema_editor.connection
+    statements = POSTGRES_CREATE if connection.vendor == 'postgresql' else [SQLITE_CREATE]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+    Hackathon = apps.get_model('mini', 'Hackathon')
+    UserProfile = apps.get_model('mini', 'UserProfile')
+    rows = [
+        ('hackathon', 1, h.pk, h.name, h.partners or '') for h in Hackathon.objects.all()
+    ] + [
+        ('profile', 2, p.pk, p.display_name, f'{p.bio or ""}\n{p.skills or ""}') for p in UserProfile.objects.all()
+    ]
+    with connection.cursor() as cursor:
+        for kind, code, object_id, title, body in rows:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'INSERT INTO mini_search (kind, object_id, title, body) VALUES (%s, %s, %s, %s)',
+                    [kind, object_id, title, body],
+                )
+            else:
+                cursor.execute(
+                    'INSERT INTO mini_search (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+                    [object_id * 8 + code, kind, object_id, title, body],
+                )
+
+
+def drop_search_table(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS mini_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini', '0005_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
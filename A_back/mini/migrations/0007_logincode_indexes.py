@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logincode',
+            index=models.Index(fields=['telegram_id', 'used', 'expires_at'], name='logincode_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logincode',
+            index=models.Index(fields=['expires_at'], name='logincode_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini', '0011_conditional_get_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logincode',
+            index=models.Index(condition=models.Q(('used', True)), fields=['created_at'], name='logincode_used_idx'),
+        ),
+    ]
@@ -10,6 +10,16 @@ class LoginCode(models.Model):
     used = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Поиск действующего кода ботом: telegram_id + used + expires_at
+            models.Index(fields=['telegram_id', 'used', 'expires_at'], name='logincode_lookup_idx'),
+            # Очистка истёкших кодов пачками (cleanup_codes)
+            models.Index(fields=['expires_at'], name='logincode_expires_idx'),
+            # Очистка использованных кодов: частичный индекс только по used=True
+            models.Index(fields=['created_at'], condition=models.Q(used=True), name='logincode_used_idx'),
+        ]
+
     @property
     def is_expired(self):
         return timezone.now() > self.expires_at
@@ -30,6 +40,8 @@ class UserProfile(models.Model):
     # Профильные данные
     display_name = models.CharField(max_length=100, blank=True, verbose_name='Отображаемое имя')
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Хэш содержимого аватара; заполняется, когда готовы уменьшенные копии (mini/avatars.py)
+    avatar_hash = models.CharField(max_length=16, blank=True, default='')
     bio = models.TextField(blank=True, verbose_name='О себе')
     skills = models.TextField(blank=True, verbose_name='Стек технологий')
     experience_months = models.IntegerField(default=0, verbose_name='Опыт в месяцах')
@@ -40,6 +52,8 @@ class UserProfile(models.Model):
         verbose_name='Уровень'
     )
     hackathons_participated = models.IntegerField(default=0, verbose_name='Количество участий в хакатонах')
+    # Валидатор условных GET профиля (mini/conditional.py); UPDATE в обход save() ставят его сами
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Профиль пользователя'
@@ -104,6 +118,7 @@ class Hackathon(models.Model):
     team_size_min = models.IntegerField(default=2, verbose_name='Минимальный размер команды')
     team_size_max = models.IntegerField(default=4, verbose_name='Максимальный размер команды')
     registered_teams = models.IntegerField(default=0, verbose_name='Количество зарегистрированных команд')
+    participants_count = models.IntegerField(default=0, verbose_name='Количество активных участников')
     required_roles = models.JSONField(
         default=list,
         verbose_name='Требуемые роли',
@@ -111,11 +126,19 @@ class Hackathon(models.Model):
     )
     partners = models.TextField(blank=True, verbose_name='Партнёры поддержки')
     registration_deadline = models.DateField(verbose_name='Крайний срок регистрации', null=True, blank=True)
+    # Валидатор условных GET каталога (mini/conditional.py), в том числе после UPDATE счётчиков
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Хакатон'
         verbose_name_plural = 'Хакатоны'
         ordering = ['start_date']
+        indexes = [
+            models.Index(fields=['start_date', 'category', 'difficulty'], name='hackathon_start_cat_diff_idx'),
+            models.Index(fields=['category', 'difficulty', 'start_date'], name='hackathon_cat_diff_start_idx'),
+            models.Index(fields=['registration_deadline', 'start_date'], name='hackathon_deadline_start_idx'),
+            models.Index(fields=['updated_at'], name='hackathon_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -127,7 +150,7 @@ class Hackathon(models.Model):
 
     @property
     def total_registered_participants(self):
-        return HackathonParticipant.objects.filter(hackathon=self, status='active').count()
+        return self.participants_count
 
 class HackathonParticipant(models.Model):
     PARTICIPANT_CHOICES = [
@@ -154,12 +177,20 @@ class Team(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     size_min = models.IntegerField(default=2)
     size_max = models.IntegerField(default=4)
+    # Число записей TeamMember (приглашённые и вступившие), см. mini/counters.py
+    member_count = models.IntegerField(default=0)
     is_full = models.BooleanField(default=False)
+    # Меняется и при смене состава (mini/counters.py): от него зависит ETag страницы хакатона
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('name', 'hackathon')
         verbose_name = 'Команда'
         verbose_name_plural = 'Команды'
+        indexes = [
+            models.Index(fields=['hackathon', 'created_at', 'id'], name='team_hackathon_created_idx'),
+            models.Index(fields=['hackathon', 'updated_at'], name='team_hackathon_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.hackathon.name})"
@@ -194,10 +225,82 @@ class Message(models.Model):
     status = models.CharField(max_length=20, choices=[('pending', 'Ожидание'), ('accepted', 'Принято'), ('declined', 'Отклонено')], default='pending')
     text = models.TextField()
     sent_at = models.DateTimeField(auto_now_add=True)
+    # Маркер изменения для инкрементальной синхронизации (создание и смена статуса)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Сообщение'
         verbose_name_plural = 'Сообщения'
+        indexes = [
+            models.Index(fields=['receiver', '-sent_at', '-id'], name='message_receiver_sent_idx'),
+            models.Index(fields=['sender', '-sent_at', '-id'], name='message_sender_sent_idx'),
+            models.Index(fields=['receiver', 'updated_at', 'id'], name='message_receiver_upd_idx'),
+            models.Index(fields=['sender', 'updated_at', 'id'], name='message_sender_upd_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender} to {self.receiver}"
+
+class Job(models.Model):
+    """Фоновая задача очереди mini/jobs.py; выполняет её `python manage.py run_jobs`"""
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Не раньше этого времени: задержка при постановке и пауза между повторами
+    run_at = models.DateTimeField(default=timezone.now)
+    # Аренда воркера: если воркер упал, после этого времени задачу возьмёт другой
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+class Notification(models.Model):
+    """Исходящее уведомление в Telegram; отправляет `python manage.py send_notifications`"""
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает отправки'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    chat_id = models.CharField(max_length=50)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, null=True, blank=True)
+    text = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Не раньше этого времени: окно объединения и пауза между повторами
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+            models.Index(fields=['chat_id', 'status'], name='notification_chat_idx'),
+        ]
+
+    def __str__(self):
+        return f'Notification to {self.chat_id} ({self.status})'
@@ -0,0 +1,227 @@
+"""
+Уведомления в Telegram о новых сообщениях (приглашения и запросы в команду).
+
+Создание Message пишет строку Notification в той же транзакции (signals.py),
+веб-запрос в Telegram не ходит. Отправляет уведомления один процесс
+`python manage.py send_notifications`:
+
+- всё, что накопилось для одного чата (за TELEGRAM_NOTIFY_DELAY секунд или
+  пока чат ждал своей очереди), уходит одним сообщением;
+- token bucket на бота (TELEGRAM_GLOBAL_RATE) и на каждый чат
+  (TELEGRAM_CHAT_RATE). Чат, исчерпавший свой лимит, пропускается до
+  следующего прохода и не задерживает остальных — капитан популярной
+  команды получает сводку раз в секунду, а не очередь из сотни сообщений;
+- 429 — пауза из retry_after, сетевые ошибки и 5xx — повтор с
+  экспоненциальной паузой, 400/403 (чат не найден, бот заблокирован) — failed.
+
+Лимиты считаются в памяти процесса, поэтому отправитель должен быть один.
+Локальная проверка — bot/main/fake_bot_api.py и TELEGRAM_API_URL.
+"""
+import logging
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db.models import F, Min
+from django.utils import timezone
+
+from . import metrics
+from .jobs import retry_delay
+from .models import Notification, UserProfile
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+DIGEST_LINES = 5
+# Строк Notification в одном сообщении; остальные уйдут следующим
+DIGEST_LIMIT = 100
+MAX_IDLE_BUCKETS = 1000
+KEEP_SENT = timedelta(days=7)
+
+
+def queue(messages):
+    """Ставит уведомления получателям с привязанным Telegram; вызывать в транзакции создания сообщений"""
+    if not settings.TELEGRAM_NOTIFICATIONS or not messages:
+        return []
+    chats = dict(
+        UserProfile.objects.filter(user_id__in={message.receiver_id for message in messages})
+        .exclude(telegram_id__isnull=True).exclude(telegram_id='')
+        .values_list('user_id', 'telegram_id')
+    )
+    run_at = timezone.now() + timedelta(seconds=settings.TELEGRAM_NOTIFY_DELAY)
+    return Notification.objects.bulk_create([
+        Notification(chat_id=chats[message.receiver_id], message=message, text=message.text, next_attempt_at=run_at)
+        for message in messages if message.receiver_id in chats
+    ])
+
+
+def digest_text(texts, total):
+    link = f'{settings.FRONTEND_URL}/messages'
+    if total == 1:
+        return f'{texts[0]}\n\n{link}'
+    lines = [f'Новых сообщений: {total}']
+    lines += [f'• {text}' for text in texts[:DIGEST_LINES]]
+    if total > DIGEST_LINES:
+        lines.append(f'…и ещё {total - DIGEST_LINES}')
+    lines += ['', link]
+    return '\n'.join(lines)
+
+
+def purge_sent(older_than=KEEP_SENT):
+    deleted, _ = Notification.objects.filter(status='sent', sent_at__lt=timezone.now() - older_than).delete()
+    return deleted
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity про запас"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Сколько секунд ждать следующего токена; 0 — можно сейчас"""
+        self._refill()
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.wait_time():
+            return False
+        self.tokens -= 1
+        return True
+
+    def pause(self, seconds):
+        """Следующий токен — не раньше чем через seconds секунд (ответ 429)"""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+    @property
+    def idle(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class BotAPIError(Exception):
+    def __init__(self, status, description='', retry_after=None):
+        super().__init__(f'{status} {description}'.strip())
+        self.status = status
+        self.retry_after = retry_after
+
+
+class BotClient:
+    def __init__(self, token=None, api_url=None, timeout=10):
+        self.url = f'{api_url or settings.TELEGRAM_API_URL}/bot{token or settings.TELEGRAM_BOT_TOKEN}/'
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send_message(self, chat_id, text):
+        response = self.session.post(self.url + 'sendMessage', timeout=self.timeout, json={
+            'chat_id': chat_id, 'text': text, 'disable_web_page_preview': True,
+        })
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if response.status_code == 200 and data.get('ok'):
+            return data['result']
+        parameters = data.get('parameters') or {}
+        raise BotAPIError(response.status_code, data.get('description', ''), parameters.get('retry_after'))
+
+
+class Sender:
+    def __init__(self, client=None, global_rate=None, chat_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.client = client or BotClient()
+        self.clock = clock
+        self.sleep = sleep
+        self.bucket = TokenBucket(global_rate or settings.TELEGRAM_GLOBAL_RATE, clock=clock)
+        self.chat_rate = chat_rate or settings.TELEGRAM_CHAT_RATE
+        self.chats = {}
+        self.counts = {'sent': 0, 'coalesced': 0, 'throttled': 0, 'retried': 0, 'failed': 0}
+
+    def count(self, result, value=1):
+        self.counts[result] += value
+        if value:
+            metrics.inc('telegram_notifications_total', value, result=result)
+
+    def chat_bucket(self, chat_id):
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            bucket = self.chats[chat_id] = TokenBucket(self.chat_rate, capacity=1, clock=self.clock)
+        return bucket
+
+    def due_chats(self, limit):
+        # Сначала чаты с самым старым уведомлением: новые события одного чата не отодвигают остальные
+        return list(
+            Notification.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+            .values('chat_id').annotate(oldest=Min('created_at')).order_by('oldest')
+            .values_list('chat_id', flat=True)[:limit]
+        )
+
+    def send_pending(self, limit=100):
+        """Один проход: не больше одного сообщения в каждый готовый чат. Возвращает число отправленных"""
+        sent = 0
+        for chat_id in self.due_chats(limit):
+            chat = self.chat_bucket(chat_id)
+            if chat.wait_time():
+                self.count('throttled')
+                continue
+            while wait := self.bucket.wait_time():
+                self.sleep(wait)
+            self.bucket.take()
+            chat.take()
+            sent += self.deliver(chat_id)
+        if len(self.chats) > MAX_IDLE_BUCKETS:
+            self.chats = {chat_id: bucket for chat_id, bucket in self.chats.items() if not bucket.idle}
+        return sent
+
+    def deliver(self, chat_id):
+        now = timezone.now()
+        rows = list(
+            Notification.objects.filter(chat_id=chat_id, status='pending', next_attempt_at__lte=now)
+            .order_by('created_at', 'id').values_list('pk', 'text', 'attempts')[:DIGEST_LIMIT]
+        )
+        if not rows:
+            return False
+        pending = Notification.objects.filter(pk__in=[pk for pk, _, _ in rows])
+        try:
+            self.client.send_message(chat_id, digest_text([text for _, text, _ in rows], len(rows)))
+        except BotAPIError as exc:
+            if exc.retry_after:
+                self.chat_bucket(chat_id).pause(exc.retry_after)
+                pending.update(next_attempt_at=now + timedelta(seconds=exc.retry_after), last_error=str(exc))
+                self.count('retried')
+            elif exc.status in (400, 403):
+                pending.update(status='failed', last_error=str(exc))
+                self.count('failed')
+            else:
+                self.retry(pending, max(attempts for _, _, attempts in rows) + 1, exc)
+            return False
+        except requests.RequestException as exc:
+            self.retry(pending, max(attempts for _, _, attempts in rows) + 1, exc)
+            return False
+        pending.update(status='sent', sent_at=timezone.now())
+        self.count('sent')
+        self.count('coalesced', len(rows) - 1)
+        return True
+
+    def retry(self, pending, attempts, error):
+        logger.warning('Уведомление не отправлено (попытка %s из %s): %s', attempts, MAX_ATTEMPTS, error)
+        if attempts >= MAX_ATTEMPTS:
+            pending.update(status='failed', attempts=F('attempts') + 1, last_error=str(error))
+            self.count('failed')
+            return
+        pending.update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=timezone.now() + timedelta(seconds=retry_delay(attempts)),
+            last_error=str(error),
+        )
+        self.count('retried')
@@ -0,0 +1,153 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация по паре (поле времени, id) с непрозрачным курсором.
+
+    Следующая страница выбирается условием (field, id) < (value, last_id)
+    вместо OFFSET, поэтому время ответа не зависит от глубины истории,
+    а новые строки не сдвигают уже выданные страницы.
+    """
+    ordering_field = 'sent_at'
+    descending = True
+    page_size = 50
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def __init__(self, ordering_field=None, descending=None):
+        if ordering_field is not None:
+            self.ordering_field = ordering_field
+        if descending is not None:
+            self.descending = descending
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def encode_position(value, pk):
+        raw = json.dumps([value.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def position(self, row):
+        """(значение поля сортировки, id) объекта модели или словаря из values()"""
+        if isinstance(row, dict):
+            return row[self.ordering_field], row['id']
+        return getattr(row, self.ordering_field), row.pk
+
+    def encode_cursor(self, instance):
+        return self.encode_position(*self.position(instance))
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            value, pk = json.loads(raw)
+            value = parse_datetime(value)
+            if value is None:
+                raise ValueError
+            return value, int(pk)
+        except (TypeError, ValueError, json.JSONDecodeError):
+            raise NotFound('Неверный курсор')
+
+    def page_queryset(self, queryset, request):
+        """Срез на страницу + 1 строку; выполнить его можно и синхронно, и через async ORM"""
+        self.request = request
+        field = self.ordering_field
+        prefix = '-' if self.descending else ''
+        queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            op = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': pk})
+            )
+
+        self.size = self.get_page_size(request)
+        # Берём на одну строку больше, чтобы узнать, есть ли следующая страница
+        return queryset[:self.size + 1]
+
+    def finish_page(self, rows):
+        self.has_next = len(rows) > self.size
+        page = rows[:self.size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        return self.finish_page([row async for row in self.page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+
+class DeltaSyncPagination(KeysetPagination):
+    """
+    Инкрементальная синхронизация: курсор (sync token) указывает на последнее
+    изменение, которое клиент уже видел, ответ содержит только более поздние.
+
+    Токен продвигается лишь до строк старше settle_lag: транзакция, начатая
+    раньше, но закоммиченная позже, всё равно попадёт в следующий ответ.
+    Повторно пришедшие строки клиент просто перезаписывает по id.
+    """
+    ordering_field = 'updated_at'
+    descending = False
+    cursor_query_param = 'since'
+    page_size = 100
+    max_page_size = 500
+    settle_lag = timedelta(seconds=2)
+
+    def initial_token(self):
+        """Токен «на сейчас» для клиента, который только что загрузил полный список"""
+        return self.encode_position(timezone.now() - self.settle_lag, 0)
+
+    def finish_page(self, rows):
+        page = super().finish_page(rows)
+        settled = timezone.now() - self.settle_lag
+        self.sync_token = self.request.query_params.get(self.cursor_query_param)
+        advanced = False
+        for instance in page:
+            if self.position(instance)[0] > settled:
+                break
+            self.sync_token = self.encode_cursor(instance)
+            advanced = True
+        # Если токен не сдвинулся, клиенту нет смысла сразу запрашивать ещё
+        self.has_more = self.has_next and advanced
+        return page
+
+    def get_paginated_data(self, data):
+        return {
+            'results': data,
+            'sync_token': self.sync_token,
+            'has_more': self.has_more,
+        }
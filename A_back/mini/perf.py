@@ -0,0 +1,232 @@
+"""
+Замеры отдельного запроса: SQL, аутентификация, view, сериализация, рендеринг.
+
+PerformanceMiddleware замеряет долю запросов PERF_SAMPLE_RATE, остальные
+проходят без обёрток. В замеренном запросе:
+
+- каждый SQL идёт через connection.execute_wrapper: число запросов, время в
+  БД и текст (с плейсхолдерами, без параметров — одинаковый для повторов);
+- span('auth') в CachedJWTAuthentication, span('serialize') вокруг
+  Serializer.data (только внешний уровень вложенности);
+- view — от process_view до возврата ответа, render — рендеринг DRF Response.
+
+Итог уходит в заголовок Server-Timing (вкладка Timing в DevTools). Если
+запрос дольше PERF_SLOW_REQUEST_MS или один и тот же SQL повторился не
+меньше PERF_REPEATED_SQL раз (признак N+1), в логгер mini.perf пишется
+JSON-запись с самыми частыми запросами.
+
+Под ASGI middleware работает в async-режиме и не переводит запрос в поток;
+SQL тогда считается в потоке, где Django выполняет view и async ORM (см.
+PerformanceMiddleware).
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+TOP_STATEMENTS = 5
+SQL_PREVIEW = 300
+
+_current = ContextVar('perf_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = []
+        self.db_tracked = False
+        self._depth = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.statements.append(sql)
+
+    def add(self, name, seconds):
+        self.durations[name] += seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def repeated(self, minimum=2):
+        """[(sql, сколько раз)] — самые частые повторы, начиная с minimum"""
+        return [(sql, count) for sql, count in Counter(self.statements).most_common(TOP_STATEMENTS)
+                if count >= minimum]
+
+    def server_timing(self, total):
+        parts = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} SQL"']
+        parts += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.durations.items()]
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def track_db(stack, timings):
+    """Подключает timings к SQL всех соединений текущего потока до закрытия stack"""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timings))
+    timings.db_tracked = True
+
+
+@contextmanager
+def measure(db=True):
+    """
+    Замер всего, что выполняется внутри: span() и, если db, SQL на всех
+    соединениях текущего потока
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        with ExitStack() as stack:
+            if db:
+                track_db(stack, timings)
+            yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Добавляет время блока к name в текущем замере; вложенные блоки того же имени не удваиваются"""
+    timings = _current.get()
+    if timings is None or timings._depth[name]:
+        yield
+        return
+    timings._depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._depth[name] -= 1
+        timings.add(name, time.perf_counter() - started)
+
+
+def instrument_serializers():
+    """Оборачивает BaseSerializer.data: Serializer.data и ListSerializer.data вызывают его через super()"""
+    original = BaseSerializer.data
+    if getattr(original.fget, 'perf_span', False):
+        return
+
+    def data(self):
+        with span('serialize'):
+            return original.fget(self)
+
+    data.perf_span = True
+    BaseSerializer.data = property(data)
+
+
+class PerformanceMiddleware:
+    """
+    Гибридный: под ASGI не переводит цепочку middleware в поток. В async-режиме
+    SQL выполняется не в потоке event loop, а в потоке запроса (sync-views,
+    sync_to_async, async ORM), поэтому обёртки ставятся в process_view — Django
+    вызывает его в том же потоке.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION or settings.PERF_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        instrument_serializers()
+
+    def sampled(self):
+        rate = settings.PERF_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        with measure() as timings:
+            response = self.get_response(request)
+            self.finish_view(request, timings)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        with measure(db=False) as timings:
+            try:
+                response = await self.get_response(request)
+            finally:
+                # Обёртки, поставленные process_view в потоке запроса
+                if hasattr(request, '_perf_db'):
+                    request._perf_db.close()
+            self.finish_view(request, timings)
+        return self.finish(request, response, timings)
+
+    def finish_view(self, request, timings):
+        if 'view' not in timings.durations and hasattr(request, '_perf_view_started'):
+            timings.add('view', time.perf_counter() - request._perf_view_started)
+
+    def finish(self, request, response, timings):
+        total = timings.elapsed()
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = timings.server_timing(total)
+        self.report(request, response, timings, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None and not timings.db_tracked:
+            request._perf_db = ExitStack()
+            track_db(request._perf_db, timings)
+        request._perf_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF Response рендерится после выхода из view: разделяем view и render
+        timings = _current.get()
+        if timings is None or not hasattr(request, '_perf_view_started'):
+            return response
+        view_finished = time.perf_counter()
+        timings.add('view', view_finished - request._perf_view_started)
+        response.add_post_render_callback(lambda rendered: timings.add('render', time.perf_counter() - view_finished))
+        return response
+
+    def report(self, request, response, timings, total):
+        total_ms = total * 1000
+        repeated = timings.repeated(minimum=2)
+        slow = total_ms >= settings.PERF_SLOW_REQUEST_MS
+        n_plus_one = bool(repeated) and repeated[0][1] >= settings.PERF_REPEATED_SQL
+        if not slow and not n_plus_one:
+            return
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        record = {
+            'event': 'slow_request' if slow else 'repeated_sql',
+            'method': request.method,
+            'path': request.path,
+            'route': match.url_name if match else None,
+            'status': response.status_code,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(timings.db_seconds * 1000, 1),
+            'queries': timings.queries,
+            **{f'{name}_ms': round(seconds * 1000, 1) for name, seconds in timings.durations.items()},
+            'n_plus_one': n_plus_one,
+            'repeated_sql': [{'count': count, 'sql': sql[:SQL_PREVIEW]} for sql, count in repeated],
+        }
+        logger.warning(json.dumps(record, ensure_ascii=False), extra={'perf': record})
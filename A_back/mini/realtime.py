@@ -0,0 +1,116 @@
+"""
+Push-уведомления клиентам через Server-Sent Events.
+
+Брокер живёт внутри процесса: publish() вызывается из синхронных
+обработчиков сигналов, а подписчики — асинхронные SSE-потоки в event loop
+ASGI-сервера. События доставляются только подписчикам этого же процесса,
+поэтому для нескольких воркеров брокер нужно заменить через set_broker().
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+HEARTBEAT_SECONDS = 15
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def push(self, event):
+        # Вызывается в потоке event loop; медленный клиент теряет старые события,
+        # но не блокирует остальных — после переподключения он всё равно делает delta sync
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    # id пользователя из JWT приходит строкой, из ORM — числом: приводим к строке
+    def subscribe(self, user_id):
+        subscription = Subscription(str(user_id), asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[subscription.user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [sub for user_id in {str(u) for u in user_ids} for sub in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+
+_broker = InProcessBroker()
+
+
+def get_broker():
+    return _broker
+
+
+def set_broker(broker):
+    """Подменяет брокер (например, заглушкой в тестах); возвращает предыдущий"""
+    global _broker
+    previous, _broker = _broker, broker
+    return previous
+
+
+def publish(user_ids, event):
+    get_broker().publish(user_ids, event)
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def event_stream(request):
+    """
+    GET /api/events/?token=<access> — поток событий для текущего пользователя.
+    EventSource не умеет передавать заголовки, поэтому access-токен идёт в query.
+    Работает только под ASGI (backend/asgi.py).
+    """
+    try:
+        token = AccessToken(request.GET.get('token', ''))
+        user_id = token[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return HttpResponse(status=401)
+
+    async def stream():
+        broker = get_broker()
+        subscription = broker.subscribe(user_id)
+        try:
+            yield ': connected\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
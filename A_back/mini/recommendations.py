@@ -0,0 +1,215 @@
+"""
+Ранжирование свободных участников хакатона под роли команды.
+
+Каждый профиль сворачивается в вектор покрытия ролей (ROLE_KEYWORDS) по
+тексту UserProfile.skills; векторы лежат в одной матрице NumPy, поэтому
+оценка тысяч кандидатов — одно матричное умножение. Индекс строится
+лениво, обновляется построчно сигналом сохранения профиля и полностью
+перестраивается раз в REBUILD_SECONDS, чтобы подхватить правки из других
+процессов.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+
+from .models import UserProfile
+
+ROLE_KEYWORDS = {
+    'frontender': {'frontend', 'react', 'vue', 'angular', 'svelte', 'javascript', 'js', 'typescript', 'ts',
+                   'html', 'css', 'sass', 'redux', 'next.js', 'nextjs', 'vite', 'фронтенд'},
+    'backender': {'backend', 'python', 'django', 'flask', 'fastapi', 'go', 'golang', 'java', 'spring', 'kotlin',
+                  'node', 'node.js', 'nodejs', 'php', 'laravel', 'c#', '.net', 'sql', 'postgresql', 'postgres',
+                  'mysql', 'redis', 'rust', 'бэкенд'},
+    'designer': {'design', 'designer', 'figma', 'ui', 'ux', 'sketch', 'photoshop', 'illustrator', 'дизайн'},
+    'ml': {'ml', 'ai', 'pytorch', 'tensorflow', 'keras', 'sklearn', 'scikit-learn', 'pandas', 'numpy', 'nlp',
+           'cv', 'llm', 'catboost', 'xgboost'},
+    'mobile': {'mobile', 'android', 'ios', 'swift', 'kotlin', 'flutter', 'dart', 'react-native'},
+    'devops': {'devops', 'docker', 'kubernetes', 'k8s', 'ci/cd', 'terraform', 'ansible', 'linux', 'nginx', 'aws'},
+    'analyst': {'analytics', 'analyst', 'sql', 'excel', 'tableau', 'powerbi', 'bi', 'statistics', 'pandas'},
+    'gamedev': {'unity', 'unreal', 'godot', 'c++', 'c#', 'gamedev'},
+    'pm': {'pm', 'product', 'management', 'agile', 'scrum', 'jira', 'менеджмент'},
+}
+
+ROLE_ALIASES = {
+    'frontend': 'frontender', 'front': 'frontender', 'фронтендер': 'frontender',
+    'backend': 'backender', 'back': 'backender', 'бэкендер': 'backender',
+    'design': 'designer', 'дизайнер': 'designer',
+    'ml-engineer': 'ml', 'data scientist': 'ml', 'datascientist': 'ml', 'ai': 'ml',
+    'android': 'mobile', 'ios': 'mobile', 'mobile developer': 'mobile',
+    'analytics': 'analyst', 'аналитик': 'analyst',
+    'product manager': 'pm', 'manager': 'pm', 'менеджер': 'pm',
+}
+
+ROLES = list(ROLE_KEYWORDS)
+ROLE_COLUMNS = {role: column for column, role in enumerate(ROLES)}
+LEVEL_SCORES = {'beginner': 0.0, 'intermediate': 0.5, 'experienced': 1.0}
+
+# Веса итоговой оценки: покрытие недостающих ролей важнее опыта
+ROLE_WEIGHT = 1.0
+LEVEL_WEIGHT = 0.3
+EXPERIENCE_WEIGHT = 0.2
+EXPERIENCE_CAP_MONTHS = 60
+
+REBUILD_SECONDS = 600
+TOKEN_RE = re.compile(r'[a-zа-яё0-9+#./-]+')
+
+
+KEYWORDS = set().union(*ROLE_KEYWORDS.values())
+
+
+def _clean(token):
+    # Точка и дефис в конце — пунктуация текста («Vue. Django.»); в начале — только у ключевых слов вроде .net
+    token = token.rstrip('.-')
+    return token if token in KEYWORDS else token.lstrip('.-')
+
+
+def tokenize(text):
+    return {_clean(token) for token in TOKEN_RE.findall((text or '').lower())} - {''}
+
+
+def role_vector(skills):
+    """Доля совпавших ключевых слов по каждой роли, с насыщением: 2 навыка роли = 1.0"""
+    tokens = tokenize(skills)
+    return np.array(
+        [min(len(tokens & ROLE_KEYWORDS[role]) / 2.0, 1.0) for role in ROLES],
+        dtype=np.float32,
+    )
+
+
+def normalize_role(role):
+    role = str(role).strip().lower()
+    return ROLE_ALIASES.get(role, role)
+
+
+class SkillIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # Правки профилей за время скана в rebuild(): {user_id: (skills, level, experience_months) или None}
+        self._pending = None
+        self._built_at = None
+        self._rows = {}
+        self._roles = np.zeros((0, len(ROLES)), dtype=np.float32)
+        self._bonus = np.zeros(0, dtype=np.float32)
+        self._size = 0
+
+    def _ensure_capacity(self, size):
+        capacity = self._roles.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 1024)
+        roles = np.zeros((capacity, len(ROLES)), dtype=np.float32)
+        roles[:self._size] = self._roles[:self._size]
+        bonus = np.zeros(capacity, dtype=np.float32)
+        bonus[:self._size] = self._bonus[:self._size]
+        self._roles, self._bonus = roles, bonus
+
+    @staticmethod
+    def _bonus_for(level, experience_months):
+        experience = min(max(experience_months or 0, 0), EXPERIENCE_CAP_MONTHS) / EXPERIENCE_CAP_MONTHS
+        return LEVEL_WEIGHT * LEVEL_SCORES.get(level, 0.0) + EXPERIENCE_WEIGHT * experience
+
+    def _put(self, user_id, skills, level, experience_months):
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._size
+            self._ensure_capacity(row + 1)
+            self._rows[user_id] = row
+            self._size += 1
+        self._roles[row] = role_vector(skills)
+        self._bonus[row] = self._bonus_for(level, experience_months)
+
+    def rebuild(self):
+        """
+        Полная пересборка. Профили читаются без блокировки — rank() и update()
+        не ждут скан; под блокировкой только подмена массивов и повтор правок,
+        пришедших за время скана.
+        """
+        with self._rebuild_lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        with self._lock:
+            self._pending = {}
+        rows, roles, bonus = {}, [], []
+        queryset = UserProfile.objects.values_list('user_id', 'skills', 'level', 'experience_months')
+        for user_id, skills, level, experience_months in queryset.iterator(chunk_size=5000):
+            rows[user_id] = len(roles)
+            roles.append(role_vector(skills))
+            bonus.append(self._bonus_for(level, experience_months))
+        with self._lock:
+            self._rows, self._size = rows, len(rows)
+            self._roles = np.array(roles, dtype=np.float32).reshape(len(rows), len(ROLES))
+            self._bonus = np.array(bonus, dtype=np.float32)
+            pending, self._pending = self._pending, None
+            for user_id, change in pending.items():
+                if change is None:
+                    self._remove(user_id)
+                else:
+                    self._put(user_id, *change)
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.rebuild()
+        elif time.monotonic() - self._built_at > REBUILD_SECONDS and self._rebuild_lock.acquire(blocking=False):
+            # Устаревший индекс пересобирает один поток, остальные пока ранжируют по текущему
+            try:
+                self._rebuild()
+            finally:
+                self._rebuild_lock.release()
+
+    def update(self, profile):
+        """Инкрементальное обновление строки; до первой сборки индекса ничего не делает"""
+        change = (profile.skills, profile.level, profile.experience_months)
+        with self._lock:
+            if self._pending is not None:
+                self._pending[profile.user_id] = change
+            if self._built_at is not None:
+                self._put(profile.user_id, *change)
+
+    def remove(self, user_id):
+        with self._lock:
+            if self._pending is not None:
+                self._pending[user_id] = None
+            self._remove(user_id)
+
+    def _remove(self, user_id):
+        row = self._rows.pop(user_id, None)
+        if row is not None:
+            # Строку не сдвигаем — просто обнуляем, она больше не адресуется
+            self._roles[row] = 0
+            self._bonus[row] = 0
+
+    def rank(self, candidate_ids, required_roles, team_user_ids=(), top=20):
+        """
+        Возвращает [(user_id, score)] лучших кандидатов по убыванию оценки.
+        Роли, которые уже закрыты участниками команды, весят меньше.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            needed = np.zeros(len(ROLES), dtype=np.float32)
+            for role in required_roles or []:
+                column = ROLE_COLUMNS.get(normalize_role(role))
+                if column is not None:
+                    needed[column] = 1.0
+            team_rows = [self._rows[uid] for uid in team_user_ids if uid in self._rows]
+            if team_rows:
+                covered = self._roles[team_rows].max(axis=0)
+                needed = needed * (1.0 - covered)
+
+            ids = np.array([uid for uid in candidate_ids if uid in self._rows], dtype=np.int64)
+            if ids.size == 0:
+                return []
+            rows = np.fromiter((self._rows[uid] for uid in ids), dtype=np.int64, count=ids.size)
+            scores = ROLE_WEIGHT * (self._roles[rows] @ needed) + self._bonus[rows]
+
+        top = min(top, ids.size)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.lexsort((ids[best], -scores[best]))]
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in best]
+
+
+skill_index = SkillIndex()
@@ -0,0 +1,39 @@
+"""
+JSON-рендерер на orjson — включается FAST_JSON_RENDERER=1.
+
+Выход совпадает с rest_framework.renderers.JSONRenderer байт в байт:
+компактные разделители, UTF-8 без \\u-экранирования, \\u2028/\\u2029
+экранированы; даты, время, Decimal, ленивые строки и прочее, чего нет в
+JSON, уходят в тот же rest_framework JSONEncoder.default. Отступы (Accept
+с indent=, Browsable API) и нестандартные UNICODE_JSON/COMPACT_JSON/
+STRICT_JSON рендерит обычный JSONRenderer, он же — если orjson не
+установлен.
+
+Отличаются только float, которые json пишет в экспоненциальной записи
+(1e-05 и 1e+16 против 0.00001 и 1e16 у orjson), и NaN/Infinity (orjson —
+null, DRF — ошибка). API отдаёт float только в match_score, округлённом до 4 знаков.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def __init__(self):
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact or not self.strict
+                or self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.default, option=(
+            orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        ))
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,99 @@
+"""
+Полнотекстовый поиск по хакатонам и профилям.
+
+Документы лежат в отдельной таблице mini_search (создаётся миграцией 0006):
+на SQLite это виртуальная таблица FTS5 с ранжированием bm25, на PostgreSQL —
+обычная таблица с генерируемой колонкой tsvector и GIN-индексом. Индекс
+обновляется сигналами сохранения/удаления, полная пересборка —
+`python manage.py rebuild_search_index`.
+"""
+import re
+
+from django.db import connection
+
+TABLE = 'mini_search'
+KINDS = {'hackathon': 1, 'profile': 2}
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 8
+
+
+def _rowid(kind, object_id):
+    # У FTS5 нет составных ключей: кодируем (kind, id) в rowid
+    return object_id * 8 + KINDS[kind]
+
+
+def hackathon_document(hackathon):
+    return hackathon.name, hackathon.partners or ''
+
+
+def profile_document(profile):
+    return profile.display_name, f'{profile.bio or ""}\n{profile.skills or ""}'
+
+
+def index(kind, object_id, title, body):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {TABLE} (kind, object_id, title, body) VALUES (%s, %s, %s, %s) '
+                'ON CONFLICT (kind, object_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body',
+                [kind, object_id, title, body],
+            )
+        else:
+            rowid = _rowid(kind, object_id)
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, kind, object_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+                [rowid, kind, object_id, title, body],
+            )
+
+
+def unindex(kind, object_id):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DELETE FROM {TABLE} WHERE kind = %s AND object_id = %s', [kind, object_id])
+        else:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [_rowid(kind, object_id)])
+
+
+def terms(query):
+    return TOKEN_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def search(kind, query, limit, offset=0):
+    """Возвращает id объектов, отсортированные по релевантности; все слова запроса — префиксы"""
+    words = terms(query)
+    if not words:
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            tsquery = ' & '.join(f"{word}:*" for word in words)
+            cursor.execute(
+                f"SELECT object_id FROM {TABLE}, to_tsquery('simple', %s) query "
+                'WHERE kind = %s AND document @@ query '
+                'ORDER BY ts_rank(document, query) DESC, object_id LIMIT %s OFFSET %s',
+                [tsquery, kind, limit, offset],
+            )
+        else:
+            match = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+            # Вес названия выше, чем у описания; kind и object_id не индексируются
+            cursor.execute(
+                f'SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s '
+                f'ORDER BY bm25({TABLE}, 0, 0, 10.0, 1.0), object_id LIMIT %s OFFSET %s',
+                [match, kind, limit, offset],
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def rebuild():
+    from .models import Hackathon, UserProfile
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    count = 0
+    for hackathon in Hackathon.objects.only('id', 'name', 'partners').iterator():
+        index('hackathon', hackathon.pk, *hackathon_document(hackathon))
+        count += 1
+    for profile in UserProfile.objects.only('id', 'display_name', 'bio', 'skills').iterator():
+        index('profile', profile.pk, *profile_document(profile))
+        count += 1
+    return count
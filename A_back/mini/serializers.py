@@ -1,24 +1,62 @@
 from rest_framework import serializers
+from . import avatars
+from .fast_serializers import RowSerializer
 from .models import UserProfile, Hackathon, HackathonParticipant, Team, TeamMember, Message
 
+def experience_text(years, months):
+    return f"{years} лет {months} месяцев" if years > 0 else f"{months} месяцев"
+
+def date_range_text(start_date, start_time):
+    # То же, что strftime('%d.%m') и strftime('%H.%M'), но без разбора формата на каждой строке
+    return f"{start_date.day:02d}.{start_date.month:02d} {start_time.hour:02d}.{start_time.minute:02d}"
+
 class UserProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     email = serializers.EmailField(source='user.email', required=False)
     level_display = serializers.CharField(source='get_level_display', read_only=True)
     experience_years = serializers.SerializerMethodField()
+    avatar_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
         fields = [
             'id', 'username', 'email', 'is_telegram_user', 'telegram_id',
-            'display_name', 'avatar', 'bio', 'skills', 'experience_months', 'level',
+            'display_name', 'avatar', 'avatar_urls', 'bio', 'skills', 'experience_months', 'level',
             'level_display', 'experience_years', 'hackathons_participated'
         ]
         read_only_fields = ['is_telegram_user', 'telegram_id', 'level', 'level_display']
 
     def get_experience_years(self, obj):
-        years, months = obj.get_experience_years()
-        return f"{years} лет {months} месяцев" if years > 0 else f"{months} месяцев"
+        return experience_text(*obj.get_experience_years())
+
+    def get_avatar_urls(self, obj):
+        urls = avatars.variant_urls(obj)
+        request = self.context.get('request')
+        if urls and request is not None:
+            urls = {size: {ext: request.build_absolute_uri(url) for ext, url in variants.items()}
+                    for size, variants in urls.items()}
+        return urls
+
+    def update(self, instance, validated_data):
+        process_avatar = False
+        if 'avatar' in validated_data:
+            upload = validated_data.pop('avatar')
+            if upload:
+                process_avatar = avatars.attach(instance, upload)
+            else:
+                instance.avatar = None
+                instance.avatar_hash = ''
+        instance = super().update(instance, validated_data)
+        if process_avatar:
+            avatars.schedule(instance.pk)
+        return instance
+
+# Чужой профиль в выдаче (поиск): без контактов
+class PublicUserProfileSerializer(UserProfileSerializer):
+    email = None
+
+    class Meta(UserProfileSerializer.Meta):
+        fields = [field for field in UserProfileSerializer.Meta.fields if field not in ('email', 'telegram_id')]
 
 class LoginWithCodeSerializer(serializers.Serializer):
     code = serializers.CharField(max_length=8)
@@ -36,7 +74,33 @@ class HackathonSerializer(serializers.ModelSerializer):
         ]
 
     def get_date_range(self, obj):
-        return f"{obj.start_date.strftime('%d.%m')} {obj.start_time.strftime('%H.%M')}"
+        return date_range_text(obj.start_date, obj.start_time)
+
+class HackathonFilterSerializer(serializers.Serializer):
+    """Параметры фильтрации каталога хакатонов (query string)"""
+    category = serializers.ChoiceField(choices=Hackathon.CATEGORY_CHOICES, required=False)
+    difficulty = serializers.ChoiceField(choices=Hackathon.DIFFICULTY_CHOICES, required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    registration_open = serializers.BooleanField(required=False, allow_null=True, default=None)
+    q = serializers.CharField(required=False, max_length=200)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError('start должен быть не позже end')
+        return attrs
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    type = serializers.ChoiceField(choices=['hackathon', 'profile'], default='hackathon')
+    page = serializers.IntegerField(min_value=1, max_value=50, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+class RecommendationQuerySerializer(serializers.Serializer):
+    """Параметры подбора кандидатов в команду (query string)"""
+    recommend = serializers.BooleanField(default=False)
+    team = serializers.IntegerField(min_value=1, required=False)
+    top = serializers.IntegerField(min_value=1, max_value=100, default=20)
 
 class HackathonDetailSerializer(HackathonSerializer):
     class Meta(HackathonSerializer.Meta):
@@ -44,16 +108,12 @@ class HackathonDetailSerializer(HackathonSerializer):
 
 class TeamSerializer(serializers.ModelSerializer):
     captain_username = serializers.CharField(source='captain.username', read_only=True)
-    member_count = serializers.SerializerMethodField()
     members_list = serializers.SerializerMethodField()
 
     class Meta:
         model = Team
         fields = ['id', 'name', 'captain', 'captain_username', 'member_count', 'members_list', 'size_min', 'size_max', 'is_full']
 
-    def get_member_count(self, obj):
-        return obj.members.count()
-
     def get_members_list(self, obj):
         return [{'username': member.username, 'id': member.id} for member in obj.members.all()]
 
@@ -62,6 +122,11 @@ class TeamCreateSerializer(serializers.ModelSerializer):
         model = Team
         fields = ['name', 'hackathon', 'size_min', 'size_max']
 
+class BulkInviteSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100
+    )
+
 class MessageSerializer(serializers.ModelSerializer):
     sender_username = serializers.CharField(source='sender.username', read_only=True)
     receiver_username = serializers.CharField(source='receiver.username', read_only=True)
@@ -70,3 +135,23 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'sender', 'sender_username', 'receiver', 'receiver_username', 'team', 'team_name', 'message_type', 'status', 'text', 'sent_at']
+
+# Быстрые версии для больших списков (mini/fast_serializers.py)
+
+class HackathonRowSerializer(RowSerializer):
+    serializer_class = HackathonSerializer
+    methods = {'date_range': (['start_date', 'start_time'], date_range_text)}
+
+class UserProfileRowSerializer(RowSerializer):
+    serializer_class = UserProfileSerializer
+    methods = {
+        'experience_years': (['experience_months'], lambda months: experience_text(*divmod(months, 12))),
+        'avatar_urls': (['avatar_hash'], avatars.hash_urls),
+    }
+
+class MessageRowSerializer(RowSerializer):
+    serializer_class = MessageSerializer
+
+hackathon_rows = HackathonRowSerializer()
+profile_rows = UserProfileRowSerializer()
+message_rows = MessageRowSerializer()
@@ -0,0 +1,147 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache, notifications, realtime, search
+from .models import Hackathon, Message, Team, TeamMember, UserProfile
+from .recommendations import skill_index
+
+
+def publish_on_commit(user_ids, event):
+    transaction.on_commit(lambda: realtime.publish(user_ids, event))
+
+
+@receiver(post_init, sender=Message)
+def remember_message_status(sender, instance, **kwargs):
+    instance._loaded_status = instance.status
+
+
+def message_event(message, created):
+    return {
+        'type': 'message.created' if created else 'message.status',
+        'id': message.pk,
+        'team': message.team_id,
+        'message_type': message.message_type,
+        'status': message.status,
+    }
+
+
+@receiver(post_save, sender=Message)
+def push_message_change(sender, instance, created, **kwargs):
+    if not created and instance.status == instance._loaded_status:
+        return
+    instance._loaded_status = instance.status
+    publish_on_commit([instance.sender_id, instance.receiver_id], message_event(instance, created))
+    if created:
+        notifications.queue([instance])
+
+
+def messages_created(messages):
+    """bulk_create не шлёт post_save: события о новых сообщениях отправляем явно"""
+    for message in messages:
+        publish_on_commit([message.sender_id, message.receiver_id], message_event(message, True))
+    notifications.queue(messages)
+
+
+def message_status_changed(message):
+    """Статус сменили условным UPDATE без post_save: событие отправляем явно"""
+    message._loaded_status = message.status
+    publish_on_commit([message.sender_id, message.receiver_id], message_event(message, False))
+
+
+@receiver(post_init, sender=Team)
+def remember_team_is_full(sender, instance, **kwargs):
+    instance._loaded_is_full = instance.is_full
+
+
+@receiver(post_save, sender=Team)
+def push_team_is_full(sender, instance, created, **kwargs):
+    if not created:
+        team_is_full_changed(instance)
+
+
+def team_is_full_changed(team):
+    """Рассылает событие, если is_full изменился с момента загрузки команды"""
+    if team.is_full == team._loaded_is_full:
+        return
+    team._loaded_is_full = team.is_full
+    event = {
+        'type': 'team.is_full',
+        'id': team.pk,
+        'hackathon': team.hackathon_id,
+        'is_full': team.is_full,
+    }
+
+    def publish():
+        # Состав читаем после коммита: место резервируется раньше, чем создаётся TeamMember
+        user_ids = set(TeamMember.objects.filter(team_id=team.pk).values_list('user_id', flat=True))
+        user_ids.add(team.captain_id)
+        realtime.publish(user_ids, event)
+
+    transaction.on_commit(publish)
+
+
+@receiver([post_save, post_delete], sender=Hackathon)
+def invalidate_hackathon(sender, instance, **kwargs):
+    cache.bump(cache.CATALOG, cache.hackathon_namespace(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Team)
+def invalidate_team(sender, instance, **kwargs):
+    cache.bump(cache.hackathon_namespace(instance.hackathon_id))
+
+
+@receiver(post_delete, sender=Team)
+def touch_hackathon_of_deleted_team(sender, instance, **kwargs):
+    # max(updated_at) команд удаление не сдвигает: Last-Modified страницы хакатона сдвигаем сами
+    Hackathon.objects.filter(pk=instance.hackathon_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=TeamMember)
+def invalidate_team_member(sender, instance, **kwargs):
+    hackathon_id = Team.objects.filter(pk=instance.team_id).values_list('hackathon_id', flat=True).first()
+    if hackathon_id is not None:
+        Team.objects.filter(pk=instance.team_id).update(updated_at=timezone.now())
+        cache.bump(cache.hackathon_namespace(hackathon_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    cache.bump(cache.user_namespace(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_cached_profile_owner(sender, instance, **kwargs):
+    cache.bump(cache.user_namespace(instance.user_id))
+
+
+@receiver(post_save, sender=UserProfile)
+def update_skill_index(sender, instance, **kwargs):
+    skill_index.update(instance)
+
+
+@receiver(post_save, sender=Hackathon)
+def index_hackathon(sender, instance, **kwargs):
+    search.index('hackathon', instance.pk, *search.hackathon_document(instance))
+
+
+@receiver(post_delete, sender=Hackathon)
+def unindex_hackathon(sender, instance, **kwargs):
+    search.unindex('hackathon', instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_profile(sender, instance, **kwargs):
+    search.index('profile', instance.pk, *search.profile_document(instance))
+
+
+@receiver(post_delete, sender=UserProfile)
+def unindex_profile(sender, instance, **kwargs):
+    search.unindex('profile', instance.pk)
+
+
+@receiver(post_delete, sender=UserProfile)
+def remove_from_skill_index(sender, instance, **kwargs):
+    skill_index.remove(instance.user_id)
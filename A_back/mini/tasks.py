@@ -0,0 +1,13 @@
+"""Обработчики фоновых задач (mini/jobs.py). Все идемпотентны: доставка — хотя бы один раз."""
+from . import avatars, counters
+from .jobs import register
+
+
+@register('recount_hackathon')
+def recount_hackathon(hackathon_id):
+    counters.recount_hackathon(hackathon_id)
+
+
+@register('process_avatar')
+def process_avatar(profile_id):
+    avatars.process(profile_id)
@@ -1,3 +1,1794 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from io import BytesIO, StringIO
+from datetime import date, time as datetime_time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_init
+from django.http import HttpResponse
+from asgiref.sync import SyncToAsync, async_to_sync
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import async_views, authentication, avatars, cache, counters, jobs, metrics, notifications, perf, realtime, search
+from .models import Hackathon, HackathonParticipant, Job, LoginCode, Notification, Team, TeamMember, Message, UserProfile
+from .pagination import KeysetPagination, DeltaSyncPagination
+from .fast_serializers import RowSerializer
+from . import recommendations
+from .recommendations import ROLES, SkillIndex, role_vector, skill_index, tokenize
+from .renderers import ORJSONRenderer
+from .serializers import (
+    HackathonSerializer, MessageSerializer, UserProfileSerializer, hackathon_rows, message_rows, profile_rows,
+)
+
+
+class ApiTestCase(TestCase):
+    """Откат транзакции не вызывает сигналов, поэтому кэш ответов чистим явно"""
+
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+        authentication.user_cache.clear()
+        self.client = APIClient()
+
+
+def make_hackathon(**kwargs):
+    defaults = {
+        'name': 'Hack',
+        'start_date': date(2030, 1, 10),
+        'end_date': date(2030, 1, 12),
+        'category': 'web_dev',
+    }
+    defaults.update(kwargs)
+    return Hackathon.objects.create(**defaults)
+
+
+def make_teams(hackathon, count, members_per_team=3, prefix='t'):
+    teams = []
+    for i in range(count):
+        captain = User.objects.create(username=f'{prefix}{hackathon.pk}-cap{i}')
+        team = Team.objects.create(name=f'{prefix}{i}', hackathon=hackathon, captain=captain)
+        TeamMember.objects.create(team=team, user=captain, status='joined')
+        for j in range(members_per_team - 1):
+            member = User.objects.create(username=f'{prefix}{hackathon.pk}-m{i}-{j}')
+            TeamMember.objects.create(team=team, user=member, status='joined')
+        team.member_count = members_per_team
+        team.save(update_fields=['member_count'])
+        teams.append(team)
+    return teams
+
+
+class TeamListingQueryCountTests(ApiTestCase):
+    """Количество запросов списков команд не должно расти вместе с числом команд"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='viewer')
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_hackathon_detail_constant(self):
+        small = make_hackathon(name='small')
+        big = make_hackathon(name='big')
+        make_teams(small, 2)
+        make_teams(big, 20)
+        small_count, _ = self.count_queries(f'/api/hackathons/{small.pk}/')
+        big_count, response = self.count_queries(f'/api/hackathons/{big.pk}/')
+        self.assertEqual(small_count, big_count)
+        team = response.data['teams'][0]
+        self.assertEqual(team['member_count'], 3)
+        self.assertEqual(len(team['members_list']), 3)
+
+    def test_available_teams_constant(self):
+        small = make_hackathon(name='small')
+        big = make_hackathon(name='big')
+        make_teams(small, 2)
+        make_teams(big, 20)
+        small_count, _ = self.count_queries(f'/api/hackathons/{small.pk}/available_teams/')
+        big_count, response = self.count_queries(f'/api/hackathons/{big.pk}/available_teams/')
+        self.assertEqual(small_count, big_count)
+        self.assertEqual(len(response.data), 20)
+
+    def test_my_teams_constant(self):
+        hackathon = make_hackathon()
+        teams = make_teams(hackathon, 2)
+        for team in teams:
+            TeamMember.objects.create(team=team, user=self.user, status='joined')
+            counters.change_team_members(team, 1)
+        small_count, response = self.count_queries('/api/my_teams/')
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['member_count'], 4)
+
+        for team in make_teams(hackathon, 15, prefix='x'):
+            TeamMember.objects.create(team=team, user=self.user, status='joined')
+        Team.objects.create(name='own', hackathon=hackathon, captain=self.user)
+        big_count, response = self.count_queries('/api/my_teams/')
+        self.assertEqual(small_count, big_count)
+        self.assertEqual(len(response.data), 18)
+
+
+class HackathonCatalogFilterTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        make_hackathon(name='Alpha AI', category='ai_ml', difficulty='hard', start_date=date(2030, 1, 5))
+        make_hackathon(name='Beta Web', category='web_dev', difficulty='easy', start_date=date(2030, 1, 20))
+        make_hackathon(name='Gamma Web', category='web_dev', difficulty='hard', start_date=date(2030, 2, 3),
+                       registration_deadline=date(2000, 1, 1))
+
+    def names(self, **params):
+        response = self.client.get('/api/hackathons/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_without_filters_returns_everything(self):
+        self.assertEqual(self.names(), ['Alpha AI', 'Beta Web', 'Gamma Web'])
+
+    def test_category_and_difficulty(self):
+        self.assertEqual(self.names(category='web_dev'), ['Beta Web', 'Gamma Web'])
+        self.assertEqual(self.names(category='web_dev', difficulty='hard'), ['Gamma Web'])
+
+    def test_month_window(self):
+        self.assertEqual(self.names(start='2030-01-01', end='2030-01-31'), ['Alpha AI', 'Beta Web'])
+
+    def test_registration_open_and_prefix(self):
+        self.assertEqual(self.names(registration_open='true'), ['Alpha AI', 'Beta Web'])
+        self.assertEqual(self.names(registration_open='false'), ['Gamma Web'])
+        self.assertEqual(self.names(q='gam'), ['Gamma Web'])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get('/api/hackathons/', {'category': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/hackathons/', {'start': '2030-02-01', 'end': '2030-01-01'}).status_code, 400)
+
+
+class KeysetPaginationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='reader')
+        self.client.force_authenticate(self.user)
+        self.hackathon = make_hackathon()
+
+    def walk(self, url, key='results', next_key='next'):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data[key])
+            url = response.data[next_key]
+        return seen
+
+    def test_messages_pages_cover_history_with_ties(self):
+        team = make_teams(self.hackathon, 1)[0]
+        ids = [
+            Message.objects.create(sender=team.captain, receiver=self.user, team=team,
+                                   message_type='team_invite', text=str(i)).pk
+            for i in range(7)
+        ]
+        # Одинаковое время у части сообщений: порядок держится на id
+        Message.objects.filter(pk__in=ids[2:5]).update(sent_at=Message.objects.get(pk=ids[2]).sent_at)
+        seen = self.walk('/api/messages/?page_size=2')
+        self.assertEqual(sorted(seen), sorted(ids))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_page_size_is_bounded(self):
+        request = Request(APIRequestFactory().get('/api/messages/', {'page_size': 100000}))
+        self.assertEqual(KeysetPagination().get_page_size(request), KeysetPagination.max_page_size)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/messages/?cursor=garbage').status_code, 404)
+
+    def test_hackathon_teams_pages(self):
+        teams = make_teams(self.hackathon, 5, members_per_team=1)
+        seen = self.walk(f'/api/hackathons/{self.hackathon.pk}/?page_size=2', key='teams', next_key='teams_next')
+        self.assertEqual(seen, [team.pk for team in teams])
+
+
+class MessageDeltaSyncTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='syncer')
+        self.client.force_authenticate(self.user)
+        self.team = make_teams(make_hackathon(), 1)[0]
+
+    def message(self, minutes_ago):
+        message = Message.objects.create(sender=self.team.captain, receiver=self.user, team=self.team,
+                                         message_type='team_invite', text='hi')
+        stamp = timezone.now() - timedelta(minutes=minutes_ago)
+        Message.objects.filter(pk=message.pk).update(sent_at=stamp, updated_at=stamp)
+        return message
+
+    def sync(self, token):
+        response = self.client.get('/api/messages/', {'since': token})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_returns_only_changes_after_token(self):
+        old = self.message(minutes_ago=30)
+        first = self.message(minutes_ago=20)
+        token = DeltaSyncPagination.encode_position(timezone.now() - timedelta(minutes=10), 0)
+        data = self.sync(token)
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['sync_token'], token)
+
+        stamp = timezone.now() - timedelta(minutes=1)
+        Message.objects.filter(pk=first.pk).update(status='accepted', updated_at=stamp)
+        data = self.sync(token)
+        self.assertEqual([(m['id'], m['status']) for m in data['results']], [(first.pk, 'accepted')])
+        self.assertNotEqual(data['sync_token'], token)
+        self.assertEqual(self.sync(data['sync_token'])['results'], [])
+        self.assertTrue(Message.objects.filter(pk=old.pk).exists())
+
+    def test_unsettled_rows_are_repeated(self):
+        token = self.client.get('/api/messages/').data['sync_token']
+        fresh = Message.objects.create(sender=self.team.captain, receiver=self.user, team=self.team,
+                                       message_type='team_invite', text='new')
+        data = self.sync(token)
+        self.assertEqual([m['id'] for m in data['results']], [fresh.pk])
+        # Свежая строка ещё может обгонять параллельные транзакции: токен не сдвигается
+        self.assertEqual(data['sync_token'], token)
+        self.assertFalse(data['has_more'])
+
+
+class RecordingBroker:
+    """Локальная замена брокера: просто запоминает опубликованные события"""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, user_ids, event):
+        self.events.append((set(user_ids), event))
+
+
+class RealtimePushTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.broker = RecordingBroker()
+        self.previous = realtime.set_broker(self.broker)
+        self.addCleanup(realtime.set_broker, self.previous)
+        self.hackathon = make_hackathon()
+        self.team = make_teams(self.hackathon, 1, members_per_team=1)[0]
+        self.team.size_max = 2
+        self.team.save()
+        self.user = User.objects.create(username='invitee')
+        self.broker.events.clear()
+
+    def test_join_request_and_accept_are_pushed(self):
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/teams/{self.team.pk}/join/')
+        (users, event), = self.broker.events
+        self.assertEqual(users, {self.team.captain.pk, self.user.pk})
+        self.assertEqual(event['type'], 'message.created')
+
+        self.broker.events.clear()
+        self.client.force_authenticate(self.team.captain)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/messages/{event["id"]}/respond/', {'action': 'accept'})
+        events = {event['type']: (users, event) for users, event in self.broker.events}
+        self.assertEqual(set(events), {'message.status', 'team.is_full'})
+        users, event = events['team.is_full']
+        self.assertEqual(users, {self.team.captain.pk, self.user.pk})
+        self.assertTrue(event['is_full'])
+
+    def test_unchanged_team_is_not_pushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.save()
+        self.assertEqual(self.broker.events, [])
+
+
+class EventStreamTests(TestCase):
+
+    async def test_stream_delivers_published_events(self):
+        user = await User.objects.acreate(username='listener')
+        token = str(AccessToken.for_user(user))
+        response = await self.async_client.get('/api/events/', {'token': token})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertEqual(await anext(chunks), b': connected\n\n')
+        realtime.publish([user.pk], {'type': 'message.created', 'id': 1})
+        self.assertEqual(await anext(chunks), b'event: message.created\ndata: {"type": "message.created", "id": 1}\n\n')
+        await chunks.aclose()
+
+    async def test_rejects_missing_token(self):
+        response = await self.async_client.get('/api/events/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_broker_normalizes_user_id(self):
+        broker = realtime.InProcessBroker()
+        subscription = broker.subscribe(7)
+        broker.publish(['7'], {'type': 'message.created', 'id': 1})
+        self.assertEqual(await asyncio.wait_for(subscription.queue.get(), 1), {'type': 'message.created', 'id': 1})
+        broker.unsubscribe(subscription)
+        self.assertEqual(dict(broker._subscribers), {})
+
+
+class ResponseCacheTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hackathon = make_hackathon()
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    # Промах кэша — на запрос больше: агрегат для ETag (mini/conditional.py); попадание — без запросов
+
+    def test_catalog_hit_and_invalidation(self):
+        first = self.get('/api/hackathons/', 2)
+        self.assertEqual(self.get('/api/hackathons/', 0).data, first.data)
+        self.get('/api/hackathon-dates/', 2)
+        self.get('/api/hackathon-dates/', 0)
+        # Другие параметры запроса — другой ключ
+        self.get('/api/hackathons/?category=web_dev', 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hackathon.name = 'Renamed'
+            self.hackathon.save()
+        self.assertEqual(self.get('/api/hackathons/', 2).data[0]['name'], 'Renamed')
+        self.get('/api/hackathon-dates/', 2)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 5, 'invalidations': 2})
+
+    def test_detail_invalidated_by_team_changes_only_for_its_hackathon(self):
+        other = make_hackathon(name='Other')
+        url = f'/api/hackathons/{self.hackathon.pk}/'
+        other_url = f'/api/hackathons/{other.pk}/'
+        self.get(url, 3)
+        self.get(other_url, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_teams(self.hackathon, 1)
+        self.assertEqual(len(self.get(url, 4).data['teams']), 1)
+        self.get(other_url, 0)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                      'LOCATION': tempfile.mkdtemp()},
+    })
+    def test_file_backend(self):
+        self.get('/api/hackathons/', 2)
+        self.get('/api/hackathons/', 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hackathon.save()
+        self.get('/api/hackathons/', 2)
+
+    def test_stats_endpoint_requires_admin(self):
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 401)
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(set(self.client.get('/api/cache-stats/').data), {'hits', 'misses', 'invalidations'})
+
+
+class CounterTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hackathon = make_hackathon()
+        self.captain = User.objects.create(username='captain')
+        self.client.force_authenticate(self.captain)
+        self.client.post(f'/api/hackathons/{self.hackathon.pk}/participate/')
+
+    def test_team_lifecycle_keeps_counters(self):
+        response = self.client.post(f'/api/hackathons/{self.hackathon.pk}/create_team/',
+                                    {'name': 'Team', 'size_min': 2, 'size_max': 2}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['member_count'], 1)
+        team = Team.objects.get(pk=response.data['id'])
+        # registered_teams пересчитывает фоновая задача
+        self.assertEqual(jobs.run_pending(), 1)
+        self.hackathon.refresh_from_db()
+        self.assertEqual((self.hackathon.registered_teams, self.hackathon.participants_count), (1, 1))
+
+        invitee = User.objects.create(username='invitee')
+        self.client.post(f'/api/teams/{team.pk}/invite/', {'user_id': invitee.pk})
+        team.refresh_from_db()
+        self.assertEqual((team.member_count, team.is_full), (2, True))
+
+        self.client.force_authenticate(invitee)
+        message = Message.objects.get(receiver=invitee)
+        self.client.post(f'/api/messages/{message.pk}/respond/', {'action': 'decline'})
+        team.refresh_from_db()
+        self.assertEqual((team.member_count, team.is_full), (1, False))
+
+        self.client.force_authenticate(self.captain)
+        self.client.delete(f'/api/teams/{team.pk}/delete/')
+        jobs.run_pending()
+        self.hackathon.refresh_from_db()
+        self.assertEqual(self.hackathon.registered_teams, 0)
+
+    def test_response_to_message_answered_concurrently_is_rejected(self):
+        team = make_teams(self.hackathon, 1, members_per_team=1)[0]
+        invitee = User.objects.create(username='invitee')
+        self.client.force_authenticate(team.captain)
+        self.client.post(f'/api/teams/{team.pk}/invite/', {'user_id': invitee.pk})
+        message = Message.objects.get(receiver=invitee)
+
+        def decline_meanwhile(sender, instance, **kwargs):
+            # Параллельный запрос отклоняет приглашение сразу после того, как view прочитал сообщение
+            post_init.disconnect(decline_meanwhile, sender=Message)
+            Message.objects.filter(pk=instance.pk).update(status='declined')
+
+        post_init.connect(decline_meanwhile, sender=Message)
+        self.addCleanup(post_init.disconnect, decline_meanwhile, sender=Message)
+        self.client.force_authenticate(invitee)
+        response = self.client.post(f'/api/messages/{message.pk}/respond/', {'action': 'accept'})
+        self.assertEqual(response.status_code, 400)
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'declined')
+        self.assertEqual(TeamMember.objects.get(team=team, user=invitee).status, 'invited')
+
+    def test_reads_cost_no_extra_queries(self):
+        self.hackathon.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.hackathon.total_registered_participants, 1)
+
+    def test_repair_command(self):
+        team = make_teams(self.hackathon, 1)[0]
+        Team.objects.filter(pk=team.pk).update(member_count=10, is_full=True)
+        out = StringIO()
+        call_command('repair_counters', '--check', stdout=out)
+        self.assertIn('Найдено расхождений: 2', out.getvalue())
+        call_command('repair_counters', stdout=StringIO())
+        team.refresh_from_db()
+        self.hackathon.refresh_from_db()
+        self.assertEqual((team.member_count, team.is_full, self.hackathon.registered_teams), (3, False, 1))
+        out = StringIO()
+        call_command('repair_counters', '--check', stdout=out)
+        self.assertIn('Найдено расхождений: 0', out.getvalue())
+
+
+class TeamCapacityStressTests(TransactionTestCase):
+    """Параллельные приглашения и принятия не должны переполнять команду"""
+
+    workers = 8
+    attempts = 24
+    retries = 100
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.hackathon = make_hackathon()
+        self.team = make_teams(self.hackathon, 1, members_per_team=1)[0]
+        self.team.size_max = 5
+        self.team.save()
+        self.candidates = [User.objects.create(username=f'candidate{i}') for i in range(self.attempts)]
+
+    def hammer(self, request, users=None):
+        """Запрос на каждого из users (по умолчанию — все кандидаты); [(id кандидата, код ответа)]"""
+        users = self.candidates if users is None else users
+        barrier = threading.Barrier(self.workers)
+        results = []
+
+        def worker(chunk):
+            # Клиент тестов ловит исключения через сигнал с общим dispatch_uid и в потоках может
+            # поднять чужое; поэтому берём ответ 500. SQLite в тестах отвечает «database table
+            # is locked» посреди запроса — транзакция откатывается целиком, запрос повторяем
+            client = APIClient(raise_request_exception=False)
+            barrier.wait()
+            try:
+                for user in chunk:
+                    for _ in range(self.retries):
+                        response = request(client, user)
+                        if response.status_code != 500:
+                            break
+                        time.sleep(0.01)
+                    results.append((user.pk, response.status_code))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(users[i::self.workers],))
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def assert_capacity(self, results):
+        """Ровно size_max - 1 кандидатов получили 200 и попали в команду, остальные — 400 без следов"""
+        self.team.refresh_from_db()
+        codes = dict(results)
+        admitted = {user_id for user_id, code in codes.items() if code == 200}
+        self.assertEqual(len(codes), self.attempts)
+        self.assertEqual(set(codes.values()), {200, 400})
+        self.assertEqual(len(admitted), self.team.size_max - 1)
+        members = set(TeamMember.objects.filter(team=self.team).values_list('user_id', flat=True))
+        self.assertEqual(members, admitted | {self.team.captain_id})
+        self.assertEqual(self.team.member_count, self.team.size_max)
+        self.assertTrue(self.team.is_full)
+        return admitted
+
+    def test_parallel_invites(self):
+        def invite(client, user):
+            client.force_authenticate(self.team.captain)
+            return client.post(f'/api/teams/{self.team.pk}/invite/', {'user_id': user.pk})
+
+        admitted = self.assert_capacity(self.hammer(invite))
+        invited = Message.objects.filter(team=self.team, message_type='team_invite').values_list('receiver_id', flat=True)
+        self.assertCountEqual(invited, admitted)
+
+    def test_parallel_join_request_accepts(self):
+        messages = {
+            user.pk: Message.objects.create(sender=user, receiver=self.team.captain, team=self.team,
+                                            message_type='join_request', text='join')
+            for user in self.candidates
+        }
+
+        def accept(client, user):
+            client.force_authenticate(self.team.captain)
+            return client.post(f'/api/messages/{messages[user.pk].pk}/respond/', {'action': 'accept'})
+
+        admitted = self.assert_capacity(self.hammer(accept))
+        statuses = dict(Message.objects.filter(team=self.team).values_list('sender_id', 'status'))
+        self.assertEqual(statuses, {user_id: 'accepted' if user_id in admitted else 'pending' for user_id in messages})
+
+    def test_parallel_accepts_of_one_message(self):
+        user = self.candidates[0]
+        message = Message.objects.create(sender=user, receiver=self.team.captain, team=self.team,
+                                         message_type='join_request', text='join')
+
+        def accept(client, user):
+            client.force_authenticate(self.team.captain)
+            return client.post(f'/api/messages/{message.pk}/respond/', {'action': 'accept'})
+
+        codes = sorted(code for _, code in self.hammer(accept, [user] * self.workers))
+        self.team.refresh_from_db()
+        message.refresh_from_db()
+        self.assertEqual(codes, [200] + [400] * (self.workers - 1))
+        self.assertEqual(message.status, 'accepted')
+        self.assertEqual(TeamMember.objects.filter(team=self.team, user=user).count(), 1)
+        self.assertEqual(self.team.member_count, 2)
+
+
+class RecommendationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        skill_index.rebuild()
+        self.hackathon = make_hackathon(required_roles=['frontender', 'backender', 'designer'])
+        self.captain = self.participant('captain', 'Python, Django, PostgreSQL')
+        self.team = Team.objects.create(name='Team', hackathon=self.hackathon, captain=self.captain, member_count=1)
+        TeamMember.objects.create(team=self.team, user=self.captain)
+        self.client.force_authenticate(self.captain)
+
+    def participant(self, username, skills, level='beginner', experience_months=0):
+        user = User.objects.create(username=username)
+        UserProfile.objects.create(user=user, skills=skills, level=level, experience_months=experience_months)
+        HackathonParticipant.objects.create(user=user, hackathon=self.hackathon)
+        return user
+
+    def ranked(self, **params):
+        response = self.client.get(f'/api/hackathons/{self.hackathon.pk}/potential_members/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['username'] for item in response.data]
+
+    def test_ranks_missing_roles_over_covered_ones(self):
+        self.participant('backend', 'Go, PostgreSQL, Redis', level='experienced', experience_months=60)
+        self.participant('frontend', 'React, TypeScript')
+        self.participant('designer', 'Figma, UX')
+        self.participant('nobody', 'Excel')
+        # Без команды бэкендер с опытом на первом месте
+        self.assertEqual(self.ranked(recommend=1)[0], 'backend')
+        # Бэкенд уже закрыт капитаном — вперёд выходят фронтенд и дизайн
+        self.assertEqual(self.ranked(team=self.team.pk, top=2), ['frontend', 'designer'])
+
+    def test_rejects_invalid_query_params(self):
+        url = f'/api/hackathons/{self.hackathon.pk}/potential_members/'
+        for params in ({'team': 'abc'}, {'recommend': 1, 'top': 'x'}, {'recommend': 1, 'top': 0},
+                       {'recommend': 'maybe'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(list(params)[-1], response.data)
+
+    def test_recommend_flag_is_parsed_as_boolean(self):
+        self.participant('member', 'Python')
+        url = f'/api/hackathons/{self.hackathon.pk}/potential_members/'
+        for value in ('0', 'false'):
+            self.assertNotIn('match_score', self.client.get(url, {'recommend': value}).data[0])
+        self.assertIn('match_score', self.client.get(url, {'recommend': 'true'}).data[0])
+
+    def test_index_updates_incrementally_on_profile_save(self):
+        self.participant('late', 'Excel')
+        self.participant('other', 'Figma')
+        profile = UserProfile.objects.get(user__username='late')
+        profile.skills = 'React, Vue, Figma, UX'
+        profile.save()
+        self.assertEqual(self.ranked(team=self.team.pk)[0], 'late')
+
+    def test_plain_list_does_not_query_per_participant(self):
+        for i in range(5):
+            self.participant(f'user{i}', 'Python')
+        with self.assertNumQueries(2):
+            self.assertEqual(len(self.ranked()), 5)
+
+    def test_punctuation_is_not_part_of_skill(self):
+        self.assertEqual(tokenize('React, Vue. Python, Django.'), {'react', 'vue', 'python', 'django'})
+        self.assertEqual(tokenize('C#, .NET, Node.js.'), {'c#', '.net', 'node.js'})
+        vector = dict(zip(ROLES, role_vector('React, Vue. Python, Django.')))
+        self.assertEqual((vector['frontender'], vector['backender']), (1.0, 1.0))
+
+    def test_rebuild_scans_without_blocking_index(self):
+        late = self.participant('late', 'Excel')
+        index = SkillIndex()
+        index.rebuild()
+        profile = late.profile
+        profile.skills = 'Figma, UX'
+        original = recommendations.role_vector
+        ranked = []
+
+        def concurrent():
+            # Пока идёт скан, индекс отвечает, а правка профиля не теряется после подмены массивов
+            ranked.extend(index.rank([late.pk], ['designer']))
+            index.update(profile)
+
+        def scanning_role_vector(skills):
+            recommendations.role_vector = original
+            worker = threading.Thread(target=concurrent)
+            worker.start()
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
+            return original(skills)
+
+        recommendations.role_vector = scanning_role_vector
+        self.addCleanup(setattr, recommendations, 'role_vector', original)
+        index.rebuild()
+        self.assertEqual([user_id for user_id, _ in ranked], [late.pk])
+        self.assertGreater(dict(index.rank([late.pk], ['designer']))[late.pk], 0.9)
+
+    def test_numpy_scoring_is_fast_for_large_events(self):
+        index = SkillIndex()
+        index._built_at = time.monotonic()
+        for user_id in range(20000):
+            index._put(user_id, 'React, Python, Figma'[:(user_id % 20) + 1], 'beginner', user_id % 70)
+        started = time.perf_counter()
+        ranked = index.rank(range(20000), ['frontender', 'designer'], team_user_ids=[1, 2], top=10)
+        self.assertEqual(len(ranked), 10)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+
+class SearchTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        make_hackathon(name='Moscow AI Challenge', partners='Yandex, Sber')
+        make_hackathon(name='Web Sprint', partners='VK')
+        make_hackathon(name='Mobile Cup', partners='Moscow tech park')
+
+    def found(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item.get('name') or item.get('username') for item in response.data['results']]
+
+    def test_hackathons_ranked_by_name_over_partners(self):
+        self.assertEqual(self.found(q='moscow'), ['Moscow AI Challenge', 'Mobile Cup'])
+        self.assertEqual(self.found(q='yand'), ['Moscow AI Challenge'])
+        self.assertEqual(self.found(q='"); drop table'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        hackathon = Hackathon.objects.get(name='Web Sprint')
+        hackathon.name = 'Frontend Sprint'
+        hackathon.save()
+        self.assertEqual(self.found(q='web'), [])
+        self.assertEqual(self.found(q='frontend'), ['Frontend Sprint'])
+        hackathon.delete()
+        self.assertEqual(self.found(q='frontend'), [])
+
+    def test_paginates(self):
+        for i in range(5):
+            make_hackathon(name=f'Series {i}')
+        first = self.client.get('/api/search/', {'q': 'series', 'page_size': 3}).data
+        second = self.client.get('/api/search/', {'q': 'series', 'page_size': 3, 'page': 2}).data
+        self.assertTrue(first['has_next'])
+        self.assertFalse(second['has_next'])
+        names = [item['name'] for item in first['results'] + second['results']]
+        self.assertEqual(sorted(names), [f'Series {i}' for i in range(5)])
+
+    def test_profiles_require_authentication(self):
+        user = User.objects.create(username='dev')
+        UserProfile.objects.create(user=user, display_name='Иван', skills='Django, React')
+        self.assertEqual(self.client.get('/api/search/', {'q': 'django', 'type': 'profile'}).status_code, 401)
+        self.client.force_authenticate(user)
+        self.assertEqual(self.found(q='django', type='profile'), ['dev'])
+        self.assertEqual(self.found(q='иван', type='profile'), ['dev'])
+
+    def test_profiles_hide_contacts(self):
+        user = User.objects.create(username='dev', email='dev@example.com')
+        UserProfile.objects.create(user=user, skills='Django', telegram_id='12345')
+        self.client.force_authenticate(User.objects.create(username='other'))
+        response = self.client.get('/api/search/', {'q': 'django', 'type': 'profile'})
+        [profile] = response.data['results']
+        self.assertEqual(profile['username'], 'dev')
+        self.assertNotIn('email', profile)
+        self.assertNotIn('telegram_id', profile)
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.TABLE}')
+        self.assertEqual(self.found(q='moscow'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.found(q='moscow')), 2)
+
+
+class CleanupCodesTests(TestCase):
+
+    def test_purges_expired_and_used_in_batches(self):
+        now = timezone.now()
+        LoginCode.objects.bulk_create(
+            [LoginCode(code=f'old{i:05d}', telegram_id='1', expires_at=now - timedelta(minutes=1)) for i in range(7)]
+            + [LoginCode(code='used0001', telegram_id='2', expires_at=now + timedelta(minutes=5), used=True),
+               LoginCode(code='live0001', telegram_id='3', expires_at=now + timedelta(minutes=5))]
+        )
+        out = StringIO()
+        call_command('cleanup_codes', '--batch-size=3', '--sleep=0', stdout=out)
+        self.assertEqual(list(LoginCode.objects.values_list('code', flat=True)), ['live0001'])
+        self.assertIn('истёкших: удалено 7', out.getvalue())
+        self.assertIn('Удалено 8 кодов входа', out.getvalue())
+
+    def test_grace_applies_to_used_codes(self):
+        now = timezone.now()
+        LoginCode.objects.bulk_create([
+            LoginCode(code='used0001', telegram_id='1', expires_at=now + timedelta(minutes=5), used=True),
+            LoginCode(code='used0002', telegram_id='2', expires_at=now + timedelta(minutes=5), used=True),
+            LoginCode(code='old00001', telegram_id='3', expires_at=now - timedelta(minutes=1)),
+        ])
+        LoginCode.objects.filter(code='used0002').update(created_at=now - timedelta(minutes=30))
+        call_command('cleanup_codes', '--grace-minutes=10', '--sleep=0', stdout=StringIO())
+        self.assertEqual(sorted(LoginCode.objects.values_list('code', flat=True)), ['old00001', 'used0001'])
+
+    def test_used_codes_purge_uses_index(self):
+        with connection.cursor() as cursor:
+            if connection.vendor != 'sqlite':
+                self.skipTest('EXPLAIN QUERY PLAN есть только в SQLite')
+            query = LoginCode.objects.filter(used=True, created_at__lt=timezone.now()).values('pk')
+            sql, params = query.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('logincode_used_idx', plan)
+
+    def test_bot_lookup_uses_index(self):
+        with connection.cursor() as cursor:
+            if connection.vendor != 'sqlite':
+                self.skipTest('EXPLAIN QUERY PLAN есть только в SQLite')
+            query = LoginCode.objects.filter(telegram_id='1', used=False, expires_at__gt=timezone.now())
+            sql, params = query.query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('logincode_lookup_idx', plan)
+
+
+def load_bot():
+    bot_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'bot', 'main')
+    if bot_dir not in sys.path:
+        sys.path.insert(0, bot_dir)
+    return importlib.import_module('bot'), importlib.import_module('bot_webhook'), importlib.import_module('fake_bot_api')
+
+
+class BotRuntimeTests(TransactionTestCase):
+    """Бот против локального fake Bot API; ORM работает из потоков пула, поэтому без общей транзакции"""
+
+    def setUp(self):
+        self.bot, self.webhook, fake_bot_api = load_bot()
+        from telebot import asyncio_helper
+
+        self.api_helper = asyncio_helper
+        self.original_url = asyncio_helper.API_URL
+        self.api = fake_bot_api.FakeBotAPI(delay=0.3)
+
+    def tearDown(self):
+        self.api_helper.API_URL = self.original_url
+
+    async def start_api(self):
+        await self.api.start()
+        self.api_helper.API_URL = self.api.url + '/bot{0}/{1}'
+
+    async def stop_api(self):
+        await self.bot.bot.close_session()
+        await self.api.stop()
+
+    async def test_updates_are_handled_concurrently(self):
+        # Ответы на sendMessage придут, только когда все 8 обработчиков одновременно дойдут до отправки:
+        # при последовательной обработке первый ответ не придёт никогда
+        self.api.hold_sends(8)
+        await self.start_api()
+        try:
+            updates = [self.api.message_update('/login', 1000 + i, f'user{i}') for i in range(8)]
+            await asyncio.wait_for(
+                self.bot.bot.process_new_updates([self.bot.types.Update.de_json(u) for u in updates]), 10
+            )
+        finally:
+            await self.stop_api()
+        self.assertEqual(sorted(m['chat_id'] for m in self.api.sent), [1000 + i for i in range(8)])
+        self.assertTrue(all('<code>' in m['text'] for m in self.api.sent))
+        self.assertEqual(await LoginCode.objects.filter(telegram_id__startswith='100').acount(), 8)
+
+    async def test_issue_code_retries_locked_database(self):
+        generate_code = self.bot.generate_code
+        failures = iter([OperationalError('database is locked')] * 2)
+
+        def flaky_generate_code():
+            error = next(failures, None)
+            if error:
+                raise error
+            return generate_code()
+
+        self.bot.generate_code = flaky_generate_code
+        self.addCleanup(setattr, self.bot, 'generate_code', generate_code)
+        await self.start_api()
+        try:
+            with self.assertLogs(self.bot.logger, 'WARNING') as logs:
+                await self.bot.process_update(self.api.message_update('/login', 43, 'carol'))
+        finally:
+            await self.stop_api()
+        self.assertEqual(len(logs.records), 2)
+        code = await LoginCode.objects.aget(telegram_id='43')
+        self.assertIn(f'<code>{code.code}</code>', self.api.sent[0]['text'])
+
+    async def test_failed_handler_replies_with_error(self):
+        generate_code = self.bot.generate_code
+
+        def broken_generate_code():
+            raise OperationalError('database is locked')
+
+        self.bot.generate_code = broken_generate_code
+        self.addCleanup(setattr, self.bot, 'generate_code', generate_code)
+        await self.start_api()
+        try:
+            with self.assertLogs(self.bot.logger, 'ERROR'):
+                await self.bot.process_update(self.api.message_update('/login', 44, 'dave'))
+        finally:
+            await self.stop_api()
+        self.assertEqual([m['chat_id'] for m in self.api.sent], [44])
+        self.assertIn('Не удалось выполнить команду', self.api.sent[0]['text'])
+        self.assertFalse(await LoginCode.objects.filter(telegram_id='44').aexists())
+
+    async def test_login_reuses_active_code(self):
+        await self.start_api()
+        try:
+            for _ in range(2):
+                await self.bot.process_update(self.api.message_update('/login', 42, 'alice'))
+        finally:
+            await self.stop_api()
+        code = await LoginCode.objects.aget(telegram_id='42')
+        self.assertIn(f'<code>{code.code}</code>', self.api.sent[0]['text'])
+        self.assertIn('уже есть действующий код', self.api.sent[1]['text'])
+
+    async def test_webhook_checks_secret_and_schedules_update(self):
+        calls = []
+
+        async def django_app(scope, receive, send):
+            calls.append(scope['path'])
+
+        app = self.webhook.mount(django_app, path='/telegram/webhook/', secret='s3cret')
+
+        async def post(body, secret):
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            headers = [(b'x-telegram-bot-api-secret-token', secret.encode())]
+            await app({'type': 'http', 'path': '/telegram/webhook/', 'method': 'POST', 'headers': headers},
+                      receive, send)
+            return messages[0]['status']
+
+        await self.start_api()
+        try:
+            update = json.dumps(self.api.message_update('/start login', 7, 'bob')).encode()
+            self.assertEqual(await post(update, 'wrong'), 403)
+            self.assertEqual(await post(update, 's3cret'), 200)
+            await asyncio.gather(*self.webhook.tasks)
+            await app({'type': 'http', 'path': '/api/hackathons/', 'method': 'GET', 'headers': []}, None, None)
+        finally:
+            await self.stop_api()
+        self.assertEqual(calls, ['/api/hackathons/'])
+        self.assertEqual(len(self.api.sent), 1)
+        self.assertTrue(await LoginCode.objects.filter(telegram_id='7').aexists())
+
+
+class CachedAuthenticationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='cached')
+        self.profile = UserProfile.objects.create(user=self.user, display_name='Before')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_repeated_requests_skip_user_and_profile_queries(self):
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.client.get('/api/profile/').status_code, 200)
+        # Пользователь с профилем — один JOIN при первом запросе, дальше из кэша
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 0)
+        with CaptureQueriesContext(connection) as teams:
+            self.assertEqual(self.client.get('/api/my_teams/').status_code, 200)
+        self.assertFalse([q['sql'] for q in teams.captured_queries if q['sql'].startswith('SELECT "auth_user"')])
+
+    def test_profile_save_invalidates_cached_user(self):
+        self.client.get('/api/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.display_name = 'After'
+            self.profile.save()
+        self.assertEqual(self.client.get('/api/profile/').data['display_name'], 'After')
+
+    def test_inactive_user_is_rejected_after_save(self):
+        self.client.get('/api/profile/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+    def test_cache_is_bounded_and_expires(self):
+        user_cache = authentication.UserCache(ttl=0.05, max_entries=2)
+        for key in 'abc':
+            user_cache.set(key, key)
+        self.assertEqual(len(user_cache), 2)
+        self.assertIsNone(user_cache.get('a'))
+        self.assertEqual(user_cache.get('c'), 'c')
+        time.sleep(0.06)
+        self.assertIsNone(user_cache.get('c'))
+
+
+def png_upload(color, name='photo.png', size=(600, 400)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class AvatarPipelineTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create(username='pic')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def upload(self, upload):
+        # Обработка ставится в очередь задач; в тестах очередь выполняется явно
+        response = self.client.patch('/api/profile/', {'avatar': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def originals(self):
+        return sorted(name for name in os.listdir(os.path.join(self.media_root, 'avatars')) if name != 'v')
+
+    def test_variants_are_built_after_the_request(self):
+        response = self.upload(png_upload('red'))
+        self.assertIsNone(response.data['avatar_urls'])
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, avatars.VARIANTS_DIR)))
+
+        self.assertEqual(Job.objects.get().name, 'process_avatar')
+        self.assertEqual(jobs.run_pending(), 1)
+        # force_authenticate отдаёт тот же объект пользователя вместе с закэшированным профилем
+        self.profile.refresh_from_db()
+        urls = self.client.get('/api/profile/').data['avatar_urls']
+        self.assertEqual(sorted(urls), ['128', '256', '64'])
+        with Image.open(os.path.join(self.media_root, avatars.variant_name(self.profile.avatar_hash, 64, 'webp'))) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (64, 64)))
+        self.assertTrue(urls['256']['jpg'].endswith(f'/media/avatars/v/{self.profile.avatar_hash}-256.jpg'))
+
+    def test_reupload_of_same_content_is_deduplicated(self):
+        self.upload(png_upload('blue', 'first.png'))
+        avatars.process(self.profile.pk)
+        self.profile.refresh_from_db()
+        response = self.upload(png_upload('blue', 'second.png'))
+        self.assertIsNotNone(response.data['avatar_urls'])
+        self.assertEqual(len(self.originals()), 1)
+
+    def test_variant_is_served_with_immutable_cache_headers(self):
+        self.upload(png_upload('green'))
+        avatars.process(self.profile.pk)
+        self.profile.refresh_from_db()
+        response = self.client.get(f'/media/avatars/v/{self.profile.avatar_hash}-128.webp')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/media/avatars/v/../../db.sqlite3').status_code, 404)
+
+
+class AsyncReadViewTests(ApiTestCase):
+    """Async-версии read-эндпоинтов отдают тот же JSON, что и DRF-views"""
+
+    def setUp(self):
+        super().setUp()
+        self.hackathon = make_hackathon()
+        self.teams = make_teams(self.hackathon, 3)
+        self.user = self.teams[0].captain
+        UserProfile.objects.create(user=self.user, display_name='Капитан', skills='python')
+        Message.objects.create(sender=self.teams[1].captain, receiver=self.user, team=self.teams[1],
+                               message_type='join_request', text='hi')
+        self.token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def both(self, view, path, params=None, **kwargs):
+        sync_response = self.client.get(path, params)
+        cache.get_cache().clear()
+        request = RequestFactory().get(path, params, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        async_response = async_to_sync(view)(request, **kwargs)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        return json.loads(sync_response.content), json.loads(async_response.content)
+
+    def test_catalog_endpoints_match_sync_views(self):
+        sync_data, async_data = self.both(async_views.hackathon_list, '/api/hackathons/', {'category': 'web_dev'})
+        self.assertEqual(async_data, sync_data)
+        sync_data, async_data = self.both(async_views.hackathon_detail, f'/api/hackathons/{self.hackathon.pk}/',
+                                          {'page_size': 2}, pk=self.hackathon.pk)
+        self.assertEqual(async_data, sync_data)
+        self.assertIsNotNone(async_data['teams_next'])
+        sync_data, async_data = self.both(async_views.hackathon_dates, '/api/hackathon-dates/')
+        self.assertEqual(sorted(async_data['hackathon_dates']), sorted(sync_data['hackathon_dates']))
+
+    def test_user_endpoints_match_sync_views(self):
+        sync_data, async_data = self.both(async_views.my_teams, '/api/my_teams/')
+        self.assertEqual(async_data, sync_data)
+        sync_data, async_data = self.both(async_views.user_profile, '/api/profile/')
+        self.assertEqual(async_data, sync_data)
+        sync_data, async_data = self.both(async_views.messages, '/api/messages/')
+        # sync_token зависит от текущего времени
+        sync_data.pop('sync_token'), async_data.pop('sync_token')
+        self.assertEqual(async_data, sync_data)
+        self.assertEqual(len(async_data['results']), 1)
+
+    def test_errors_match_sync_views(self):
+        sync_data, async_data = self.both(async_views.hackathon_detail, '/api/hackathons/999/', pk=999)
+        self.assertEqual(async_data, sync_data)
+        sync_data, async_data = self.both(async_views.hackathon_list, '/api/hackathons/', {'start': 'nope'})
+        self.assertEqual(async_data, sync_data)
+        response = async_to_sync(async_views.messages)(RequestFactory().get('/api/messages/'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+    def test_profile_update_falls_back_to_sync_view(self):
+        request = RequestFactory().patch('/api/profile/', json.dumps({'bio': 'async'}), content_type='application/json',
+                                         HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = async_to_sync(async_views.user_profile)(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserProfile.objects.get(user=self.user).bio, 'async')
+
+
+class BulkInviteTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.broker = RecordingBroker()
+        self.addCleanup(realtime.set_broker, realtime.set_broker(self.broker))
+        self.team = make_teams(make_hackathon(), 1, members_per_team=1)[0]
+        self.team.size_max = 4
+        self.team.save()
+        self.captain = self.team.captain
+        self.client.force_authenticate(self.captain)
+        self.users = [User.objects.create(username=f'bulk{i}') for i in range(10)]
+
+    def invite(self, user_ids):
+        return self.client.post(f'/api/teams/{self.team.pk}/invite/bulk/', {'user_ids': user_ids}, format='json')
+
+    def test_reports_outcome_per_user(self):
+        a, b, c, d = (user.pk for user in self.users[:4])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.invite([a, b, self.captain.pk, 999999, a, c, d])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['invited'], 3)
+        self.assertEqual([(r['user_id'], r['status']) for r in response.data['results']], [
+            (a, 'invited'), (b, 'invited'), (self.captain.pk, 'already_member'),
+            (999999, 'not_found'), (c, 'invited'), (d, 'team_full'),
+        ])
+        self.team.refresh_from_db()
+        self.assertEqual((self.team.member_count, self.team.is_full), (4, True))
+        self.assertEqual(Message.objects.filter(team=self.team, message_type='team_invite').count(), 3)
+        created = [users for users, event in self.broker.events if event['type'] == 'message.created']
+        self.assertEqual(created, [{self.captain.pk, a}, {self.captain.pk, b}, {self.captain.pk, c}])
+
+    def test_invites_into_slots_left_after_concurrent_join(self):
+        a, b, c = (user.pk for user in self.users[:3])
+
+        def join_meanwhile(sender, instance, **kwargs):
+            # Параллельный запрос занимает одно место сразу после того, как view прочитал команду
+            post_init.disconnect(join_meanwhile, sender=Team)
+            TeamMember.objects.create(team_id=instance.pk, user=self.users[9], status='joined')
+            Team.objects.filter(pk=instance.pk).update(member_count=F('member_count') + 1)
+
+        post_init.connect(join_meanwhile, sender=Team)
+        self.addCleanup(post_init.disconnect, join_meanwhile, sender=Team)
+        response = self.invite([a, b, c])
+        self.assertEqual(response.data['invited'], 2)
+        self.assertEqual([r['status'] for r in response.data['results']], ['invited', 'invited', 'team_full'])
+        self.team.refresh_from_db()
+        self.assertEqual((self.team.member_count, self.team.is_full), (4, True))
+        self.assertEqual(TeamMember.objects.filter(team=self.team).count(), 4)
+
+    def test_query_count_does_not_grow_with_list(self):
+        self.team.size_max = 20
+        self.team.save()
+        with CaptureQueriesContext(connection) as small:
+            self.invite([user.pk for user in self.users[:2]])
+        with CaptureQueriesContext(connection) as large:
+            self.invite([user.pk for user in self.users[2:10]])
+        self.assertEqual(len(small), len(large))
+
+    def test_only_captain_can_invite(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.invite([self.users[1].pk]).status_code, 404)
+        self.assertEqual(self.client.post(f'/api/teams/{self.team.pk}/invite/bulk/', {'user_ids': []},
+                                          format='json').status_code, 400)
+
+
+class JobQueueTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        self.failures = 0
+        self.addCleanup(jobs.handlers.pop, 'test_job', None)
+
+        @jobs.register('test_job')
+        def test_job(value):
+            self.calls.append(value)
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError('boom')
+
+    def test_runs_job_once(self):
+        job = jobs.enqueue('test_job', value=1)
+        self.assertEqual(jobs.work(), (1, 0))
+        self.assertEqual(jobs.work(), (0, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, self.calls), ('done', 1, [1]))
+        with self.assertRaises(ValueError):
+            jobs.enqueue('missing')
+
+    def test_failed_job_is_retried_with_backoff(self):
+        self.failures = 1
+        job = jobs.enqueue('test_job', max_attempts=2, value=2)
+        with self.assertLogs('mini.jobs', 'WARNING'):
+            self.assertEqual(jobs.work(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=jobs.RETRY_BASE_SECONDS - 1))
+        # До конца паузы задача не выдаётся
+        self.assertEqual(jobs.work(), (0, 0))
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(jobs.work(), (1, 0))
+        self.assertEqual(self.calls, [2, 2])
+
+    def test_gives_up_after_max_attempts(self):
+        self.failures = 5
+        job = jobs.enqueue('test_job', max_attempts=2, value=3)
+        with self.assertLogs('mini.jobs', 'WARNING') as logs:
+            jobs.work()
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            jobs.work()
+        self.assertEqual(len(logs.records), 2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(jobs.stats()['failed'], 1)
+
+    def test_expired_lease_is_redelivered(self):
+        job = jobs.enqueue('test_job', value=4)
+        self.assertEqual(len(jobs.claim(10)), 1)
+        # Воркер «упал»: пока аренда действует, задачу никто не берёт
+        self.assertEqual(jobs.claim(10), [])
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.work(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+    def test_expired_lease_counts_towards_max_attempts(self):
+        job = jobs.enqueue('test_job', max_attempts=2, value=6)
+        with self.assertLogs('mini.jobs', 'WARNING'):
+            # Каждый раз воркер «умирает» посреди задачи, не дойдя до run()
+            for _ in range(3):
+                jobs.claim(10)
+                Job.objects.filter(pk=job.pk, status='running').update(locked_until=timezone.now() - timedelta(seconds=1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_until), ('failed', 2, None))
+        self.assertIn('Аренда истекла', job.last_error)
+        self.assertEqual(jobs.claim(10), [])
+        self.assertEqual(self.calls, [])
+
+    def test_worker_with_expired_lease_does_not_overwrite_reclaimed_job(self):
+        job = jobs.enqueue('test_job', value=7)
+        self.failures = 1
+        stale = jobs.claim(10)[0]
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        current = jobs.claim(10)[0]
+        # Старый воркер доработал после того, как задачу забрал другой: ни ошибка, ни успех не пишутся
+        with self.assertLogs('mini.jobs', 'WARNING'):
+            self.assertFalse(jobs.run(stale))
+            self.assertFalse(jobs.run(stale))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('running', 2, ''))
+        self.assertTrue(jobs.run(current))
+        job.refresh_from_db()
+        self.assertEqual((job.status, self.calls), ('done', [7, 7, 7]))
+
+    def test_stats_and_worker_command(self):
+        jobs.enqueue('test_job', value=5)
+        jobs.enqueue('test_job', delay=3600, value=6)
+        stats = jobs.stats()
+        self.assertEqual((stats['depth'], stats['queued']), (1, 2))
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+        stats = jobs.stats()
+        self.assertEqual((stats['depth'], stats['done']), (0, 1))
+        self.assertIsNotNone(stats['run_ms']['p50'])
+
+        self.assertEqual(self.client.get('/api/job-stats/').status_code, 401)
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(self.client.get('/api/job-stats/').data['queued'], 1)
+
+    def test_enqueue_is_rolled_back_with_transaction(self):
+        hackathon = make_hackathon()
+        try:
+            with transaction.atomic():
+                jobs.enqueue('recount_hackathon', hackathon_id=hackathon.pk)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+
+def run_fake_bot_api(testcase):
+    """Fake Bot API в отдельном потоке со своим event loop — для синхронного кода"""
+    fake_bot_api = load_bot()[2]
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    api = asyncio.run_coroutine_threadsafe(fake_bot_api.FakeBotAPI().start(), loop).result(5)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(api.stop(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+    testcase.addCleanup(stop)
+    return api
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@override_settings(TELEGRAM_NOTIFICATIONS=True, TELEGRAM_BOT_TOKEN='test', TELEGRAM_NOTIFY_DELAY=0)
+class TelegramNotificationTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = run_fake_bot_api(self)
+        self.clock = FakeClock()
+        self.sender = notifications.Sender(
+            client=notifications.BotClient(api_url=self.api.url), clock=self.clock, sleep=self.clock.sleep,
+        )
+        self.team = make_teams(make_hackathon(), 1, members_per_team=1)[0]
+        self.team.size_max = 10
+        self.team.save()
+        self.captain = self.team.captain
+        UserProfile.objects.create(user=self.captain, telegram_id='500')
+        self.users = [User.objects.create(username=f'tg{i}') for i in range(4)]
+        for i, user in enumerate(self.users[:3]):
+            UserProfile.objects.create(user=user, telegram_id=str(600 + i))
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.post(f'/api/teams/{self.team.pk}/join/').status_code, 200)
+
+    def test_messages_are_queued_without_calling_telegram(self):
+        self.client.force_authenticate(self.captain)
+        response = self.client.post(f'/api/teams/{self.team.pk}/invite/bulk/',
+                                    {'user_ids': [user.pk for user in self.users]}, format='json')
+        self.assertEqual(response.data['invited'], 4)
+        # Последний приглашённый Telegram не привязал
+        self.assertEqual(sorted(Notification.objects.values_list('chat_id', flat=True)), ['600', '601', '602'])
+        self.assertEqual(self.api.sent, [])
+
+    def test_events_for_one_recipient_are_coalesced(self):
+        for user in self.users[:3]:
+            self.join(user)
+        self.client.force_authenticate(self.captain)
+        self.client.post(f'/api/teams/{self.team.pk}/invite/', {'user_id': self.users[3].pk})
+
+        self.assertEqual(self.sender.send_pending(), 1)
+        self.assertEqual(len(self.api.sent), 1)
+        self.assertEqual(self.api.sent[0]['chat_id'], 500)
+        text = self.api.sent[0]['text']
+        self.assertTrue(text.startswith('Новых сообщений: 3'))
+        self.assertEqual(text.count('хочет присоединиться'), 3)
+        self.assertEqual(Notification.objects.filter(status='sent').count(), 3)
+        self.assertEqual(self.sender.counts['coalesced'], 2)
+
+    def test_chat_limit_defers_only_that_chat(self):
+        self.join(self.users[0])
+        self.assertEqual(self.sender.send_pending(), 1)
+        self.join(self.users[1])
+        self.client.force_authenticate(self.captain)
+        self.client.post(f'/api/teams/{self.team.pk}/invite/', {'user_id': self.users[2].pk})
+        # Капитану уже писали в эту секунду, приглашённому — нет
+        self.assertEqual(self.sender.send_pending(), 1)
+        self.assertEqual([message['chat_id'] for message in self.api.sent], [500, 602])
+        self.assertEqual(self.sender.counts['throttled'], 1)
+        self.clock.now += 1
+        self.assertEqual(self.sender.send_pending(), 1)
+        self.assertEqual(Notification.objects.filter(status='pending').count(), 0)
+
+    def test_global_limit_spreads_sends(self):
+        sender = notifications.Sender(client=notifications.BotClient(api_url=self.api.url), global_rate=2,
+                                      clock=self.clock, sleep=self.clock.sleep)
+        self.client.force_authenticate(self.captain)
+        self.client.post(f'/api/teams/{self.team.pk}/invite/bulk/',
+                         {'user_ids': [user.pk for user in self.users[:3]]}, format='json')
+        self.join(User.objects.create(username='joiner'))
+        self.assertEqual(sender.send_pending(), 4)
+        # 2 токена про запас, затем по одному каждые 0.5 с
+        self.assertAlmostEqual(self.clock.now, 1.0)
+
+    def test_failures_are_retried_or_dropped(self):
+        self.join(self.users[0])
+        notification = Notification.objects.get()
+        self.api.fail_send(429, 'Too Many Requests', retry_after=30)
+        self.assertEqual(self.sender.send_pending(), 0)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('pending', 0))
+        self.assertGreater(notification.next_attempt_at, timezone.now() + timedelta(seconds=29))
+
+        Notification.objects.update(next_attempt_at=timezone.now())
+        self.clock.now += 30
+        self.api.fail_send(502, 'Bad Gateway')
+        with self.assertLogs('mini.notifications', 'WARNING'):
+            self.assertEqual(self.sender.send_pending(), 0)
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+
+        Notification.objects.update(next_attempt_at=timezone.now())
+        self.clock.now += 1
+        self.api.fail_send(403, 'Forbidden: bot was blocked by the user')
+        self.sender.send_pending()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'failed')
+        self.assertEqual(self.api.sent, [])
+
+    @override_settings(TELEGRAM_NOTIFICATIONS=False)
+    def test_nothing_is_queued_without_bot_token(self):
+        self.join(self.users[0])
+        self.assertFalse(Notification.objects.exists())
+
+
+class BenchmarkSuiteTests(ApiTestCase):
+    SEED = ['--hackathons', '4', '--users', '60', '--participants', '10', '--hot-teams', '5',
+            '--messages', '40', '--hot-messages', '10']
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.output = os.path.join(media.name, 'bench.json')
+
+    def snapshot(self):
+        return (
+            list(Team.objects.order_by('name').values_list('name', 'captain__username', 'member_count')),
+            list(Message.objects.order_by('receiver__username', 'text').values_list('receiver__username', 'text')),
+        )
+
+    def test_seed_is_deterministic_and_consistent(self):
+        call_command('seed_bench_data', *self.SEED, stdout=StringIO())
+        first = self.snapshot()
+        self.assertEqual(Hackathon.objects.get(name='bench hackathon 0').registered_teams, 5)
+        self.assertGreaterEqual(Message.objects.filter(receiver__username='bench-000000').count(), 10)
+        call_command('seed_bench_data', *self.SEED, '--clear', stdout=StringIO())
+        self.assertEqual(self.snapshot(), first)
+        out = StringIO()
+        call_command('repair_counters', '--check', stdout=out)
+        self.assertIn('Найдено расхождений: 0', out.getvalue())
+
+    def test_covers_every_route_and_detects_regressions(self):
+        call_command('seed_bench_data', *self.SEED, stdout=StringIO())
+        users = User.objects.count()
+        call_command('bench_endpoints', '--requests', '2', '--warmup', '0', '--output', self.output,
+                     stdout=StringIO())
+        with open(self.output, encoding='utf-8') as file:
+            results = json.load(file)
+        named = {pattern.name for pattern in importlib.import_module('backend.urls').urlpatterns
+                 if getattr(pattern, 'name', None)}
+        self.assertEqual(set(results['routes']) | set(results['skipped']), named)
+        self.assertEqual({name: row['errors'] for name, row in results['routes'].items() if row['errors']}, {})
+        # Пишущие сценарии откатываются; остаётся только пользователь-администратор бенчмарка
+        self.assertEqual(User.objects.count(), users + 1)
+
+        baseline = os.path.join(os.path.dirname(self.output), 'baseline.json')
+        results['routes']['messages']['queries'] -= 1
+        with open(baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file)
+        call_command('bench_endpoints', '--diff', self.output, self.output, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'messages: SQL'):
+            call_command('bench_endpoints', '--diff', baseline, self.output, stdout=StringIO())
+
+
+@override_settings(PERF_SAMPLE_RATE=1.0, PERF_SLOW_REQUEST_MS=10000, PERF_REPEATED_SQL=2)
+class PerformanceMiddlewareTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hackathon = make_hackathon()
+        make_teams(self.hackathon, 2)
+        self.user = User.objects.create(username='timed')
+        UserProfile.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def timings(self, response):
+        return {part.split(';')[0]: part for part in response['Server-Timing'].split(', ')}
+
+    def test_server_timing_splits_request(self):
+        timings = self.timings(self.client.get(f'/api/hackathons/{self.hackathon.pk}/'))
+        self.assertEqual(set(timings), {'db', 'auth', 'serialize', 'view', 'render', 'total'})
+        self.assertRegex(timings['db'], r'^db;dur=[\d.]+;desc="\d+ SQL"$')
+
+    def test_repeated_sql_is_logged(self):
+        with perf.measure() as timings:
+            for _ in range(3):
+                list(Hackathon.objects.filter(pk=self.hackathon.pk))
+        self.assertEqual(timings.queries, 3)
+        [(sql, count)] = timings.repeated()
+        self.assertEqual(count, 3)
+        self.assertIn('mini_hackathon', sql)
+
+        def n_plus_one_view(request):
+            for team in Team.objects.filter(hackathon=self.hackathon):
+                team.captain.username
+            return HttpResponse('ok')
+
+        middleware = perf.PerformanceMiddleware(n_plus_one_view)
+        with self.assertLogs('mini.perf', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/teams/'))
+        self.assertIn('Server-Timing', response)
+        record = logs.records[0].perf
+        self.assertEqual((record['event'], record['path'], record['queries']), ('repeated_sql', '/teams/', 3))
+        self.assertTrue(record['n_plus_one'])
+        self.assertEqual(record['repeated_sql'][0]['count'], 2)
+
+    def test_slow_request_is_logged(self):
+        with override_settings(PERF_SLOW_REQUEST_MS=0), self.assertLogs('mini.perf', 'WARNING') as logs:
+            self.client.get('/api/hackathons/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['event'], record['status'], record['route']), ('slow_request', 200, 'hackathons_list'))
+        self.assertGreaterEqual(record['total_ms'], record['db_ms'])
+
+    async def test_async_requests_are_measured(self):
+        response = await self.async_client.get(f'/api/hackathons/{self.hackathon.pk}/')
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'auth', 'serialize', 'view', 'render', 'total'})
+        self.assertRegex(timings['db'], r'^db;dur=[\d.]+;desc="[1-9]\d* SQL"$')
+
+    def test_asgi_middleware_chain_stays_async(self):
+        # Sync-only middleware заставил бы Django обернуть всю цепочку в SyncToAsync
+        with override_settings(PERF_SAMPLE_RATE=1.0):
+            handler = ASGIHandler()
+        self.assertIn('mini.metrics.MetricsMiddleware', settings.MIDDLEWARE)
+        self.assertIn('mini.perf.PerformanceMiddleware', settings.MIDDLEWARE)
+        self.assertNotIsInstance(handler._middleware_chain, SyncToAsync)
+
+    def test_unsampled_requests_are_not_instrumented(self):
+        with override_settings(PERF_SAMPLE_RATE=0.0):
+            client = APIClient()
+            self.assertNotIn('Server-Timing', client.get('/api/hackathons/'))
+
+
+class MetricsTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(override_settings(METRICS_DIR=self.directory))
+
+    def value(self, name, **labels):
+        return metrics.collect()['counters'].get(metrics._key(name, labels), 0)
+
+    def test_requests_are_counted_by_route(self):
+        client = APIClient()
+        before = self.value('http_requests_total', route='hackathons_list', method='GET', status='200')
+        client.get('/api/hackathons/')
+        client.get('/api/hackathons/')
+        with override_settings(METRICS_TOKEN='secret'):
+            body = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+
+        self.assertEqual(self.value('http_requests_total', route='hackathons_list', method='GET', status='200'),
+                         before + 2)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn('http_requests_total{method="GET",route="hackathons_list",status="200"}', body)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="hackathons_list",le="+Inf"}', body)
+        self.assertIn('http_request_db_queries_count{route="hackathons_list"}', body)
+        self.assertIn('job_queue_depth 0', body)
+
+    async def test_async_requests_are_counted(self):
+        labels = {'route': 'hackathons_list', 'method': 'GET', 'status': '200'}
+        before = self.value('http_requests_total', **labels)
+        await self.async_client.get('/api/hackathons/')
+        self.assertEqual(self.value('http_requests_total', **labels), before + 1)
+
+    def test_unknown_paths_share_one_series(self):
+        client = APIClient()
+        before = self.value('http_requests_total', route='unmatched', method='GET', status='404')
+        client.get('/no-such-page/1')
+        client.get('/no-such-page/2')
+        self.assertEqual(self.value('http_requests_total', route='unmatched', method='GET', status='404'), before + 2)
+
+    def test_other_processes_are_summed_and_compacted(self):
+        before = self.value('bot_login_codes_issued_total')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.inc('bot_login_codes_issued_total', 3)
+                metrics.store.flush()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+        self.assertEqual(self.value('bot_login_codes_issued_total'), before + 3)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, metrics.MERGED)))
+        self.assertFalse(any(name.startswith(f'{pid}-') for name in os.listdir(self.directory)))
+        # Счётчик завершившегося процесса не пропадает при следующих сборах
+        self.assertEqual(self.value('bot_login_codes_issued_total'), before + 3)
+
+    def test_login_code_redeem_is_counted(self):
+        LoginCode.objects.create(code='METRIC01', telegram_id='700', expires_at=timezone.now() + timedelta(minutes=5))
+        success = self.value('login_codes_redeemed_total', result='new_user')
+        invalid = self.value('login_codes_redeemed_total', result='invalid')
+        client = APIClient()
+        client.post('/api/login_with_code/', {'code': 'METRIC01'}, format='json')
+        client.post('/api/login_with_code/', {'code': 'METRIC01'}, format='json')
+
+        self.assertEqual(self.value('login_codes_redeemed_total', result='new_user'), success + 1)
+        self.assertEqual(self.value('login_codes_redeemed_total', result='invalid'), invalid + 1)
+
+    def test_job_runs_are_counted(self):
+        before = self.value('jobs_processed_total', job='recount_hackathon', result='done')
+        jobs.enqueue('recount_hackathon', hackathon_id=make_hackathon().pk)
+        jobs.run_pending()
+        self.assertEqual(self.value('jobs_processed_total', job='recount_hackathon', result='done'), before + 1)
+
+    def test_access_is_limited(self):
+        client = APIClient()
+        # Без токена закрыто даже для localhost: за прокси на той же машине это любой клиент
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        with override_settings(METRICS_ALLOW_LOCALHOST=True):
+            self.assertEqual(client.get('/metrics').status_code, 200)
+            self.assertEqual(client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 403)
+        with override_settings(METRICS_TOKEN='secret', METRICS_ALLOW_LOCALHOST=True):
+            self.assertEqual(client.get('/metrics').status_code, 403)
+            response = client.get('/metrics', REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class FastSerializerTests(ApiTestCase):
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_hackathon_rows_match_model_serializer(self):
+        make_hackathon(name='Хакатон', start_time=datetime_time(9, 5), required_roles=['frontend'])
+        # Значение вне choices: get_category_display возвращает его как есть
+        make_hackathon(name='Default', category='it', difficulty='hard', required_roles=[])
+        queryset = Hackathon.objects.order_by('id')
+        self.assertEqual(self.render(hackathon_rows.serialize(hackathon_rows.values(queryset))),
+                         self.render(HackathonSerializer(queryset, many=True).data))
+
+    def test_profile_rows_match_model_serializer(self):
+        first = User.objects.create(username='first', email='first@example.com')
+        UserProfile.objects.create(user=first, display_name='Первый', experience_months=27, level='experienced',
+                                   avatar='avatars/first.png', avatar_hash='0123456789abcdef')
+        second = User.objects.create(username='second')
+        UserProfile.objects.create(user=second, experience_months=5, telegram_id='42', is_telegram_user=True)
+        queryset = UserProfile.objects.select_related('user').order_by('id')
+        self.assertEqual(self.render(profile_rows.serialize(profile_rows.values(queryset))),
+                         self.render(UserProfileSerializer(queryset, many=True).data))
+
+        # Через префикс — те же профили со стороны участников хакатона
+        hackathon = make_hackathon()
+        for user in (first, second):
+            HackathonParticipant.objects.create(user=user, hackathon=hackathon)
+        participants = HackathonParticipant.objects.order_by('user_id')
+        prefix = 'user__profile__'
+        self.assertEqual(profile_rows.serialize(profile_rows.values(participants, prefix), prefix),
+                         UserProfileSerializer(queryset, many=True).data)
+
+    def test_message_rows_match_model_serializer(self):
+        team = make_teams(make_hackathon(), 1)[0]
+        other = User.objects.create(username='other')
+        Message.objects.create(sender=other, receiver=team.captain, team=team, message_type='join_request',
+                               text='Строка с разделителем \u2028')
+        Message.objects.create(sender=team.captain, receiver=other, team=team, message_type='team_invite',
+                               status='declined', text='"кавычки"')
+        queryset = Message.objects.select_related('sender', 'receiver', 'team').order_by('id')
+        self.assertEqual(self.render(message_rows.serialize(message_rows.values(queryset))),
+                         self.render(MessageSerializer(queryset, many=True).data))
+
+    def test_method_fields_must_be_described(self):
+        class Incomplete(RowSerializer):
+            serializer_class = HackathonSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            Incomplete().compile()
+
+    def test_list_endpoints_keep_their_output(self):
+        hackathon = make_hackathon(required_roles=['backend'])
+        team = make_teams(hackathon, 1)[0]
+        user = User.objects.create(username='reader')
+        UserProfile.objects.create(user=user)
+        HackathonParticipant.objects.create(user=user, hackathon=hackathon)
+        for i in range(3):
+            Message.objects.create(sender=team.captain, receiver=user, team=team, message_type='team_invite',
+                                   text=f'invite {i}')
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self.client.get('/api/hackathons/').content,
+                         self.render(HackathonSerializer(Hackathon.objects.all(), many=True).data))
+        response = self.client.get('/api/messages/?page_size=2')
+        expected = Message.objects.order_by('-sent_at', '-id')[:2]
+        self.assertEqual(response.json()['results'], MessageSerializer(expected, many=True).data)
+        rest = self.client.get(response.json()['next'])
+        self.assertEqual([item['text'] for item in rest.json()['results']], ['invite 0'])
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            'text': 'Привет \u2028\u2029 "кавычки" \\ \n',
+            'date': date(2030, 1, 2),
+            'time': datetime_time(10, 30, 0, 123456),
+            'moment': timezone.now(),
+            'decimal': Decimal('1.50'),
+            'lazy': gettext_lazy('Ожидание'),
+            'numbers': [0, -1, 2 ** 40, 0.5, 0.1234, True, None],
+            1: 'int key',
+            'nested': [{'a': []}, ()],
+        }
+        fast = ORJSONRenderer()
+        self.assertEqual(fast.render(data), JSONRenderer().render(data))
+        self.assertEqual(fast.render(None), b'')
+        # С отступом — обычный JSONRenderer
+        self.assertEqual(fast.render(data, 'application/json; indent=2'),
+                         JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_bench_serializers_reports_identical_output(self):
+        out = StringIO()
+        call_command('bench_serializers', rows=20, repeat=1, stdout=out)
+        self.assertIn('RowSerializer + json', out.getvalue())
+        self.assertFalse(Hackathon.objects.exists())
+
+
+class ConditionalGetTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hackathon = make_hackathon()
+
+    def revalidate(self, url, response, queries=None, **headers):
+        cache.get_cache().clear()
+        with self.assertNumQueries(queries) if queries is not None else nullcontext():
+            return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+
+    def test_unchanged_catalog_costs_one_query(self):
+        for url in ('/api/hackathons/', '/api/hackathon-dates/', '/api/hackathons/?category=web_dev'):
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'public, no-cache')
+            self.assertNotIn('Last-Modified', response)
+            not_modified = self.revalidate(url, response, queries=1)
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified.content, b'')
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+        # Валидатор из кэша ответов: пока версии те же, без запросов
+        response = self.client.get('/api/hackathons/')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/hackathons/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_changes_and_deletions_change_etag(self):
+        other = make_hackathon(name='Other')
+        response = self.client.get('/api/hackathons/')
+        other.delete()
+        self.assertEqual(self.revalidate('/api/hackathons/', response).status_code, 200)
+
+        response = self.client.get('/api/hackathons/')
+        counters.change_hackathon_participants(self.hackathon.pk, 1)
+        self.assertEqual(self.revalidate('/api/hackathons/', response).status_code, 200)
+
+    def test_detail_follows_teams(self):
+        url = f'/api/hackathons/{self.hackathon.pk}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(self.revalidate(url, response, queries=1).status_code, 304)
+        cache.get_cache().clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        team = make_teams(self.hackathon, 1)[0]
+        response = self.client.get(url)
+        counters.reserve_team_slots(team)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+        response = self.client.get(url)
+        team.delete()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+        self.assertEqual(self.client.get('/api/hackathons/999/').status_code, 404)
+
+    def test_profile_is_private(self):
+        user = User.objects.create(username='owner')
+        UserProfile.objects.create(user=user, display_name='Владелец')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        response = self.client.get('/api/profile/')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Authorization', response['Vary'])
+        self.assertEqual(self.revalidate('/api/profile/', response).status_code, 304)
+
+        self.client.patch('/api/profile/', {'bio': 'Новое'}, format='json')
+        self.assertEqual(self.revalidate('/api/profile/', response).status_code, 200)
+
+        other = User.objects.create(username='other')
+        UserProfile.objects.create(user=other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(other)}')
+        self.assertEqual(self.revalidate('/api/profile/', response).status_code, 200)
+
+    def test_async_views_share_validators(self):
+        response = self.client.get('/api/hackathons/')
+        request = RequestFactory().get('/api/hackathons/', HTTP_IF_NONE_MATCH=response['ETag'])
+        not_modified = async_to_sync(async_views.hackathon_list)(request)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['Cache-Control'], 'public, no-cache')
+
+        fresh = async_to_sync(async_views.hackathon_list)(RequestFactory().get('/api/hackathons/'))
+        self.assertEqual(fresh['ETag'], response['ETag'])
+
+    @override_settings(CONDITIONAL_MAX_AGE=60)
+    def test_max_age(self):
+        self.assertEqual(self.client.get('/api/hackathon-dates/')['Cache-Control'], 'public, max-age=60')
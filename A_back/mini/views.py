@@ -1,18 +1,51 @@
 from django.contrib.auth.models import User
-from .serializers import LoginWithCodeSerializer, UserProfileSerializer, HackathonSerializer, HackathonDetailSerializer, TeamSerializer, TeamCreateSerializer, MessageSerializer
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from .serializers import LoginWithCodeSerializer, UserProfileSerializer, PublicUserProfileSerializer, HackathonSerializer, HackathonFilterSerializer, SearchQuerySerializer, RecommendationQuerySerializer, BulkInviteSerializer, HackathonDetailSerializer, TeamSerializer, TeamCreateSerializer, hackathon_rows, message_rows, profile_rows
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from .pagination import KeysetPagination, DeltaSyncPagination
+from . import avatars, cache, counters, jobs, metrics, search
+from .recommendations import skill_index
+from .signals import message_status_changed, messages_created
+from .cache import cached_get
+from .conditional import Validators, conditional_get
 from .models import LoginCode, UserProfile, Hackathon, HackathonParticipant, Team, TeamMember, Message
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import NotAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import generics
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Prefetch, Q
+from django.utils import timezone
+from django.core.files.storage import default_storage
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+import hmac
+
+
+def team_listing(queryset):
+    """Подгружает капитанов и списки участников фиксированным числом запросов"""
+    return queryset.select_related('captain').prefetch_related(
+        Prefetch('members', queryset=User.objects.only('id', 'username'))
+    ).order_by('created_at', 'id')
+
+def profile_validators(request, user):
+    # Профиль загружен вместе с пользователем при аутентификации — без запросов
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        return None
+    return Validators('profile', user.pk, user.username, user.email, profile.pk, profile.updated_at,
+                      last_modified=profile.updated_at)
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(profile_validators, private=True)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_object(self):
         return self.request.user.profile
 
@@ -26,6 +59,7 @@ class LoginWithCodeView(APIView):
             try:
                 login_code = LoginCode.objects.get(code=code, used=False)
                 if login_code.is_expired:
+                    metrics.inc('login_codes_redeemed_total', result='expired')
                     return Response({"error": "Code expired"}, status=status.HTTP_400_BAD_REQUEST)
                 # Mark code as used
                 login_code.used = True
@@ -52,24 +86,79 @@ class LoginWithCodeView(APIView):
 
                 # Generate JWT tokens
                 refresh = RefreshToken.for_user(user)
+                metrics.inc('login_codes_redeemed_total', result='new_user' if created else 'success')
                 return Response({
                     'refresh': str(refresh),
                     'access': str(refresh.access_token),
                 })
             except LoginCode.DoesNotExist:
+                metrics.inc('login_codes_redeemed_total', result='invalid')
                 return Response({"error": "Invalid code"}, status=status.HTTP_400_BAD_REQUEST)
+        metrics.inc('login_codes_redeemed_total', result='bad_request')
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def hackathon_catalog(query_params):
+    """Хакатоны каталога по фильтрам из query string (ValidationError при ошибке)"""
+    filters = HackathonFilterSerializer(data=query_params)
+    filters.is_valid(raise_exception=True)
+    params = filters.validated_data
+    queryset = Hackathon.objects.all()
+    if 'category' in params:
+        queryset = queryset.filter(category=params['category'])
+    if 'difficulty' in params:
+        queryset = queryset.filter(difficulty=params['difficulty'])
+    # Окно дат по start_date: месяц календаря читает только свои строки по индексу
+    if 'start' in params:
+        queryset = queryset.filter(start_date__gte=params['start'])
+    if 'end' in params:
+        queryset = queryset.filter(start_date__lte=params['end'])
+    if params.get('registration_open') is not None:
+        is_open = Q(registration_deadline__isnull=True) | Q(registration_deadline__gt=timezone.now().date())
+        queryset = queryset.filter(is_open if params['registration_open'] else ~is_open)
+    if params.get('q'):
+        queryset = queryset.filter(name__istartswith=params['q'])
+    return queryset
+
+def catalog_validators(request, user):
+    stats = hackathon_catalog(request.query_params).aggregate(updated=Max('updated_at'), count=Count('id'))
+    return Validators('hackathons', stats['updated'], stats['count'])
+
+def hackathon_dates_validators(request, user):
+    stats = Hackathon.objects.aggregate(updated=Max('updated_at'), count=Count('id'))
+    return Validators('hackathon_dates', stats['updated'], stats['count'])
+
+def hackathon_validators(request, user, pk):
+    rows = Hackathon.objects.filter(pk=pk).order_by().values('updated_at').annotate(
+        teams_updated=Max('team__updated_at'), teams=Count('team')
+    ).values_list('updated_at', 'teams_updated', 'teams')[:1]
+    if not rows:
+        return None
+    updated, teams_updated, teams = rows[0]
+    return Validators('hackathon', pk, updated, teams_updated, teams,
+                      last_modified=max(updated, teams_updated or updated))
+
 class HackathonListView(generics.ListAPIView):
     serializer_class = HackathonSerializer
     permission_classes = [AllowAny]
 
+    @conditional_get(catalog_validators, lambda: [cache.CATALOG])
+    @cached_get('hackathons_list', lambda: [cache.CATALOG])
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
-        return Hackathon.objects.all()
+        return hackathon_catalog(self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        # Каталог без пагинации: тысячи строк сериализуем из values(), без объектов модели
+        rows = hackathon_rows.values(self.filter_queryset(self.get_queryset()))
+        return Response(hackathon_rows.serialize(rows))
 
 class HackathonDatesView(APIView):
     permission_classes = [AllowAny]
 
+    @conditional_get(hackathon_dates_validators, lambda: [cache.CATALOG])
+    @cached_get('hackathon_dates', lambda: [cache.CATALOG])
     def get(self, request):
         hackathons = Hackathon.objects.values_list('start_date', flat=True)
         dates = list(set(str(date) for date in hackathons))  # Преобразовать в строки для JSON
@@ -78,19 +167,54 @@ class HackathonDatesView(APIView):
 class HackathonDetailView(APIView):
     permission_classes = [AllowAny]
 
+    @conditional_get(hackathon_validators, lambda pk: [cache.hackathon_namespace(pk)])
+    @cached_get('hackathon_detail', lambda pk: [cache.hackathon_namespace(pk)])
     def get(self, request, pk):
         try:
             hackathon = Hackathon.objects.get(pk=pk)
-            teams = Team.objects.filter(hackathon=hackathon)
+            paginator = KeysetPagination(ordering_field='created_at', descending=False)
+            teams = paginator.paginate_queryset(
+                team_listing(Team.objects.filter(hackathon=hackathon)), request, view=self
+            )
             serializer = HackathonDetailSerializer(hackathon)
             team_serializer = TeamSerializer(teams, many=True)
             return Response({
                 'hackathon': serializer.data,
-                'teams': team_serializer.data
+                'teams': team_serializer.data,
+                'teams_next': paginator.get_next_link()
             })
         except Hackathon.DoesNotExist:
             return Response({'error': 'Хакатон не найден'}, status=404)
 
+# Полнотекстовый поиск по хакатонам и профилям
+class SearchView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        kind = params.validated_data['type']
+        page = params.validated_data['page']
+        page_size = params.validated_data['page_size']
+        # Профили ищут только авторизованные пользователи, как и в списке участников
+        if kind == 'profile' and not request.user.is_authenticated:
+            raise NotAuthenticated()
+        ids = search.search(kind, params.validated_data['q'], limit=page_size + 1, offset=(page - 1) * page_size)
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+        if kind == 'hackathon':
+            objects = Hackathon.objects.in_bulk(ids)
+            serializer_class = HackathonSerializer
+        else:
+            objects = UserProfile.objects.select_related('user').in_bulk(ids)
+            serializer_class = PublicUserProfileSerializer
+        ranked = [objects[pk] for pk in ids if pk in objects]
+        return Response({
+            'results': serializer_class(ranked, many=True).data,
+            'page': page,
+            'has_next': has_next,
+        })
+
 # Регистрация на хакатон
 class ParticipateHackathonView(APIView):
     permission_classes = [IsAuthenticated]
@@ -100,9 +224,12 @@ class ParticipateHackathonView(APIView):
             hackathon = Hackathon.objects.get(pk=pk)
             if not hackathon.is_registration_open():
                 return Response({'error': 'Регистрация закрыта'}, status=status.HTTP_400_BAD_REQUEST)
-            participant, created = HackathonParticipant.objects.get_or_create(
-                user=request.user, hackathon=hackathon, defaults={'status': 'active'}
-            )
+            with transaction.atomic():
+                participant, created = HackathonParticipant.objects.get_or_create(
+                    user=request.user, hackathon=hackathon, defaults={'status': 'active'}
+                )
+                if created:
+                    counters.change_hackathon_participants(hackathon.id, 1)
             if not created:
                 return Response({'message': 'Вы уже участвуете в этом хакатоне'}, status=status.HTTP_200_OK)
             return Response({'message': 'Вы зарегистрированы на участие в хакатоне'}, status=status.HTTP_201_CREATED)
@@ -130,17 +257,13 @@ class CreateTeamView(APIView):
                 return Response({'error': 'Вы уже в команде'}, status=status.HTTP_400_BAD_REQUEST)
             serializer = TeamCreateSerializer(data=dict(request.data, hackathon=hackathon.id, captain=request.user.id))
             if serializer.is_valid():
-                team = serializer.save(captain=request.user)
-                # Добавить капитана в members
-                TeamMember.objects.create(team=team, user=request.user, status='joined')
-                team.save()  # Обновить is_full если нужно
-                # Обновить зарегистрированные команды
-                from django.db.models import Count
-                hackathon.teams_count = hackathon.team_set.count()
-                hackathon.save()  # Но лучше field
-                # Или прямо из views
-                hackathon.registered_teams = Team.objects.filter(hackathon=hackathon).count()
-                hackathon.save()
+                with transaction.atomic():
+                    team = serializer.save(captain=request.user)
+                    # Добавить капитана в members
+                    TeamMember.objects.create(team=team, user=request.user, status='joined')
+                    counters.change_team_members(team, 1)
+                    # registered_teams пересчитает воркер: строка хакатона не блокируется на каждую команду
+                    jobs.enqueue('recount_hackathon', hackathon_id=hackathon.id)
                 return Response(TeamSerializer(team).data, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Hackathon.DoesNotExist:
@@ -164,12 +287,34 @@ class PotentialMembersView(APIView):
                 status__in=['joined', 'invited']
             ).values_list('user', flat=True)
             available = participants.exclude(user__in=members_in_teams)
-            profiles = [p.user.profile for p in available]
-            serializer = UserProfileSerializer(profiles, many=True)
-            return Response(serializer.data)
+            params = RecommendationQuerySerializer(data=request.query_params)
+            params.is_valid(raise_exception=True)
+            if params.validated_data['recommend'] or 'team' in params.validated_data:
+                return self.recommend(hackathon, available, params.validated_data)
+            prefix = 'user__profile__'
+            return Response(profile_rows.serialize(profile_rows.values(available, prefix), prefix))
         except Hackathon.DoesNotExist:
             return Response({'error': 'Хакатон не найден'}, status=404)
 
+    def recommend(self, hackathon, available, params):
+        """Top-k кандидатов под required_roles хакатона и текущий состав команды (?team=<id>)"""
+        team_user_ids = []
+        if 'team' in params:
+            team_user_ids = list(TeamMember.objects.filter(
+                team_id=params['team'], team__hackathon=hackathon
+            ).values_list('user_id', flat=True))
+        ranked = skill_index.rank(
+            available.values_list('user_id', flat=True), hackathon.required_roles, team_user_ids, top=params['top']
+        )
+        scores = dict(ranked)
+        position = {user_id: i for i, (user_id, _) in enumerate(ranked)}
+        profiles = UserProfile.objects.filter(user_id__in=scores).select_related('user')
+        profiles = sorted(profiles, key=lambda p: position[p.user_id])
+        data = UserProfileSerializer(profiles, many=True).data
+        for item, profile in zip(data, profiles):
+            item['match_score'] = scores[profile.user_id]
+        return Response(data)
+
 # Отправить приглашение
 class InviteMemberView(APIView):
     permission_classes = [IsAuthenticated]
@@ -181,23 +326,90 @@ class InviteMemberView(APIView):
             user = User.objects.get(pk=user_id)
             if TeamMember.objects.filter(team=team, user=user).exists():
                 return Response({'error': 'Пользователь уже в команде'}, status=status.HTTP_400_BAD_REQUEST)
-            if team.members.count() >= team.size_max:
-                return Response({'error': 'Команда полна'}, status=status.HTTP_400_BAD_REQUEST)
             message_text = f"Вас приглашают в команду '{team.name}'. Желаете вступить?"
-            Message.objects.create(
-                sender=request.user,
-                receiver=user,
-                team=team,
-                message_type='team_invite',
-                text=message_text
-            )
-            TeamMember.objects.create(team=team, user=user, status='invited')
+            with transaction.atomic():
+                if not counters.reserve_team_slots(team):
+                    return Response({'error': 'Команда полна'}, status=status.HTTP_400_BAD_REQUEST)
+                TeamMember.objects.create(team=team, user=user, status='invited')
+                Message.objects.create(
+                    sender=request.user,
+                    receiver=user,
+                    team=team,
+                    message_type='team_invite',
+                    text=message_text
+                )
             return Response({'message': 'Приглашение отправлено'})
+        except IntegrityError:
+            # Параллельное приглашение того же пользователя: место вернул откат транзакции
+            return Response({'error': 'Пользователь уже в команде'}, status=status.HTTP_400_BAD_REQUEST)
         except Team.DoesNotExist:
             return Response({'error': 'Команда не найдена или не ваша'}, status=status.HTTP_404_NOT_FOUND)
         except User.DoesNotExist:
             return Response({'error': 'Пользователь не найден'}, status=status.HTTP_400_BAD_REQUEST)
 
+# Пригласить сразу нескольких пользователей (капитан)
+class BulkInviteView(APIView):
+    """
+    Проверки идут множествами (несколько запросов на весь список), записи —
+    bulk_create в одной транзакции. Если мест меньше, чем приглашённых,
+    приглашаются первые по порядку в списке, остальные получают team_full.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, team_id):
+        serializer = BulkInviteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Порядок сохраняем, повторы убираем
+        user_ids = list(dict.fromkeys(serializer.validated_data['user_ids']))
+        try:
+            team = Team.objects.get(pk=team_id, captain=request.user)
+        except Team.DoesNotExist:
+            return Response({'error': 'Команда не найдена или не ваша'}, status=status.HTTP_404_NOT_FOUND)
+
+        existing = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        members = set(TeamMember.objects.filter(team=team, user_id__in=user_ids).values_list('user_id', flat=True))
+        outcomes = {}
+        candidates = []
+        for user_id in user_ids:
+            if user_id not in existing:
+                outcomes[user_id] = 'not_found'
+            elif user_id in members:
+                outcomes[user_id] = 'already_member'
+            else:
+                candidates.append(user_id)
+
+        invited = []
+        try:
+            with transaction.atomic():
+                invited = candidates[:max(team.size_max - team.member_count, 0)]
+                # Условный UPDATE: если часть мест параллельно заняли, reserve_team_slots уже
+                # перечитал member_count — пробуем снова на оставшиеся места
+                while invited and not counters.reserve_team_slots(team, count=len(invited)):
+                    invited = invited[:min(len(invited) - 1, max(team.size_max - team.member_count, 0))]
+                if invited:
+                    TeamMember.objects.bulk_create(
+                        [TeamMember(team=team, user_id=user_id, status='invited') for user_id in invited]
+                    )
+                    message_text = f"Вас приглашают в команду '{team.name}'. Желаете вступить?"
+                    messages = Message.objects.bulk_create([
+                        Message(sender=request.user, receiver_id=user_id, team=team,
+                                message_type='team_invite', text=message_text)
+                        for user_id in invited
+                    ])
+                    messages_created(messages)
+                    cache.bump(cache.hackathon_namespace(team.hackathon_id))
+        except IntegrityError:
+            # Кого-то из списка параллельно пригласили другим запросом: откат вернул места
+            return Response({'error': 'Состав команды изменился, повторите запрос'}, status=status.HTTP_409_CONFLICT)
+
+        for user_id in candidates:
+            outcomes[user_id] = 'invited' if user_id in invited else 'team_full'
+        return Response({
+            'invited': len(invited),
+            'results': [{'user_id': user_id, 'status': outcomes[user_id]} for user_id in user_ids],
+        })
+
 # Доступные команды для присоединения
 class AvailableTeamsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -205,7 +417,9 @@ class AvailableTeamsView(APIView):
     def get(self, request, pk):
         try:
             hackathon = Hackathon.objects.get(pk=pk)
-            teams = Team.objects.filter(hackathon=hackathon, is_full=False).exclude(captain=request.user)
+            teams = team_listing(
+                Team.objects.filter(hackathon=hackathon, is_full=False).exclude(captain=request.user)
+            )
             serializer = TeamSerializer(teams, many=True)
             return Response(serializer.data)
         except Hackathon.DoesNotExist:
@@ -239,15 +453,27 @@ class JoinTeamRequestView(APIView):
             return Response({'error': 'Команда не найдена или полна'}, status=status.HTTP_404_NOT_FOUND)
 
 # Сообщения пользователя
+def user_messages(user):
+    return Message.objects.filter(
+        Q(receiver=user) | Q(sender=user)
+    ).select_related('sender', 'receiver', 'team')
+
 class MessagesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        messages = Message.objects.filter(
-            Q(receiver=request.user) | Q(sender=request.user)
-        ).order_by('-sent_at')
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        messages = message_rows.values(user_messages(request.user), extra=['updated_at'])
+        # ?since=<sync_token>: только сообщения, созданные или изменённые после токена
+        if DeltaSyncPagination.cursor_query_param in request.query_params:
+            paginator = DeltaSyncPagination()
+            page = paginator.paginate_queryset(messages, request, view=self)
+            return paginator.get_paginated_response(message_rows.serialize(page))
+        sync_token = DeltaSyncPagination().initial_token()
+        paginator = KeysetPagination(ordering_field='sent_at', descending=True)
+        page = paginator.paginate_queryset(messages, request, view=self)
+        response = paginator.get_paginated_response(message_rows.serialize(page))
+        response.data['sync_token'] = sync_token
+        return response
 
 # Принять/отклонить сообщение
 class RespondMessageView(APIView):
@@ -259,43 +485,50 @@ class RespondMessageView(APIView):
             message = Message.objects.get(pk=message_id, receiver=request.user)
             if message.status != 'pending':
                 return Response({'error': 'Сообщение уже обработано'}, status=status.HTTP_400_BAD_REQUEST)
-            if action == 'accept':
-                if message.message_type == 'team_invite':
-                    if message.team.members.count() >= message.team.size_max:
-                        return Response({'error': 'Команда полна'}, status=status.HTTP_400_BAD_REQUEST)
-                    TeamMember.objects.filter(team=message.team, user=request.user).update(status='joined')
-                elif message.message_type == 'join_request':
-                    if message.team.members.count() >= message.team.size_max:
-                        return Response({'error': 'Команда полна'}, status=status.HTTP_400_BAD_REQUEST)
-                    TeamMember.objects.create(team=message.team, user=message.sender, status='joined')
-                message.status = 'accepted'
-            elif action == 'decline':
-                if message.message_type == 'team_invite':
-                    TeamMember.objects.filter(team=message.team, user=request.user).delete()
-                message.status = 'declined'
-            else:
+            if action not in ('accept', 'decline'):
                 return Response({'error': 'Неверное действие'}, status=status.HTTP_400_BAD_REQUEST)
-            message.save()
-            # Обновить is_full команды
             team = message.team
-            team.is_full = team.members.count() >= team.size_max
-            team.save()
-            # Обновить зарегистрированные команды хакатона
-            team.hackathon.registered_teams = Team.objects.filter(hackathon=team.hackathon, is_full=True).count()
-            team.hackathon.save()
+            message.status = 'accepted' if action == 'accept' else 'declined'
+            with transaction.atomic():
+                # Условный UPDATE: из параллельных ответов на одно сообщение пройдёт только один
+                claimed = Message.objects.filter(pk=message.pk, status='pending').update(
+                    status=message.status, updated_at=timezone.now()
+                )
+                if not claimed:
+                    return Response({'error': 'Сообщение уже обработано'}, status=status.HTTP_400_BAD_REQUEST)
+                if action == 'accept':
+                    if message.message_type == 'team_invite':
+                        # Приглашённый уже учтён в member_count при отправке приглашения
+                        TeamMember.objects.filter(team=team, user=request.user).update(status='joined')
+                    elif message.message_type == 'join_request':
+                        if not counters.reserve_team_slots(team):
+                            # Сообщение остаётся pending: капитан сможет принять его, когда место освободится
+                            transaction.set_rollback(True)
+                            return Response({'error': 'Команда полна'}, status=status.HTTP_400_BAD_REQUEST)
+                        TeamMember.objects.create(team=team, user=message.sender, status='joined')
+                elif message.message_type == 'team_invite':
+                    deleted, _ = TeamMember.objects.filter(team=team, user=request.user).delete()
+                    if deleted:
+                        counters.change_team_members(team, -deleted)
+                message_status_changed(message)
             return Response({'message': f'Запрос {action}ed'})
+        except IntegrityError:
+            return Response({'error': 'Пользователь уже в команде'}, status=status.HTTP_400_BAD_REQUEST)
         except Message.DoesNotExist:
             return Response({'error': 'Сообщение не найдено'}, status=status.HTTP_404_NOT_FOUND)
 
 # Мои команды
+def user_teams(user):
+    # Команды, где пользователь капитан или член
+    # Подзапрос вместо JOIN, чтобы не искажать подсчёт участников и обойтись без distinct()
+    joined = TeamMember.objects.filter(user=user, status='joined').values('team')
+    return team_listing(Team.objects.filter(Q(captain=user) | Q(pk__in=joined)))
+
 class MyTeamsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Команды, где пользователь капитан или член
-        teams = Team.objects.filter(
-            Q(captain=request.user) | Q(teammember__user=request.user, teammember__status='joined')
-        ).distinct()
+        teams = user_teams(request.user)
         serializer = TeamSerializer(teams, many=True)
         return Response(serializer.data)
 
@@ -306,10 +539,53 @@ class DeleteTeamView(APIView):
     def delete(self, request, team_id):
         try:
             team = Team.objects.get(pk=team_id, captain=request.user)
-            team.delete()
-            # Обновить registered_teams хакатона
-            team.hackathon.registered_teams = Team.objects.filter(hackathon=team.hackathon).count()
-            team.hackathon.save()
+            with transaction.atomic():
+                team.delete()
+                jobs.enqueue('recount_hackathon', hackathon_id=team.hackathon_id)
             return Response({'message': 'Команда удалена'})
         except Team.DoesNotExist:
             return Response({'error': 'Команда не найдена или не ваша'}, status=status.HTTP_404_NOT_FOUND)
+
+# Счётчики кэша каталога (только для администраторов)
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.stats())
+
+# Состояние очереди фоновых задач (только для администраторов)
+class JobStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(jobs.stats())
+
+
+def avatar_variant(request, name):
+    """
+    Отдаёт уменьшенную копию аватара. Имя содержит хэш содержимого, поэтому
+    ответ кэшируется навсегда; в продакшене то же правило лучше повесить на
+    /media/avatars/v/ в веб-сервере.
+    """
+    path = f'{avatars.VARIANTS_DIR}/{name}'
+    if not avatars.VARIANT_NAME_RE.fullmatch(name) or not default_storage.exists(path):
+        raise Http404
+    response = FileResponse(default_storage.open(path, 'rb'))
+    response['Cache-Control'] = f'public, max-age={avatars.CACHE_SECONDS}, immutable'
+    response['ETag'] = '"{}"'.format(name.rsplit('.', 1)[0])
+    return response
+
+
+def metrics_view(request):
+    """
+    Метрики Prometheus (mini/metrics.py): заголовок Authorization: Bearer <METRICS_TOKEN>.
+    Без токена — только с METRICS_ALLOW_LOCALHOST и только запросы с localhost:
+    за reverse proxy на той же машине REMOTE_ADDR у всех запросов локальный.
+    """
+    if settings.METRICS_TOKEN:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}')
+    else:
+        allowed = settings.METRICS_ALLOW_LOCALHOST and request.META.get('REMOTE_ADDR') in ('127.0.0.1', '::1')
+    if not allowed:
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,16 @@
+import { ACCESS_TOKEN } from "./constants"
+
+// Подписка на серверные события (/api/events/, SSE). Возвращает функцию отписки.
+export function subscribeEvents(types, handler) {
+  const token = localStorage.getItem(ACCESS_TOKEN);
+  if (!token || typeof EventSource === "undefined") {
+    return () => {};
+  }
+  const source = new EventSource(
+    `${import.meta.env.VITE_API_URL}/api/events/?token=${encodeURIComponent(token)}`
+  );
+  types.forEach((type) => {
+    source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+  });
+  return () => source.close();
+}
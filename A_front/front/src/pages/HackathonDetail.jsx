@@ -31,6 +31,19 @@ function HackathonDetail() {
     }
   };
 
+  const loadMoreTeams = async () => {
+    try {
+      const response = await api.get(hackathonData.teams_next);
+      setHackathonData({
+        ...hackathonData,
+        teams: [...hackathonData.teams, ...response.data.teams],
+        teams_next: response.data.teams_next
+      });
+    } catch (error) {
+      console.error("Error fetching teams:", error);
+    }
+  };
+
   const handleParticipate = async () => {
     if (!showMenu) {
       try {
@@ -184,6 +197,9 @@ function HackathonDetail() {
             </div>
           ))}
         </div>
+        {hackathonData.teams_next && (
+          <button onClick={loadMoreTeams}>Показать ещё</button>
+        )}
       </div>
     </div>
   );
@@ -14,10 +14,13 @@ function Home() {
 
   useEffect(() => {
     getUserInfo();
-    getHackathons();
     getHackathonDates();
   }, []);
 
+  useEffect(() => {
+    getHackathons();
+  }, [currentView]);
+
   const getUserInfo = async () => {
     try {
       const token = localStorage.getItem('access');
@@ -30,9 +33,20 @@ function Home() {
     }
   };
 
+  const formatDate = (date) => {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+  };
+
   const getHackathons = async () => {
     try {
-      const response = await api.get("/api/hackathons/");
+      // Запрашиваем только хакатоны отображаемого месяца
+      const start = new Date(currentView.year, currentView.month, 1);
+      const end = new Date(currentView.year, currentView.month + 1, 0);
+      const response = await api.get("/api/hackathons/", {
+        params: { start: formatDate(start), end: formatDate(end) }
+      });
       setHackathons(response.data);
     } catch (error) {
       console.log("Error getting hackathons:", error);
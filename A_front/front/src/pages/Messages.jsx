@@ -1,21 +1,28 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
 import api from "../api";
+import { subscribeEvents } from "../events";
 import "../styles/Messages.css";  // Создадим стиль
 
 function Messages() {
   const navigate = useNavigate();
   const [messages, setMessages] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  const syncToken = useRef(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     fetchMessages();
+    // Новые сообщения и смены статуса приходят push-событием, дальше — delta sync
+    return subscribeEvents(["message.created", "message.status"], () => syncMessages());
   }, []);
 
   const fetchMessages = async () => {
     try {
       const response = await api.get(`/api/messages/`);
-      setMessages(response.data);
+      setMessages(response.data.results);
+      setNextPage(response.data.next);
+      syncToken.current = response.data.sync_token;
     } catch (error) {
       console.error("Error fetching messages:", error);
     } finally {
@@ -23,11 +30,44 @@ function Messages() {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const response = await api.get(nextPage);
+      setMessages([...messages, ...response.data.results]);
+      setNextPage(response.data.next);
+    } catch (error) {
+      console.error("Error fetching messages:", error);
+    }
+  };
+
+  // Забираем только изменения с прошлой синхронизации и вливаем их по id
+  const syncMessages = async () => {
+    try {
+      let token = syncToken.current;
+      let changed = [];
+      let hasMore = true;
+      while (hasMore) {
+        const response = await api.get(`/api/messages/`, { params: { since: token } });
+        changed = [...changed, ...response.data.results];
+        token = response.data.sync_token;
+        hasMore = response.data.has_more;
+      }
+      syncToken.current = token;
+      setMessages((current) => {
+        const byId = new Map(current.map((msg) => [msg.id, msg]));
+        changed.forEach((msg) => byId.set(msg.id, msg));
+        return [...byId.values()].sort((a, b) => new Date(b.sent_at) - new Date(a.sent_at) || b.id - a.id);
+      });
+    } catch (error) {
+      console.error("Error syncing messages:", error);
+    }
+  };
+
   const handleRespond = async (messageId, action) => {
     try {
       await api.post(`/api/messages/${messageId}/respond/`, { action });
       alert(`Запрос ${action === 'accept' ? 'принят' : 'отклонен'}`);
-      fetchMessages();  // Обновить список
+      syncMessages();  // Подтянуть только изменившиеся сообщения
     } catch (error) {
       alert('Ошибка: ' + error.response?.data?.error);
     }
@@ -60,6 +100,7 @@ function Messages() {
           </div>
         ))}
       </div>
+      {nextPage && <button onClick={loadMore}>Показать ещё</button>}
     </div>
   );
 }
@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import api from "../api";
+import { subscribeEvents } from "../events";
 import "../styles/MyTeams.css";
 
 function MyTeams() {
@@ -11,6 +12,8 @@ function MyTeams() {
 
   useEffect(() => {
     fetchMyTeams();
+    // Состав команд меняется при принятии приглашений и заполнении команды
+    return subscribeEvents(["message.status", "team.is_full"], () => fetchMyTeams());
   }, []);
 
   const fetchMyTeams = async () => {
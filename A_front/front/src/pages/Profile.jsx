@@ -122,11 +122,16 @@ const getProfile = async () => {
                 <div className="profile-avatar-section">
                     <div className="avatar-container">
                         {profile.avatar ? (
-                            <img
-                                src={profile.avatar}
-                                alt="Аватар"
-                                className="profile-avatar"
-                            />
+                            <picture>
+                                {profile.avatar_urls && (
+                                    <source srcSet={profile.avatar_urls['256'].webp} type="image/webp" />
+                                )}
+                                <img
+                                    src={profile.avatar_urls ? profile.avatar_urls['256'].jpg : profile.avatar}
+                                    alt="Аватар"
+                                    className="profile-avatar"
+                                />
+                            </picture>
                         ) : (
                             <div className="profile-avatar-placeholder">
                                 📷
@@ -1,6 +1,26 @@
+"""
+Асинхронный бот входа на платформу.
+
+Апдейты обрабатываются конкурентно (не больше BOT_CONCURRENCY одновременно),
+а ORM вызывается через sync_to_async в отдельном пуле потоков, поэтому
+медленная запись в БД у одного пользователя не задерживает /login остальных.
+
+Режимы запуска:
+    python bot.py                  — long polling (BOT_MODE=polling, по умолчанию)
+    BOT_MODE=webhook python bot.py — регистрирует вебхук TELEGRAM_WEBHOOK_URL и выходит;
+                                     апдейты принимает ASGI-приложение бэкенда (bot_webhook.py)
+
+TELEGRAM_API_URL (например http://127.0.0.1:8081) направляет бота на другой
+сервер Bot API — локальный fake_bot_api.py в тестах и при разработке.
+"""
+import asyncio
+import logging
 import os
 import django
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
 
 # Add the project directory to the sys.path
 project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -8,142 +28,228 @@ sys.path.insert(0, os.path.join(project_dir, 'A_back'))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
+from mini import metrics  # type: ignore[import]
 from mini.models import LoginCode  # type: ignore[import]
 from django.contrib.auth.models import User  # type: ignore[import]
+from django.db import OperationalError, close_old_connections  # type: ignore[import]
+from asgiref.sync import sync_to_async
 from bot_settings import TOKEN, FRONTEND_URL
-import telebot
+from telebot import asyncio_helper, types
+from telebot.async_telebot import AsyncTeleBot
 from random import choices
 import string
 from django.utils import timezone
 from datetime import timedelta
 
-bot = telebot.TeleBot(TOKEN)
+BOT_CONCURRENCY = int(os.getenv('BOT_CONCURRENCY', '16'))
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL')
+TELEGRAM_WEBHOOK_URL = os.getenv('TELEGRAM_WEBHOOK_URL')
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+# Попыток запроса к БД при «database is locked» (SQLite под конкурентной записью из пула)
+DB_RETRIES = 5
+
+logger = logging.getLogger(__name__)
+
+if TELEGRAM_API_URL:
+    asyncio_helper.API_URL = TELEGRAM_API_URL.rstrip('/') + '/bot{0}/{1}'
+
+bot = AsyncTeleBot(TOKEN)
+
+# Ограничение на число одновременно обрабатываемых апдейтов; пул потоков
+# для ORM того же размера, чтобы каждый обработчик получил свой поток
+workers = asyncio.Semaphore(BOT_CONCURRENCY)
+db_executor = ThreadPoolExecutor(max_workers=BOT_CONCURRENCY, thread_name_prefix='bot-db')
+
+
+def db(func):
+    """
+    Синхронная функция с ORM -> корутина, выполняемая в пуле db_executor.
+    OperationalError («database is locked» у SQLite при записи из нескольких
+    потоков) повторяется до DB_RETRIES раз: функции бота — чтения и один INSERT
+    в autocommit, повтор безопасен.
+    """
+    def call(*args, **kwargs):
+        for attempt in range(1, DB_RETRIES + 1):
+            # Бот живёт долго: отбрасываем устаревшие соединения, как в конце HTTP-запроса
+            close_old_connections()
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if attempt == DB_RETRIES:
+                    raise
+                logger.warning('%s: %s (попытка %s из %s), повтор', func.__name__, exc, attempt, DB_RETRIES)
+                time.sleep(0.05 * attempt)
+            finally:
+                close_old_connections()
+    return sync_to_async(wraps(func)(call), thread_sensitive=False, executor=db_executor)
+
+
+def limited(handler):
+    @wraps(handler)
+    async def wrapper(message):
+        async with workers:
+            started = time.perf_counter()
+            try:
+                await handler(message)
+            except Exception:
+                # Без ответа пользователь не узнает, что команду нужно повторить
+                logger.exception('Ошибка в %s (чат %s)', handler.__name__, message.chat.id)
+                metrics.inc('bot_handler_errors_total', handler=handler.__name__)
+                await reply_error(message)
+            finally:
+                metrics.observe('bot_handler_duration_seconds', time.perf_counter() - started,
+                                handler=handler.__name__)
+    return wrapper
+
 
 # Генерация 8-символьного кода
 def generate_code():
     characters = string.ascii_letters + string.digits
     return ''.join(choices(characters, k=8))
 
-# Команда /help
-@bot.message_handler(commands=['help'])
-def help_command(message):
-    text = (
-        "💡 <b>Добро пожаловать в регистрацию!</b>\n\n"
-        "Этот бот предназначен для входа на платформу <b>DateHack</b>.\n"
-        "Скопируйте код или перейдите по сгенерированной ссылке для входа."
-    )
-    bot.send_message(message.chat.id, text, parse_mode='HTML')
 
-# Команда /start - может принимать параметр для автоматического входа
-@bot.message_handler(commands=['start'])
-def start_command(message):
-    # Проверяем, есть ли параметр после /start
-    command_parts = message.text.split()
-    start_param = command_parts[1] if len(command_parts) > 1 else None
+@db
+def active_session_hours(telegram_id):
+    """Сколько часов осталось у сессии (менее 24 часов с последнего входа) или None"""
+    user = User.objects.filter(username=telegram_id).only('last_login').first()
+    if user and user.last_login and (timezone.now() - user.last_login) < timedelta(days=1):
+        return int(((user.last_login + timedelta(days=1)) - timezone.now()).total_seconds() / 3600)
+    return None
 
-    if start_param == 'login':
-        # Автоматически выполняем логику входа - всегда генерируем новый код (если сессия кончилась)
-        start_login_command(message)
-    else:
-        help_command(message)
 
-# Функция для автоматического входа через start (всегда новый код, если возможно)
-def start_login_command(message):
-    telegram_id = str(message.from_user.id)
-    user_name = message.from_user.username or message.from_user.first_name
+@db
+def find_active_code(telegram_id):
+    return LoginCode.objects.filter(
+        telegram_id=telegram_id,
+        used=False,
+        expires_at__gt=timezone.now()
+    ).first()
 
-    # Проверяем, есть ли у пользователя действительная сессия (менее 24 часов с последнего входа)
-    try:
-        user = User.objects.get(username=telegram_id)
-        if user.last_login and (timezone.now() - user.last_login) < timedelta(days=1):
-            # У пользователя есть активная сессия
-            remaining_hours = int(((user.last_login + timedelta(days=1)) - timezone.now()).total_seconds() / 3600)
-            text = (
-                f"👋 Приветствую, <b>{user_name}</b>!\n\n"
-                f"🔒 <b>У вас уже есть активная сессия</b>\n\n"
-                f"⏳ <i>Сессия истечёт через {remaining_hours} часов</i>\n\n"
-                f"Вы можете войти на платформу обычным способом или подождать истечения сессии."
-            )
-            bot.send_message(message.chat.id, text, parse_mode='HTML')
-            return
-    except User.DoesNotExist:
-        # Пользователь ещё не зарегистрирован, можно продолжить
-        pass
-
-    # Генерируем новый код (игнорируем существующие)
+
+@db
+def issue_code(telegram_id):
     code = generate_code()
     expires_at = timezone.now() + timedelta(minutes=5)
     LoginCode.objects.create(code=code, telegram_id=telegram_id, expires_at=expires_at)
+    metrics.inc('bot_login_codes_issued_total')
+    return code
+
+
+def user_name_of(message):
+    return message.from_user.username or message.from_user.first_name
+
 
-    frontend_url = FRONTEND_URL
-    link = f"{frontend_url}/telegram-login?code={code}"
+async def reply_active_session(message, remaining_hours):
+    text = (
+        f"👋 Приветствую, <b>{user_name_of(message)}</b>!\n\n"
+        f"🔒 <b>У вас уже есть активная сессия</b>\n\n"
+        f"⏳ <i>Сессия истечёт через {remaining_hours} часов</i>\n\n"
+        f"Вы можете войти на платформу обычным способом или подождать истечения сессии."
+    )
+    await bot.send_message(message.chat.id, text, parse_mode='HTML')
 
+
+async def reply_new_code(message, telegram_id):
+    code = await issue_code(telegram_id)
+    link = f"{FRONTEND_URL}/telegram-login?code={code}"
     text = (
-        f"👋 Приветствую, <b>{user_name}</b>!\n\n"
+        f"👋 Приветствую, <b>{user_name_of(message)}</b>!\n\n"
         f"✅ <b>Код для входа:</b> <code>{code}</code>\n\n"
         f"<a href='{link}'>🔗 Войти на платформу</a>\n\n"
         f"⏳ <i>Истекает через 5 минут</i>"
     )
+    await bot.send_message(message.chat.id, text, parse_mode='HTML')
+
+
+async def reply_error(message):
+    try:
+        await bot.send_message(message.chat.id, "⚠️ Не удалось выполнить команду. Попробуйте ещё раз через минуту.")
+    except Exception:
+        logger.exception('Не удалось сообщить об ошибке в чат %s', message.chat.id)
+
+
+async def send_help(message):
+    text = (
+        "💡 <b>Добро пожаловать в регистрацию!</b>\n\n"
+        "Этот бот предназначен для входа на платформу <b>DateHack</b>.\n"
+        "Скопируйте код или перейдите по сгенерированной ссылке для входа."
+    )
+    await bot.send_message(message.chat.id, text, parse_mode='HTML')
+
+
+# Автоматический вход через start: всегда новый код, если сессия кончилась
+async def send_login_code(message):
+    telegram_id = str(message.from_user.id)
+    remaining_hours = await active_session_hours(telegram_id)
+    if remaining_hours is not None:
+        await reply_active_session(message, remaining_hours)
+        return
+    await reply_new_code(message, telegram_id)
+
+
+# Команда /help
+@bot.message_handler(commands=['help'])
+@limited
+async def help_command(message):
+    await send_help(message)
+
+
+# Команда /start - может принимать параметр для автоматического входа
+@bot.message_handler(commands=['start'])
+@limited
+async def start_command(message):
+    command_parts = message.text.split()
+    start_param = command_parts[1] if len(command_parts) > 1 else None
+
+    if start_param == 'login':
+        await send_login_code(message)
+    else:
+        await send_help(message)
 
-    bot.send_message(message.chat.id, text, parse_mode='HTML')
 
 # Команда /login - может показать существующий код
 @bot.message_handler(commands=['login'])
-def login_command(message):
+@limited
+async def login_command(message):
     telegram_id = str(message.from_user.id)
-    user_name = message.from_user.username or message.from_user.first_name
-
-    # Проверяем, есть ли у пользователя действительная сессия (менее 24 часов с последнего входа)
-    try:
-        user = User.objects.get(username=telegram_id)
-        if user.last_login and (timezone.now() - user.last_login) < timedelta(days=1):
-            # У пользователя есть активная сессия
-            remaining_hours = int(((user.last_login + timedelta(days=1)) - timezone.now()).total_seconds() / 3600)
-            text = (
-                f"👋 Приветствую, <b>{user_name}</b>!\n\n"
-                f"🔒 <b>У вас уже есть активная сессия</b>\n\n"
-                f"⏳ <i>Сессия истечёт через {remaining_hours} часов</i>\n\n"
-                f"Вы можете войти на платформу обычным способом или подождать истечения сессии."
-            )
-            bot.send_message(message.chat.id, text, parse_mode='HTML')
-            return
-    except User.DoesNotExist:
-        # Пользователь ещё не зарегистрирован, можно продолжить
-        pass
-
-    # Проверяем, есть ли у пользователя действительный неиспользованный код
-    existing_code = LoginCode.objects.filter(
-        telegram_id=telegram_id,
-        used=False,
-        expires_at__gt=timezone.now()
-    ).first()
+    remaining_hours = await active_session_hours(telegram_id)
+    if remaining_hours is not None:
+        await reply_active_session(message, remaining_hours)
+        return
 
+    existing_code = await find_active_code(telegram_id)
     if existing_code:
         # Есть действительный код - показываем его (без кнопки)
         remaining_time = int((existing_code.expires_at - timezone.now()).total_seconds() / 60)
         text = (
-            f"👋 Приветствую, <b>{user_name}</b>!\n\n"
+            f"👋 Приветствую, <b>{user_name_of(message)}</b>!\n\n"
             f"✅ <b>У вас уже есть действующий код:</b> <code>{existing_code.code}</code>\n\n"
             f"⏳ <i>Истекает через {remaining_time} минут</i>\n\n"
             f"Используйте этот код для входа на платформу."
         )
-        bot.send_message(message.chat.id, text, parse_mode='HTML')
+        await bot.send_message(message.chat.id, text, parse_mode='HTML')
     else:
-        # Генерируем новый код и показываем кнопку
-        code = generate_code()
-        expires_at = timezone.now() + timedelta(minutes=5)
-        LoginCode.objects.create(code=code, telegram_id=telegram_id, expires_at=expires_at)
+        await reply_new_code(message, telegram_id)
 
-        frontend_url = FRONTEND_URL
-        link = f"{frontend_url}/telegram-login?code={code}"
 
-        text = (
-            f"👋 Приветствую, <b>{user_name}</b>!\n\n"
-            f"✅ <b>Код для входа:</b> <code>{code}</code>\n\n"
-            f"<a href='{link}'>🔗 Войти на платформу</a>\n\n"
-            f"⏳ <i>Истекает через 5 минут</i>"
-        )
+async def process_update(payload):
+    """Обрабатывает один апдейт в формате JSON Bot API (тело запроса вебхука)"""
+    await bot.process_new_updates([types.Update.de_json(payload)])
+
+
+async def main():
+    if BOT_MODE == 'webhook':
+        if not TELEGRAM_WEBHOOK_URL:
+            raise SystemExit('BOT_MODE=webhook требует TELEGRAM_WEBHOOK_URL')
+        await bot.set_webhook(url=TELEGRAM_WEBHOOK_URL, secret_token=TELEGRAM_WEBHOOK_SECRET)
+        print(f'Вебхук зарегистрирован: {TELEGRAM_WEBHOOK_URL}')
+        await bot.close_session()
+        return
+    # Поллинг и вебхук взаимоисключающие на стороне Telegram
+    await bot.delete_webhook()
+    await bot.infinity_polling()
 
-        bot.send_message(message.chat.id, text, parse_mode='HTML')
 
-bot.polling()
+if __name__ == '__main__':
+    asyncio.run(main())
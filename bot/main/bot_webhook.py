@@ -0,0 +1,68 @@
+"""
+Приём апдейтов Telegram вебхуком внутри ASGI-приложения бэкенда.
+
+backend/asgi.py оборачивает Django-приложение функцией mount(), если задан
+TELEGRAM_WEBHOOK_SECRET: POST на TELEGRAM_WEBHOOK_PATH проверяется по
+заголовку X-Telegram-Bot-Api-Secret-Token, сразу получает 200, а сам апдейт
+обрабатывается фоновой задачей в том же цикле событий. Остальные запросы
+уходят в Django без изменений.
+"""
+import asyncio
+import json
+import os
+import secrets
+
+import bot
+
+WEBHOOK_PATH = os.getenv('TELEGRAM_WEBHOOK_PATH', '/telegram/webhook/')
+
+# Ссылки на незавершённые задачи, чтобы их не собрал сборщик мусора
+tasks = set()
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        event = await receive()
+        body += event.get('body', b'')
+        if not event.get('more_body'):
+            return body
+
+
+async def _respond(send, status, payload):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def mount(application, path=WEBHOOK_PATH, secret=None):
+    secret = secret or bot.TELEGRAM_WEBHOOK_SECRET
+    if not secret:
+        raise ValueError('Для вебхука нужен TELEGRAM_WEBHOOK_SECRET')
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != path:
+            return await application(scope, receive, send)
+        if scope['method'] != 'POST':
+            return await _respond(send, 405, {'error': 'Метод не поддерживается'})
+
+        headers = dict(scope['headers'])
+        token = headers.get(b'x-telegram-bot-api-secret-token', b'').decode('latin-1')
+        if not secrets.compare_digest(token, secret):
+            return await _respond(send, 403, {'error': 'Неверный секрет вебхука'})
+        try:
+            payload = json.loads(await _read_body(receive))
+        except ValueError:
+            return await _respond(send, 400, {'error': 'Некорректный JSON'})
+
+        # Telegram повторяет апдейт, если ответ задержался — отвечаем сразу
+        task = asyncio.create_task(bot.process_update(payload))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        await _respond(send, 200, {'ok': True})
+
+    return app
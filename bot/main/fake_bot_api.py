@@ -0,0 +1,167 @@
+"""
+Локальная подмена Telegram Bot API для тестов и разработки.
+
+Поддерживает методы, которые использует бот: getMe, getUpdates,
+sendMessage, setWebhook, deleteWebhook. Отправленные сообщения копятся в
+FakeBotAPI.sent, апдейты для поллинга кладутся через push_message(), ошибки
+sendMessage (429, 5xx, 403) — через fail_send(). hold_sends(n) задерживает
+ответы на sendMessage, пока не придут n одновременных запросов.
+
+    python fake_bot_api.py --port 8081
+    TELEGRAM_API_URL=http://127.0.0.1:8081 python bot.py
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+from aiohttp import web
+
+
+class FakeBotAPI:
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+        self.host = host
+        self.port = port
+        # Искусственная задержка ответа — имитирует медленную сеть
+        self.delay = delay
+        self.sent = []
+        self.webhook = None
+        self._updates = []
+        self._send_failures = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._new_update = asyncio.Event()
+        self._held = 0
+        self._released = asyncio.Event()
+        self._released.set()
+        self._runner = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def message_update(self, text, user_id, username=None, chat_id=None):
+        """Апдейт с текстовым сообщением от пользователя, как его присылает Telegram"""
+        return {
+            'update_id': next(self._update_ids),
+            'message': {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'text': text,
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+                if text.startswith('/') else [],
+                'chat': {'id': chat_id or user_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': username or str(user_id),
+                         'username': username},
+            },
+        }
+
+    def push_message(self, text, user_id, username=None):
+        update = self.message_update(text, user_id, username)
+        self._updates.append(update)
+        self._new_update.set()
+        return update
+
+    def fail_send(self, error_code, description='', retry_after=None):
+        """Следующий sendMessage вернёт эту ошибку вместо отправки"""
+        failure = {'ok': False, 'error_code': error_code, 'description': description}
+        if retry_after is not None:
+            failure['parameters'] = {'retry_after': retry_after}
+        self._send_failures.append(failure)
+
+    def hold_sends(self, count):
+        """Ответы на sendMessage ждут, пока одновременно не придут count запросов (проверка конкурентности)"""
+        self._held = count
+        self._released.clear()
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self.dispatch)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _params(self, request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        params = dict(request.query)
+        params.update(await request.post())
+        return params
+
+    async def dispatch(self, request):
+        method = request.match_info['method']
+        params = await self._params(request)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if method == 'sendMessage' and not self._released.is_set():
+            self._held -= 1
+            if self._held <= 0:
+                self._released.set()
+            await self._released.wait()
+        if method == 'sendMessage' and self._send_failures:
+            failure = self._send_failures.pop(0)
+            return web.json_response(failure, status=failure['error_code'])
+        handler = getattr(self, f'api_{method}', None)
+        if handler is None:
+            return web.json_response({'ok': False, 'error_code': 404, 'description': 'Not Found'}, status=404)
+        return web.json_response({'ok': True, 'result': await handler(params)})
+
+    async def api_getMe(self, params):
+        return {'id': 1, 'is_bot': True, 'first_name': 'Fake', 'username': 'fake_bot'}
+
+    async def api_getUpdates(self, params):
+        offset = int(params.get('offset') or 0)
+        self._updates = [update for update in self._updates if update['update_id'] >= offset]
+        if not self._updates:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), float(params.get('timeout') or 0))
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:int(params.get('limit') or 100)]
+
+    async def api_sendMessage(self, params):
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params['chat_id']), 'type': 'private'},
+            'text': params.get('text', ''),
+        }
+        self.sent.append({'chat_id': int(params['chat_id']), 'text': params.get('text', ''),
+                          'parse_mode': params.get('parse_mode')})
+        return message
+
+    async def api_setWebhook(self, params):
+        self.webhook = {'url': params.get('url'), 'secret_token': params.get('secret_token')}
+        return True
+
+    async def api_deleteWebhook(self, params):
+        self.webhook = None
+        return True
+
+
+async def serve(host, port):
+    api = await FakeBotAPI(host, port).start()
+    print(f'Fake Bot API: {api.url}')
+    sent = 0
+    while True:
+        await asyncio.sleep(0.5)
+        for message in api.sent[sent:]:
+            print(json.dumps(message, ensure_ascii=False))
+        sent = len(api.sent)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Локальная подмена Telegram Bot API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))